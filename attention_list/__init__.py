@@ -12,7 +12,11 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import pbr.version
 
-
-__version__ = pbr.version.VersionInfo("attention_list").version_string()
+def __getattr__(name):
+    # pbr looks the version up through pkg_resources, which takes longer
+    # than starting the CLI, so it is only done on first use.
+    if name == '__version__':
+        import pbr.version
+        return pbr.version.VersionInfo("attention_list").version_string()
+    raise AttributeError(name)
@@ -0,0 +1,447 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+
+from attention_list.helper.cache import get_http_cache
+from attention_list.helper.client import client_options
+from attention_list.helper.client import DEFAULT_ZUUL_URL
+from attention_list.helper.index import get_crawl_index
+from attention_list.helper.jsonlib import loads
+from attention_list.helper.metrics import endpoint_template
+from attention_list.helper.metrics import get_request_metrics
+from attention_list.helper.paginator import get_pages_async
+from attention_list.helper.paginator import get_search_pages_async
+from attention_list.helper.paginator import iter_pages_async
+from attention_list.helper.paginator import PAGE_SIZES
+from attention_list.helper.ratelimit import default_resource
+from attention_list.helper.ratelimit import get_rate_limiter
+from attention_list.helper.ratelimit import MAX_RETRIES
+from attention_list.helper.store import get_store
+from attention_list.helper.trace import span
+from attention_list.helper.utils import changed_repos
+from attention_list.helper.utils import checked_since
+from attention_list.helper.utils import created_before
+from attention_list.helper.utils import created_pulls_url
+from attention_list.helper.utils import default_pulls_state
+from attention_list.helper.utils import get_headers
+from attention_list.helper.utils import group_by_repo
+from attention_list.helper.utils import newest
+from attention_list.helper.utils import newest_first
+from attention_list.helper.utils import older_than
+from attention_list.helper.utils import print_request_error
+from attention_list.helper.utils import project_pull
+from attention_list.helper.utils import project_search_pull
+from attention_list.helper.utils import pulls_url
+from attention_list.helper.utils import repos_url
+from attention_list.helper.utils import save_repos
+from attention_list.helper.utils import search_pulls_url
+from attention_list.helper.utils import set_checked
+from attention_list.helper.utils import stored_repos
+from attention_list.helper.utils import unsynced_repos
+from attention_list.helper.utils import updated_search_url
+from attention_list.helper.utils import updated_pulls_url
+
+# Imported by run_async(), aiohttp takes longer to import than the sync
+# commands need to start.
+aiohttp = None
+CIMultiDict = None
+
+
+class AsyncResponse:
+    """Fully read response of the async engine"""
+    def __init__(self, status_code, reason, headers, content,
+                 from_cache=False):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+        self.data = None
+
+    def json(self):
+        if self.data is None:
+            self.data = loads(self.content)
+        return self.data
+
+
+class AsyncHosterClient:
+    """
+    asyncio counterpart of HosterClient.
+
+    The number of parallel connections is limited per host, all further
+    requests wait on the event loop for a free connection.
+    """
+    def __init__(
+            self,
+            name,
+            api_url,
+            headers=None,
+            pool_size=None,
+            connect_timeout=None,
+            read_timeout=None,
+            rate_limit=None,
+            cache=None,
+            store=None,
+            incremental=False,
+            page_size=None,
+            index=None):
+
+        self.name = name
+        self.api_url = api_url
+        self.headers = headers or {}
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.cache = cache
+        self.store = store
+        self.incremental = incremental
+        self.page_size = page_size
+        self.index = index
+        self.synced = set()
+        self.limiter = get_rate_limiter(api_url, headers, rate=rate_limit)
+        self.metrics = get_request_metrics()
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=self.pool_size)
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def request(self, method, url, **kwargs):
+        """
+        Send a request once the rate limiter allows it and read the body.
+        """
+        endpoint = endpoint_template(self.api_url, url)
+        resource = default_resource(endpoint)
+        wait_time = 0.0
+        for attempt in range(MAX_RETRIES + 1):
+            delay = self.limiter.reserve(resource)
+            if delay:
+                await asyncio.sleep(delay)
+                wait_time += delay
+            start = time.monotonic()
+            async with self.session.request(method, url, **kwargs) as res:
+                content = await res.read()
+            latency = time.monotonic() - start
+            if not self.limiter.update(
+                    res.status, res.headers, resource):
+                break
+        self.metrics.record(
+            self.name, method, endpoint,
+            res.status, len(content), latency,
+            retries=attempt, wait_time=wait_time)
+        return AsyncResponse(
+            status_code=res.status,
+            reason=res.reason,
+            headers=res.headers,
+            content=content)
+
+    async def get(self, url):
+        """
+        GET a URL, revalidating the cached response if there is one. The
+        cache reads and writes files, which is done on the default
+        executor, so the event loop keeps serving the other requests.
+        """
+        loop = asyncio.get_running_loop()
+        entry = None
+        headers = {}
+        if self.cache is not None:
+            entry = await loop.run_in_executor(
+                None, self.cache.get, url, self.headers)
+            if entry:
+                headers = entry.conditional_headers()
+        res = await self.request('GET', url, headers=headers)
+        if res.status_code == 304 and entry:
+            await loop.run_in_executor(None, self.cache.touch, entry)
+            return AsyncResponse(
+                status_code=200,
+                reason='OK',
+                headers=CIMultiDict(entry.merge_headers(res.headers)),
+                content=entry.content,
+                from_cache=True)
+        if res.status_code == 200 and self.cache is not None:
+            await loop.run_in_executor(
+                None, self.cache.store, url, self.headers, res.headers,
+                res.content)
+        return res
+
+    async def post(self, url, json=None):
+        return await self.request('POST', url, json=json)
+
+
+def get_async_client(hoster, args):
+    headers = get_headers(hoster=hoster['name'], args=args)
+    key = (hoster['name'], hoster['api_url'], headers['Authorization'])
+    return AsyncHosterClient(
+        name=hoster['name'],
+        api_url=hoster['api_url'],
+        headers=headers,
+        cache=get_http_cache(args),
+        store=get_store(args),
+        incremental=getattr(args, 'incremental', False),
+        page_size=hoster.get('page_size') or PAGE_SIZES[hoster['name']],
+        index=get_crawl_index(key, args),
+        **client_options(hoster, args))
+
+
+def get_async_zuul_client(url=None, config=None, args=None):
+    return AsyncHosterClient(
+        name='zuul',
+        api_url=url or DEFAULT_ZUUL_URL,
+        headers={'accept': 'application/json'},
+        store=get_store(args),
+        **client_options(config or {}, args))
+
+
+def run_async(coro):
+    """
+    Run a coroutine of the async engine to completion.
+    """
+    global aiohttp, CIMultiDict
+    try:
+        import aiohttp
+        from multidict import CIMultiDict
+    except ImportError:
+        coro.close()
+        raise Exception(
+            'The async engine requires aiohttp, please install it with\n'
+            'pip install attention-list[async]')
+    return asyncio.run(coro)
+
+
+async def gather(func, items):
+    """
+    Run the coroutine function for every item concurrently, keeping order.
+    """
+    return await asyncio.gather(*[func(item) for item in items])
+
+
+def start_tasks(func, items):
+    """
+    Start the coroutine function for every item as a concurrent task.
+    """
+    return [asyncio.ensure_future(func(item)) for item in items]
+
+
+def completed(result):
+    """
+    Return a future which is done with result, to be awaited like a task.
+    """
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(result)
+    return future
+
+
+async def iter_ordered(tasks):
+    """
+    Yield the results of tasks in their order, each as soon as it and all
+    tasks before it are done, so streamed findings are written while the
+    remaining tasks still run and in the same order as by gather().
+    """
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def sync_pull_requests_async(client, org, repo, state=None):
+    """
+    Update the stored Pull Requests of a Git Repository and return them.
+    """
+    await sync_pulls_async(client, org, repo)
+    return client.store.get_pulls(
+        client.api_url, org, repo, state or default_pulls_state(client.name))
+
+
+async def sync_pulls_async(client, org, repo):
+    """
+    Async engine variant of sync_pulls().
+    """
+    if (org, repo) in client.synced:
+        return
+    store = client.store
+    watermark = store.get_watermark(client.api_url, org, repo, 'pulls')
+    latest = watermark
+    try:
+        async for data in iter_pages_async(
+                client, updated_pulls_url(client, org, repo),
+                parse=project_pull):
+            store.save_pulls(client.api_url, org, repo, data)
+            for pr in data:
+                latest = newest(pr['updated_at'], latest)
+            if watermark and older_than(data[-1]['updated_at'], watermark):
+                break
+    except Exception as e:
+        print_request_error("sync_pull_requests error: ", e)
+        exit()
+    if latest:
+        store.set_watermark(client.api_url, org, repo, 'pulls', latest)
+    client.synced.add((org, repo))
+
+
+async def sync_org_pulls_async(client, org, repos):
+    """
+    Async engine variant of sync_org_pulls().
+    """
+    repos = unsynced_repos(client, org, repos)
+    if not repos:
+        return
+    checked = client.store.get_watermarks(
+        client.api_url, org, 'pulls/checked')
+    since = checked_since(repos, checked)
+    updated = None
+    if since:
+        updated = await search_updated_pulls_async(client, org, since)
+    changed = changed_repos(repos, checked, updated)
+    await gather(lambda repo: sync_pulls_async(client, org, repo), changed)
+    set_checked(client, org, repos, changed, since, updated)
+
+
+async def search_updated_pulls_async(client, org, since):
+    """
+    Async engine variant of search_updated_pulls().
+    """
+    url = updated_search_url(client, org, since)
+    try:
+        with span('search', hoster=client.name, org=org):
+            if client.name == 'github':
+                return await get_search_pages_async(
+                    client, url, parse=project_search_pull)
+            return await get_pages_async(
+                client, url, parse=project_search_pull)
+    except Exception as e:
+        print_request_error("search_updated_pulls error: ", e)
+    return None
+
+
+async def get_pull_requests_async(client, org, repo, state=None):
+    """
+    Collect all Pull Requests of a Git Repository
+    """
+    if client.index is not None:
+        state = state or default_pulls_state(client.name)
+        pulls = client.index.open_pulls(org, repo, state)
+        if pulls is not None:
+            return pulls
+        return await client.index.get_async(
+            ('pulls', org, repo, state),
+            lambda: fetch_pull_requests_async(client, org, repo, state))
+    return await fetch_pull_requests_async(client, org, repo, state)
+
+
+async def fetch_pull_requests_async(client, org, repo, state=None):
+    with span('pulls', hoster=client.name, org=org, repo=repo):
+        if client.store is not None and client.incremental:
+            return await sync_pull_requests_async(client, org, repo, state)
+
+        try:
+            pullrequests = await get_pages_async(
+                client, pulls_url(client, org, repo, state),
+                parse=project_pull)
+        except Exception as e:
+            print_request_error("get_pull_requests error: ", e)
+            exit()
+        if client.store is not None:
+            client.store.save_pulls(client.api_url, org, repo, pullrequests)
+        return pullrequests
+
+
+async def search_pull_requests_async(client, org, created_before=None):
+    """
+    Async engine variant of search_pull_requests().
+    """
+    url = search_pulls_url(client, org, created_before)
+    try:
+        if client.name == 'github':
+            return await get_search_pages_async(
+                client, url, parse=project_search_pull)
+        if created_before is None:
+            return await get_pages_async(
+                client, url, parse=project_search_pull)
+    except Exception as e:
+        print_request_error("search_pull_requests error: ", e)
+    return None
+
+
+async def get_pull_repos_async(client, org, repos=None):
+    """
+    Async engine variant of get_pull_repos().
+    """
+    pulls = await search_pull_requests_async(client, org)
+    if pulls is None:
+        return None
+    return [repo for repo, _ in group_by_repo(
+        pulls, repos or await get_repos_async(client, org))]
+
+
+async def get_pull_requests_created_before_async(client, org, repo, before):
+    """
+    Async engine variant of get_pull_requests_created_before().
+    """
+    if client.index is not None or (
+            client.store is not None and client.incremental):
+        return newest_first(
+            pull for pull in await get_pull_requests_async(
+                client, org, repo, 'open')
+            if created_before(pull, before))
+    pulls = []
+    try:
+        with span('pulls', hoster=client.name, org=org, repo=repo):
+            async for data in iter_pages_async(
+                    client, created_pulls_url(client, org, repo),
+                    parse=project_pull):
+                pulls.extend(
+                    pull for pull in data if created_before(pull, before))
+                if not created_before(data[-1], before):
+                    break
+    except Exception as e:
+        print_request_error("get_pull_requests error: ", e)
+        exit()
+    return newest_first(pulls)
+
+
+async def get_repos_async(client, org):
+    """
+    Get all Repositories of a Git organization
+    """
+    if client.index is not None:
+        return await client.index.get_async(
+            ('repos', org), lambda: fetch_repos_async(client, org))
+    return await fetch_repos_async(client, org)
+
+
+async def fetch_repos_async(client, org):
+    try:
+        with span('get_repos', hoster=client.name, org=org):
+            data = await get_pages_async(client, repos_url(client, org))
+    except Exception as e:
+        print_request_error("get_repos error: ", e)
+        return stored_repos(client, org)
+    return save_repos(client, org, data)
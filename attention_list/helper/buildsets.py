@@ -0,0 +1,69 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+
+def buildset_finished(buildset):
+    """
+    A buildset is finished once it and all of its builds have a result.
+    """
+    if not buildset.get('result'):
+        return False
+    return all(build.get('result') for build in buildset.get('builds', []))
+
+
+def buildset_uuid(url):
+    """
+    Return the uuid of a Zuul buildset URL, empty if the URL has none.
+    """
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+class BuildsetCache:
+    """
+    Memo of the Zuul buildsets of one Zuul instance, keyed by tenant and
+    uuid.
+
+    Buildsets are remembered for the run. Finished buildsets never change
+    and are also kept in the snapshot store across runs; buildsets still
+    in progress are fetched again by the next run.
+    """
+    def __init__(self, zuul_url, store=None):
+        self.zuul_url = zuul_url
+        self.store = store
+        self.memo = {}
+        self.lock = threading.Lock()
+
+    def get(self, tenant, uuid):
+        if not uuid:
+            return None
+        with self.lock:
+            buildset = self.memo.get((tenant, uuid))
+        if buildset is None and self.store is not None:
+            buildset = self.store.get_buildset(self.zuul_url, tenant, uuid)
+            if buildset is not None:
+                with self.lock:
+                    self.memo[(tenant, uuid)] = buildset
+        return buildset
+
+    def put(self, tenant, uuid, buildset):
+        if not uuid:
+            # Nothing to key the buildset by
+            return
+        with self.lock:
+            self.memo[(tenant, uuid)] = buildset
+        if self.store is not None and buildset_finished(buildset):
+            self.store.save_buildset(self.zuul_url, tenant, uuid, buildset)
@@ -0,0 +1,195 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+DEFAULT_CACHE_SIZE = 256
+# Headers describing the transfer of the body, the cache stores the decoded
+# body only.
+TRANSFER_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def default_cache_dir(name='http'):
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'attention-list', name)
+
+
+class CacheEntry:
+    """Cached response body with its validators"""
+    def __init__(self, key, headers, content):
+        self.key = key
+        self.headers = headers
+        self.content = content
+
+    def conditional_headers(self):
+        headers = {}
+        for name, value in self.headers.items():
+            if name.lower() == 'etag':
+                headers['If-None-Match'] = value
+            elif name.lower() == 'last-modified':
+                headers['If-Modified-Since'] = value
+        return headers
+
+    def merge_headers(self, res_headers):
+        """
+        Return the cached headers updated by those of a 304 response.
+        """
+        headers = dict(self.headers)
+        for name, value in res_headers.items():
+            if name.lower() not in TRANSFER_HEADERS:
+                headers[name] = value
+        return headers
+
+
+class HttpCache:
+    """
+    On-disk cache for conditional HTTP requests.
+
+    Responses carrying an ETag or Last-Modified header are stored per URL
+    and auth identity. A later request for the same URL sends the stored
+    validators, a 304 answer is then served from the cache. The cache size
+    is capped, least recently used entries are evicted first.
+    """
+    def __init__(self, path, max_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size * 1024 * 1024
+        self.lock = threading.Lock()
+        self.index = None
+        self.size = 0
+
+    def _load_index(self):
+        self.index = {}
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            if not name.endswith('.cache'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            self.index[name[:-6]] = [st.st_size, st.st_mtime]
+            self.size += st.st_size
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.cache')
+
+    def key(self, url, headers):
+        identity = headers.get('Authorization') or ''
+        return hashlib.sha256(
+            (identity + '\n' + url).encode('utf-8')).hexdigest()
+
+    def get(self, url, headers):
+        key = self.key(url, headers)
+        with self.lock:
+            if self.index is None:
+                self._load_index()
+            if key not in self.index:
+                return None
+        try:
+            with open(self._file(key), 'rb') as f:
+                meta = json.loads(f.readline())
+                content = f.read()
+            headers = meta['headers']
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing or corrupt, the response is requested and stored
+            # again
+            return None
+        return CacheEntry(key, headers, content)
+
+    def touch(self, entry):
+        """
+        Mark an entry as recently used.
+        """
+        now = time.time()
+        try:
+            os.utime(self._file(entry.key), (now, now))
+        except OSError:
+            pass
+        with self.lock:
+            if entry.key in self.index:
+                self.index[entry.key][1] = now
+
+    def store(self, url, headers, res_headers, content):
+        """
+        Store a response if it carries any validator.
+        """
+        names = [h.lower() for h in res_headers]
+        if 'etag' not in names and 'last-modified' not in names:
+            return
+        key = self.key(url, headers)
+        res_headers = dict(
+            (name, value) for name, value in res_headers.items()
+            if name.lower() not in TRANSFER_HEADERS)
+        meta = json.dumps({'url': url, 'headers': res_headers})
+        data = meta.encode('utf-8') + b'\n' + content
+        tmp = self._file(key) + '.' + str(threading.get_ident())
+        try:
+            with self.lock:
+                if self.index is None:
+                    self._load_index()
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._file(key))
+        except OSError as e:
+            logging.debug('HTTP cache write failed: %s', e)
+            return
+        with self.lock:
+            if key in self.index:
+                self.size -= self.index[key][0]
+            self.index[key] = [len(data), time.time()]
+            self.size += len(data)
+            self._evict()
+
+    def _evict(self):
+        if self.size <= self.max_size:
+            return
+        for key, (size, _) in sorted(
+                self.index.items(), key=lambda item: item[1][1]):
+            try:
+                os.remove(self._file(key))
+            except OSError:
+                pass
+            del self.index[key]
+            self.size -= size
+            if self.size <= self.max_size:
+                break
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_http_cache(args):
+    """
+    Return the shared HTTP cache configured by the command line arguments,
+    or None if caching is disabled.
+    """
+    if getattr(args, 'no_cache', True):
+        return None
+    path = getattr(args, 'cache_dir', None) or default_cache_dir()
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = HttpCache(
+                path=path,
+                max_size=(
+                    getattr(args, 'cache_size', None) or DEFAULT_CACHE_SIZE))
+        return _caches[path]
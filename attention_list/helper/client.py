@@ -0,0 +1,299 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from attention_list.helper.cache import get_http_cache
+from attention_list.helper.index import get_crawl_index
+from attention_list.helper.jsonlib import loads
+from attention_list.helper.metrics import endpoint_template
+from attention_list.helper.metrics import get_request_metrics
+from attention_list.helper.paginator import PAGE_SIZES
+from attention_list.helper.ratelimit import default_resource
+from attention_list.helper.ratelimit import get_rate_limiter
+from attention_list.helper.ratelimit import MAX_RETRIES
+from attention_list.helper.store import get_store
+from attention_list.helper.utils import get_headers
+from attention_list.helper.utils import ordered_map
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_ZUUL_URL = 'https://zuul.otc-service.com/'
+
+_clients = {}
+_clients_lock = threading.Lock()
+_unset = object()
+
+
+class JsonResponse:
+    """
+    Fully read response of a HosterClient, parsing its JSON body once with
+    the backend of jsonlib.
+    """
+    def __init__(self, status_code, reason, url, headers, content,
+                 from_cache=False):
+        self.status_code = status_code
+        self.reason = reason
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+        self._json = _unset
+
+    @classmethod
+    def from_response(cls, res):
+        return cls(
+            status_code=res.status_code,
+            reason=res.reason,
+            url=res.url,
+            headers=res.headers,
+            content=res.content)
+
+    def json(self, **kwargs):
+        if self._json is _unset:
+            self._json = loads(self.content)
+        return self._json
+
+
+class HosterClient:
+    """
+    HTTP client for one Git hoster or Zuul instance.
+
+    The client owns a pooled keep-alive session, so all requests against
+    the same API reuse a small number of TCP/TLS connections. Requests are
+    scheduled by the rate limiter shared by all clients of the same host
+    and token.
+    """
+    def __init__(
+            self,
+            name,
+            api_url,
+            headers=None,
+            pool_size=DEFAULT_POOL_SIZE,
+            connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+            read_timeout=DEFAULT_READ_TIMEOUT,
+            rate_limit=None,
+            cache=None,
+            store=None,
+            incremental=False,
+            page_size=None,
+            workers=1,
+            index=None):
+
+        self.name = name
+        self.api_url = api_url
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache
+        self.store = store
+        self.incremental = incremental
+        self.page_size = page_size
+        self.workers = workers
+        self.index = index
+        # Repositories whose Pull Requests an incremental run synchronized
+        self.synced = set()
+        self.limiter = get_rate_limiter(api_url, headers, rate=rate_limit)
+        self.metrics = get_request_metrics()
+        # Threads are only started once the pool is used
+        self.executor = (
+            ThreadPoolExecutor(max_workers=workers) if workers > 1 else None)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = endpoint_template(self.api_url, url)
+        resource = default_resource(endpoint)
+        wait_time = 0.0
+        for attempt in range(MAX_RETRIES + 1):
+            delay = self.limiter.reserve(resource)
+            if delay:
+                time.sleep(delay)
+                wait_time += delay
+            start = time.monotonic()
+            res = JsonResponse.from_response(
+                self.session.request(method, url=url, **kwargs))
+            size = len(res.content)
+            latency = time.monotonic() - start
+            if not self.limiter.update(
+                    res.status_code, res.headers, resource):
+                break
+        self.metrics.record(
+            self.name, method, endpoint,
+            res.status_code, size, latency,
+            retries=attempt, wait_time=wait_time)
+        return res
+
+    def get(self, url, **kwargs):
+        if self.cache is None:
+            return self.request('GET', url, **kwargs)
+
+        entry = self.cache.get(url, self.session.headers)
+        if entry:
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(entry.conditional_headers())
+            kwargs['headers'] = headers
+        res = self.request('GET', url, **kwargs)
+        if res.status_code == 304 and entry:
+            self.cache.touch(entry)
+            return self.cached_response(entry, res)
+        if res.status_code == 200:
+            self.cache.store(
+                url, self.session.headers, res.headers, res.content)
+        return res
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def cached_response(self, entry, res):
+        """
+        Turn a 304 response into the cached 200 response.
+        """
+        return JsonResponse(
+            status_code=200,
+            reason='OK',
+            url=res.url,
+            headers=CaseInsensitiveDict(entry.merge_headers(res.headers)),
+            content=entry.content,
+            from_cache=True)
+
+    def map(self, func, items):
+        """
+        Run func for every item on the client's own worker pool and yield
+        the results in the order of items. At most twice as many items as
+        there are workers are in flight, the rest waits until the results
+        are consumed. Only used for single requests, so it never waits on
+        other tasks of the same pool.
+        """
+        items = list(items)
+        if self.executor is None or len(items) <= 1:
+            for item in items:
+                yield func(item)
+            return
+        yield from ordered_map(self.executor, func, items, 2 * self.workers)
+
+    def with_index(self, index):
+        """
+        Return a view of the client for one run, using the crawl index of
+        a report run and sharing the session, worker pool and caches of the
+        client.
+        """
+        view = copy.copy(self)
+        view.index = index
+        view.synced = set()
+        return view
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.session.close()
+
+
+def client_options(config, args=None):
+    """
+    Return the connection options of a configured hoster or Zuul entry.
+
+    The pool is never smaller than twice the number of workers, the
+    repository workers and the page workers of a client, so parallel
+    requests don't have to wait for a free connection.
+    """
+    return {
+        'pool_size': max(
+            config.get('pool_size') or DEFAULT_POOL_SIZE,
+            2 * (getattr(args, 'workers', None) or 1)),
+        'connect_timeout': (
+            config.get('connect_timeout') or DEFAULT_CONNECT_TIMEOUT),
+        'read_timeout': config.get('read_timeout') or DEFAULT_READ_TIMEOUT,
+        'rate_limit': config.get('rate_limit'),
+    }
+
+
+def get_client(hoster, args):
+    """
+    Return the shared client of a configured git_hoster entry.
+
+    Clients are cached per hoster name, API URL and credentials, so every
+    lister talking to the same API shares one connection pool, and per the
+    options of the run they were created for (workers, HTTP cache,
+    snapshot store, --incremental), so runs of the daemon with other
+    options get their own client. A report
+    run gets a view of the client using its own crawl index, so does every
+    incremental run, to synchronize each repository once.
+    """
+    headers = get_headers(hoster=hoster['name'], args=args)
+    key = (hoster['name'], hoster['api_url'], headers['Authorization'])
+    cache = get_http_cache(args)
+    store = get_store(args)
+    incremental = getattr(args, 'incremental', False)
+    workers = getattr(args, 'workers', None) or 1
+    client_key = key + (cache, store, incremental, workers)
+    with _clients_lock:
+        if client_key not in _clients:
+            _clients[client_key] = HosterClient(
+                name=hoster['name'],
+                api_url=hoster['api_url'],
+                headers=headers,
+                cache=cache,
+                store=store,
+                incremental=incremental,
+                page_size=(
+                    hoster.get('page_size') or PAGE_SIZES[hoster['name']]),
+                workers=workers,
+                **client_options(hoster, args))
+        client = _clients[client_key]
+    index = get_crawl_index(key, args)
+    if index is not None or client.incremental:
+        return client.with_index(index)
+    return client
+
+
+def get_zuul_client(url=None, config=None, args=None):
+    """
+    Return the shared client of a Zuul instance.
+    """
+    url = url or DEFAULT_ZUUL_URL
+    store = get_store(args)
+    key = ('zuul', url, None, store, getattr(args, 'workers', None) or 1)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = HosterClient(
+                name='zuul',
+                api_url=url,
+                headers={'accept': 'application/json'},
+                store=store,
+                **client_options(config or {}, args))
+        return _clients[key]
+
+
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,305 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+
+REPOS_PER_PAGE = 25
+PULLS_PER_PAGE = 50
+BRANCHES_PER_PAGE = 100
+
+PULL_FIELDS = '''
+    number
+    title
+    url
+    createdAt
+    updatedAt
+    headRefName
+    headRefOid
+    commits(last: 1) {
+      nodes {
+        commit {
+          checkSuites(first: 10) {
+            nodes {
+              checkRuns(first: 10, filterBy: {checkType: LATEST}) {
+                nodes { databaseId name conclusion detailsUrl completedAt }
+              }
+            }
+          }
+        }
+      }
+    }
+'''
+
+ORG_QUERY = '''
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    repositories(first: %d, after: $cursor,
+                 orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        isArchived
+        pullRequests(states: OPEN, first: %d,
+                     orderBy: {field: CREATED_AT, direction: DESC}) {
+          pageInfo { hasNextPage endCursor }
+          nodes { %s }
+        }
+      }
+    }
+  }
+}
+''' % (REPOS_PER_PAGE, PULLS_PER_PAGE, PULL_FIELDS)
+
+REPO_QUERY = '''
+query($org: String!, $repo: String!, $cursor: String) {
+  repository(owner: $org, name: $repo) {
+    pullRequests(states: OPEN, first: %d, after: $cursor,
+                 orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { %s }
+    }
+  }
+}
+''' % (PULLS_PER_PAGE, PULL_FIELDS)
+
+BRANCHES_QUERY = '''
+query($org: String!, $repo: String!, $cursor: String) {
+  repository(owner: $org, name: $repo) {
+    refs(refPrefix: "refs/heads/", first: %d, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        target { oid ... on Commit { committedDate } }
+      }
+    }
+  }
+}
+''' % BRANCHES_PER_PAGE
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def graphql_url(hoster):
+    """
+    GraphQL endpoint of a GitHub hoster, api.github.com/graphql by default.
+    """
+    if hoster.get('graphql_url'):
+        return hoster['graphql_url']
+    return hoster['api_url'] + 'graphql'
+
+
+def parse_pull(node):
+    """
+    Convert a GraphQL Pull Request node into the REST shaped pull and
+    check-runs data used by PrLister.parse_failed_commit().
+    """
+    pull = {
+        'number': node['number'],
+        'title': node['title'],
+        'state': 'open',
+        'url': node['url'],
+        'html_url': node['url'],
+        'created_at': node['createdAt'],
+        'updated_at': node['updatedAt'],
+        'head': {'ref': node['headRefName'], 'sha': node['headRefOid']},
+    }
+    # Like the REST check-runs listing, only the latest run of every name
+    # is kept, e.g. after a re-run in a new suite, newest first
+    latest = {}
+    for commit in node['commits']['nodes']:
+        for suite in commit['commit']['checkSuites']['nodes']:
+            for run in suite['checkRuns']['nodes']:
+                name = run['name']
+                if (name not in latest
+                        or run['databaseId'] > latest[name]['id']):
+                    conclusion = run['conclusion']
+                    latest[name] = {
+                        'id': run['databaseId'],
+                        'name': name,
+                        'conclusion': (
+                            conclusion.lower() if conclusion else None),
+                        'details_url': run['detailsUrl'],
+                        'completed_at': run['completedAt'],
+                    }
+    check_runs = sorted(
+        latest.values(), key=lambda run: run['id'], reverse=True)
+    return pull, {'check_runs': check_runs}
+
+
+def query_data(res):
+    if res.status_code != 200:
+        raise GraphQLError(
+            'GraphQL request failed: ' + str(res.status_code)
+            + ' | ' + str(res.reason))
+    body = res.json()
+    if body.get('errors'):
+        raise GraphQLError(
+            'GraphQL query failed: ' + str(body['errors']))
+    return body['data']
+
+
+def parse_branch(node):
+    """
+    Convert a GraphQL branch node into the REST shape of a GitHub branch,
+    with the commit date the REST listing lacks.
+    """
+    target = node['target']
+    return {
+        'name': node['name'],
+        'commit': {
+            'sha': target['oid'],
+            'commit': {'committer': {'date': target.get('committedDate')}},
+        },
+    }
+
+
+def branches_query(org, repo, cursor=None):
+    return {
+        'query': BRANCHES_QUERY,
+        'variables': {'org': org, 'repo': repo, 'cursor': cursor}}
+
+
+def open_pulls_query(org, repo=None, cursor=None):
+    if repo:
+        return {
+            'query': REPO_QUERY,
+            'variables': {'org': org, 'repo': repo, 'cursor': cursor}}
+    return {
+        'query': ORG_QUERY,
+        'variables': {'org': org, 'cursor': cursor}}
+
+
+def get_repo_open_pulls(client, url, org, repo, cursor=None):
+    """
+    Return (pull, check-runs) tuples of the open Pull Requests of a
+    repository, starting after the cursor.
+    """
+    pulls = []
+    while True:
+        res = client.post(url, json=open_pulls_query(org, repo, cursor))
+        connection = query_data(res)['repository']['pullRequests']
+        pulls.extend(parse_pull(node) for node in connection['nodes'])
+        if not connection['pageInfo']['hasNextPage']:
+            return pulls
+        cursor = connection['pageInfo']['endCursor']
+
+
+def get_open_pulls(client, url, org, repos=None):
+    """
+    Collect the open Pull Requests of an organization with the check-runs of
+    their head commits.
+
+    Returns a list of (repo, [(pull, check-runs), ...]) tuples. If repos is
+    empty, all non-archived repositories of the organization are paged in
+    one query, otherwise the given repositories are queried one by one.
+    """
+    result = []
+    if repos:
+        for repo in repos:
+            result.append((repo, get_repo_open_pulls(client, url, org, repo)))
+        return result
+
+    cursor = None
+    while True:
+        res = client.post(url, json=open_pulls_query(org, cursor=cursor))
+        connection = query_data(res)['organization']['repositories']
+        for node in connection['nodes']:
+            if node['isArchived']:
+                continue
+            prs = node['pullRequests']
+            pulls = [parse_pull(pr) for pr in prs['nodes']]
+            if prs['pageInfo']['hasNextPage']:
+                pulls.extend(get_repo_open_pulls(
+                    client, url, org, node['name'],
+                    prs['pageInfo']['endCursor']))
+            result.append((node['name'], pulls))
+        if not connection['pageInfo']['hasNextPage']:
+            return result
+        cursor = connection['pageInfo']['endCursor']
+
+
+def get_dated_branches(client, url, org, repo):
+    """
+    Collect the branches of a repository with the dates of their commits,
+    in the REST shape, see parse_branch().
+    """
+    branches = []
+    cursor = None
+    while True:
+        res = client.post(url, json=branches_query(org, repo, cursor))
+        connection = query_data(res)['repository']['refs']
+        branches.extend(parse_branch(node) for node in connection['nodes'])
+        if not connection['pageInfo']['hasNextPage']:
+            return branches
+        cursor = connection['pageInfo']['endCursor']
+
+
+async def get_repo_open_pulls_async(client, url, org, repo, cursor=None):
+    pulls = []
+    while True:
+        res = await client.post(url, json=open_pulls_query(org, repo, cursor))
+        connection = query_data(res)['repository']['pullRequests']
+        pulls.extend(parse_pull(node) for node in connection['nodes'])
+        if not connection['pageInfo']['hasNextPage']:
+            return pulls
+        cursor = connection['pageInfo']['endCursor']
+
+
+async def get_open_pulls_async(client, url, org, repos=None):
+    """
+    Async engine variant of get_open_pulls().
+    """
+    result = []
+    if repos:
+        pulls = await asyncio.gather(*[
+            get_repo_open_pulls_async(client, url, org, repo)
+            for repo in repos])
+        return list(zip(repos, pulls))
+
+    cursor = None
+    while True:
+        res = await client.post(url, json=open_pulls_query(org, cursor=cursor))
+        connection = query_data(res)['organization']['repositories']
+        for node in connection['nodes']:
+            if node['isArchived']:
+                continue
+            prs = node['pullRequests']
+            pulls = [parse_pull(pr) for pr in prs['nodes']]
+            if prs['pageInfo']['hasNextPage']:
+                pulls.extend(await get_repo_open_pulls_async(
+                    client, url, org, node['name'],
+                    prs['pageInfo']['endCursor']))
+            result.append((node['name'], pulls))
+        if not connection['pageInfo']['hasNextPage']:
+            return result
+        cursor = connection['pageInfo']['endCursor']
+
+
+async def get_dated_branches_async(client, url, org, repo):
+    """
+    Async engine variant of get_dated_branches().
+    """
+    branches = []
+    cursor = None
+    while True:
+        res = await client.post(url, json=branches_query(org, repo, cursor))
+        connection = query_data(res)['repository']['refs']
+        branches.extend(parse_branch(node) for node in connection['nodes'])
+        if not connection['pageInfo']['hasNextPage']:
+            return branches
+        cursor = connection['pageInfo']['endCursor']
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+
+
+_indexes_lock = threading.Lock()
+
+
+class CrawlIndex:
+    """
+    In-memory index of the repositories and Pull Requests crawled from one
+    Git hoster.
+
+    The report command evaluates several checks in one run, every
+    repository list and Pull Request list is fetched once and then served
+    from the index to all checks.
+    """
+    def __init__(self):
+        self.data = {}
+        self.locks = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """
+        Return the indexed value of key, fetch() it on first use.
+        """
+        with self.lock:
+            if key in self.data:
+                return self.data[key]
+            lock = self.locks.setdefault(key, threading.Lock())
+        with lock:
+            value = self.data.get(key)
+            if value is None:
+                value = fetch()
+                self.data[key] = value
+        return value
+
+    async def get_async(self, key, fetch):
+        """
+        Async engine variant of get(), fetch is a coroutine function.
+        """
+        if key in self.data:
+            return self.data[key]
+        if key not in self.pending:
+            self.pending[key] = asyncio.ensure_future(fetch())
+        value = await self.pending[key]
+        self.data[key] = value
+        self.pending.pop(key, None)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.locks.clear()
+
+    def open_pulls(self, org, repo, state):
+        """
+        Return the open Pull Requests of a repository from an already
+        indexed list of all Pull Requests, or None.
+        """
+        pulls = self.data.get(('pulls', org, repo, 'all'))
+        if state != 'open' or pulls is None:
+            return None
+        return [pr for pr in pulls if pr['state'] == 'open']
+
+
+def get_crawl_index(key, args):
+    """
+    Return the crawl index of a hoster for one run of the report command,
+    or None outside of it.
+
+    Every run keeps its own indexes in args.crawl_indexes, so concurrent
+    runs, e.g. of the served reports, never share or reset each other's
+    data.
+    """
+    indexes = getattr(args, 'crawl_indexes', None)
+    if indexes is None:
+        return None
+    with _indexes_lock:
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = CrawlIndex()
+        return index
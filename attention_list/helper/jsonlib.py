@@ -0,0 +1,51 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+JSON backend of the API responses, the snapshot store and the output.
+
+orjson is used to parse JSON if installed (pip install attention-list[fast]),
+it is several times faster than the json module of the standard library,
+which matters for large Pull Request pages and snapshots. JSON is always
+written by the json module, so the output does not depend on the installed
+packages.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """
+    Parse a JSON document given as bytes or str.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, default=None):
+    """
+    Serialize obj to a JSON str, default converts objects json can not
+    serialize itself.
+    """
+    return json.dumps(obj, default=default, check_circular=False)
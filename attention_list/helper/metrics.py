@@ -0,0 +1,260 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+
+# Upper bounds of the latency histogram in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# The path segment following one of these names is a parameter
+PARAMETERS = {
+    'orgs': '{org}',
+    'users': '{org}',
+    'tenant': '{tenant}',
+    'commits': '{sha}',
+    'buildset': '{uuid}',
+    'branches': '{branch}',
+}
+# Paths below repos/ which are not a repository
+GLOBAL_REPOS_PATHS = ('repos/search', 'repos/issues/search')
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def endpoint_template(api_url, url):
+    """
+    Return the path of url relative to the API as a template, e.g.
+    repos/{org}/{repo}/pulls, so all requests of one endpoint are counted
+    together.
+    """
+    path = urlparse(url).path
+    base = urlparse(api_url).path
+    if path.startswith(base):
+        path = path[len(base):]
+    path = path.strip('/')
+    if path in GLOBAL_REPOS_PATHS:
+        return path
+    segments = path.split('/')
+    if segments[0] == 'repos' and len(segments) >= 3:
+        segments[1:3] = ['{org}', '{repo}']
+    for i in range(1, len(segments)):
+        if segments[i - 1] in PARAMETERS and segments[i] not in (
+                '{org}', '{repo}'):
+            segments[i] = PARAMETERS[segments[i - 1]]
+        elif segments[i].isdigit():
+            segments[i] = '{number}'
+    return '/'.join(segments)
+
+
+class EndpointStats:
+    """
+    Counters of the requests sent to one endpoint of a hoster.
+    """
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.wait_time = 0.0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses = {}
+
+    def add(self, status, size, latency, retries, wait_time):
+        self.count += 1
+        self.bytes += size
+        self.retries += retries
+        self.wait_time += wait_time
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                break
+        else:
+            i = len(LATENCY_BUCKETS)
+        self.buckets[i] += 1
+        # A 304 answers a conditional request of the HTTP cache
+        if status == 304:
+            self.cache_hits += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def percentile(self, fraction):
+        """
+        Return the upper bound of the histogram bucket holding the given
+        fraction of requests, the maximum for the last bucket.
+        """
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= fraction * self.count:
+                if i < len(LATENCY_BUCKETS):
+                    return min(LATENCY_BUCKETS[i], self.latency_max)
+                break
+        return self.latency_max
+
+
+class RequestMetrics:
+    """
+    Metrics of all outbound API requests of the process, per hoster,
+    method and endpoint template.
+
+    Recorded by the sync and async clients around every request, including
+    the retries of rate limited requests.
+    """
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def record(self, hoster, method, endpoint, status, size, latency,
+               retries=0, wait_time=0.0):
+        key = (hoster, method, endpoint)
+        with self.lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            stats.add(status, size, latency, retries, wait_time)
+
+    def items(self):
+        with self.lock:
+            return sorted(self.endpoints.items())
+
+    def summary(self):
+        """
+        Return the crawl statistics as a text table.
+        """
+        lines = ['%-7s %-4s %-48s %8s %10s %8s %8s %8s %7s %6s %8s  %s' % (
+            'hoster', 'meth', 'endpoint', 'requests', 'KB', 'avg ms',
+            'p95 ms', 'max ms', 'retries', 'cached', 'wait s', 'statuses')]
+        total = EndpointStats()
+        for (hoster, method, endpoint), s in self.items():
+            lines.append(
+                '%-7s %-4s %-48s %8d %10.1f %8.0f %8.0f %8.0f %7d %6d '
+                '%8.1f  %s' % (
+                    hoster[:7], method, endpoint[:48], s.count,
+                    s.bytes / 1024.0, 1000 * s.latency_sum / s.count,
+                    1000 * s.percentile(0.95), 1000 * s.latency_max,
+                    s.retries, s.cache_hits, s.wait_time,
+                    ' '.join(
+                        '%s:%d' % item
+                        for item in sorted(s.statuses.items()))))
+            total.count += s.count
+            total.bytes += s.bytes
+            total.retries += s.retries
+            total.cache_hits += s.cache_hits
+            total.wait_time += s.wait_time
+            total.latency_sum += s.latency_sum
+        lines.append(
+            '%-61s %8d %10.1f %8s %8s %8s %7d %6d %8.1f' % (
+                'total', total.count, total.bytes / 1024.0, '', '', '',
+                total.retries, total.cache_hits, total.wait_time))
+        return '\n'.join(lines)
+
+    def prometheus(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        def labels(hoster, method, endpoint, **extra):
+            values = dict(hoster=hoster, method=method, endpoint=endpoint)
+            values.update(extra)
+            return '{' + ','.join(
+                '%s="%s"' % (name, escape(value))
+                for name, value in values.items()) + '}'
+
+        counters = (
+            ('attention_list_response_bytes_total',
+             'Bytes of the response bodies.', 'bytes'),
+            ('attention_list_request_retries_total',
+             'Requests sent again after hitting the rate limit.',
+             'retries'),
+            ('attention_list_cache_hits_total',
+             'Requests answered from the HTTP cache with 304 Not Modified.',
+             'cache_hits'),
+            ('attention_list_rate_limit_wait_seconds_total',
+             'Seconds requests waited for the rate limiter.', 'wait_time'),
+        )
+        items = self.items()
+        lines = [
+            '# HELP attention_list_requests_total Outbound API requests.',
+            '# TYPE attention_list_requests_total counter',
+        ]
+        for key, s in items:
+            for status, n in sorted(s.statuses.items()):
+                lines.append('attention_list_requests_total%s %d' % (
+                    labels(*key, status=str(status)), n))
+        for name, help, attr in counters:
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s counter' % name)
+            for key, s in items:
+                lines.append('%s%s %s' % (
+                    name, labels(*key), number(getattr(s, attr))))
+        name = 'attention_list_request_duration_seconds'
+        lines.append('# HELP %s Latency of the requests.' % name)
+        lines.append('# TYPE %s histogram' % name)
+        for key, s in items:
+            seen = 0
+            for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), s.buckets):
+                seen += n
+                lines.append('%s_bucket%s %d' % (
+                    name, labels(*key, le=str(bound)), seen))
+            lines.append('%s_sum%s %s' % (
+                name, labels(*key), number(s.latency_sum)))
+            lines.append('%s_count%s %d' % (name, labels(*key), s.count))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Write the Prometheus metrics to a file, replacing it atomically so
+        a textfile collector never reads a partial file. Every writer uses
+        its own temporary file, e.g. the report threads of the daemon.
+        """
+        fd, tmp = tempfile.mkstemp(
+            dir=os.path.dirname(path) or '.',
+            prefix='.' + os.path.basename(path) + '.',
+            suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.prometheus())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def get_request_metrics():
+    """
+    Return the request metrics shared by all clients of the process.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = RequestMetrics()
+        return _metrics
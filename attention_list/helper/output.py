@@ -0,0 +1,176 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+
+
+STREAM_FORMATS = ['ndjson', 'yaml-stream']
+
+
+_yaml_dumper = None
+
+
+class Record:
+    """
+    Base class of the findings.
+
+    The fields are declared in __slots__ in output order, so a finding
+    holds its values without a dictionary of its own. Records are turned
+    into dictionaries only by the JSON encoder or YAML dumper writing
+    them. Fields listed in optional come last and are left out while they
+    are None.
+    """
+    __slots__ = ()
+    optional = ()
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def to_dict(self):
+        data = {
+            name: getattr(self, name) for name in self.__slots__
+            if name not in self.optional}
+        for name in self.optional:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        return data
+
+
+def to_record(item):
+    """
+    Convert a finding object into its dictionary representation.
+    """
+    if isinstance(item, Record):
+        return item.to_dict()
+    if isinstance(item, dict) or not hasattr(item, '__dict__'):
+        return item
+    return vars(item)
+
+
+def encode_record(obj):
+    """
+    Fallback of the JSON encoder for the records of a result.
+    """
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if hasattr(obj, '__dict__'):
+        return vars(obj)
+    raise TypeError(
+        'Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+def dump_json(data):
+    """
+    Serialize a result in one pass, records are converted one by one
+    while they are encoded.
+    """
+    # Not imported at start-up, the JSON backend may take a while to load
+    from attention_list.helper.jsonlib import dumps
+    return dumps(data, default=encode_record)
+
+
+def dump_yaml(data, **kwargs):
+    """
+    YAML counterpart of dump_json().
+    """
+    global _yaml_dumper
+    import yaml
+    if _yaml_dumper is None:
+        # The libyaml dumper writes the same documents several times faster
+        class RecordDumper(getattr(yaml, 'CDumper', yaml.Dumper)):
+            pass
+
+        RecordDumper.add_multi_representer(
+            Record,
+            lambda dumper, record: dumper.represent_dict(record.to_dict()))
+        _yaml_dumper = RecordDumper
+    return yaml.dump(data, Dumper=_yaml_dumper, **kwargs)
+
+
+class StreamWriter:
+    """
+    Writer of the streaming output formats.
+
+    Every finding is written as soon as it is found, as one JSON object per
+    line (ndjson) or as one YAML document (yaml-stream). Within a report,
+    every record carries the name of its list.
+    """
+    def __init__(self, fmt, out=None):
+        self.fmt = fmt
+        self.out = out or sys.stdout
+        self.report = None
+
+    def write(self, record):
+        if self.report:
+            record = dict({'report': self.report}, **to_record(record))
+        if self.fmt == 'ndjson':
+            self.out.write(dump_json(record) + '\n')
+        else:
+            self.out.write(dump_yaml(record, explicit_start=True))
+        self.out.flush()
+
+
+class FindingStream:
+    """
+    Stand-in for the result list of a lister in the streaming formats.
+
+    Findings are written instead of collected, only their number is kept
+    for the meta record written last by close().
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, item):
+        if not isinstance(item, Record):
+            item = to_record(item)
+            if not isinstance(item, dict):
+                item = {'data': item}
+        self.writer.write(item)
+        self.count += 1
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def close(self):
+        meta = {'count': self.count}
+        self.writer.write({'meta': meta})
+        return {'meta': meta, 'data': []}
+
+
+def get_stream_writer(args):
+    """
+    Return the writer of a streaming output format, or None if the result
+    is printed as one document at the end.
+    """
+    if getattr(args, 'format', None) in STREAM_FORMATS:
+        return StreamWriter(args.format)
+    return None
+
+
+def new_findings(args):
+    """
+    Return an empty result list of a lister, a FindingStream if the output
+    is streamed.
+    """
+    writer = getattr(args, 'writer', None)
+    if writer is None:
+        return []
+    return FindingStream(writer)
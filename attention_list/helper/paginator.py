@@ -0,0 +1,261 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import math
+import re
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+# Largest page size accepted by the hosters, Gitea caps at its
+# MAX_RESPONSE_ITEMS setting which defaults to 50.
+PAGE_SIZES = {'gitea': 50, 'github': 100}
+PAGE_SIZE_PARAMS = {'gitea': 'limit', 'github': 'per_page'}
+# The GitHub search API returns at most 1000 results per query.
+SEARCH_LIMIT = 1000
+
+
+def page_url(client, url, page):
+    sep = '&' if '?' in url else '?'
+    return (
+        url
+        + sep
+        + PAGE_SIZE_PARAMS[client.name]
+        + '='
+        + str(client.page_size)
+        + '&page='
+        + str(page))
+
+
+def page_data(res, parse=None):
+    """
+    Return the items of a listing page, converted by parse if given.
+    """
+    data = res.json()
+    if not isinstance(data, list):
+        raise Exception(
+            'Unexpected listing response: '
+            + str(res.status_code)
+            + ' | '
+            + str(res.reason))
+    if parse is not None:
+        return [parse(item) for item in data]
+    return data
+
+
+def search_data(res, parse=None):
+    """
+    Return the total count and the items of a search result page.
+    """
+    data = res.json()
+    if not isinstance(data, dict) or 'items' not in data:
+        raise Exception(
+            'Unexpected search response: '
+            + str(res.status_code)
+            + ' | '
+            + str(res.reason))
+    items = data['items']
+    if parse is not None:
+        items = [parse(item) for item in items]
+    return data.get('total_count', len(items)), items
+
+
+def last_page(hoster, res, first_page_size):
+    """
+    Return the number of pages announced by the first page, or None if the
+    response does not tell.
+    """
+    total = res.headers.get('X-Total-Count')
+    if total is not None and first_page_size:
+        return max(1, math.ceil(int(total) / first_page_size))
+    link = res.headers.get('Link')
+    if link:
+        match = re.search(r'<([^>]*)>\s*;\s*rel="last"', link)
+        if not match:
+            # GitHub omits rel="last" on the last page itself
+            return 1
+        query = parse_qs(urlparse(match.group(1)).query)
+        return int(query['page'][0])
+    if hoster == 'github':
+        # GitHub sends a Link header whenever there is more than one page
+        return 1
+    return None
+
+
+def is_last_page(client, res, data, page_size):
+    """
+    Tell whether a page of iter_pages() is the last one.
+
+    The hoster may return fewer items than requested on every page (Gitea
+    caps at MAX_RESPONSE_ITEMS), so the size of the first page is the
+    reference for the following ones. A first page shorter than requested
+    is only the last one if the response says so.
+    """
+    if not data:
+        return True
+    if page_size is not None:
+        return len(data) < page_size
+    return (len(data) < client.page_size
+            and last_page(client.name, res, len(data)) == 1)
+
+
+def iter_pages(client, url, start=1, page_size=None, parse=None):
+    """
+    Yield the items of one page after another, until an empty page or one
+    shorter than the first.
+
+    Used where pages can not be fetched in advance, e.g. to stop as soon as
+    the items get too old.
+    """
+    page = start
+    while True:
+        res = client.get(page_url(client, url, page))
+        data = page_data(res, parse)
+        if data:
+            yield data
+        if is_last_page(client, res, data, page_size):
+            return
+        page_size = page_size or len(data)
+        page += 1
+
+
+def iter_listing(client, url, parse=None):
+    """
+    Yield the pages of a listing URL, each as a list of items.
+
+    The first page tells the number of pages (X-Total-Count on Gitea, the
+    Link header on GitHub), the remaining pages are then fetched
+    concurrently on the client's worker pool. Pages are yielded in order
+    while the following ones are still fetched; items are converted by
+    parse as soon as their page arrives, so only a window of raw pages is
+    held in memory.
+    """
+    res = client.get(page_url(client, url, 1))
+    data = page_data(res, parse)
+    if not data:
+        return
+    size = len(data)
+    last = last_page(client.name, res, size)
+    yield data
+    if last is None:
+        yield from iter_pages(client, url, start=2, page_size=size,
+                              parse=parse)
+        return
+    urls = [page_url(client, url, page) for page in range(2, last + 1)]
+    for res in client.map(client.get, urls):
+        data = page_data(res, parse)
+        yield data
+    if len(data) >= size and last > 1:
+        # The listing grew while it was fetched
+        yield from iter_pages(client, url, start=last + 1, page_size=size,
+                              parse=parse)
+
+
+def get_pages(client, url, parse=None):
+    """
+    Return the items of all pages of a listing URL.
+    """
+    return [item for data in iter_listing(client, url, parse) for item in data]
+
+
+def get_search_pages(client, url, parse=None):
+    """
+    Return the items of all pages of a search URL, or None if the search
+    finds more than SEARCH_LIMIT items and can not return all of them.
+    """
+    total, items = search_data(client.get(page_url(client, url, 1)), parse)
+    if total > SEARCH_LIMIT:
+        return None
+    if not items or total <= len(items):
+        return items
+    last = math.ceil(total / len(items))
+    urls = [page_url(client, url, page) for page in range(2, last + 1)]
+    for res in client.map(client.get, urls):
+        items.extend(search_data(res, parse)[1])
+    return items
+
+
+async def iter_pages_async(client, url, start=1, page_size=None, parse=None):
+    page = start
+    while True:
+        res = await client.get(page_url(client, url, page))
+        data = page_data(res, parse)
+        if data:
+            yield data
+        if is_last_page(client, res, data, page_size):
+            return
+        page_size = page_size or len(data)
+        page += 1
+
+
+async def iter_listing_async(client, url, parse=None):
+    """
+    Async engine variant of iter_listing(), the remaining pages are fetched
+    in windows of the client's pool size.
+    """
+    res = await client.get(page_url(client, url, 1))
+    data = page_data(res, parse)
+    if not data:
+        return
+    size = len(data)
+    last = last_page(client.name, res, size)
+    yield data
+    if last is None:
+        async for data in iter_pages_async(
+                client, url, start=2, page_size=size, parse=parse):
+            yield data
+        return
+    window = max(1, client.pool_size or 1)
+    for first in range(2, last + 1, window):
+        responses = await asyncio.gather(*[
+            client.get(page_url(client, url, page))
+            for page in range(first, min(first + window, last + 1))])
+        for res in responses:
+            data = page_data(res, parse)
+            yield data
+    if len(data) >= size and last > 1:
+        async for data in iter_pages_async(
+                client, url, start=last + 1, page_size=size, parse=parse):
+            yield data
+
+
+async def get_pages_async(client, url, parse=None):
+    """
+    Async engine variant of get_pages().
+    """
+    items = []
+    async for data in iter_listing_async(client, url, parse):
+        items.extend(data)
+    return items
+
+
+async def get_search_pages_async(client, url, parse=None):
+    """
+    Async engine variant of get_search_pages().
+    """
+    res = await client.get(page_url(client, url, 1))
+    total, items = search_data(res, parse)
+    if total > SEARCH_LIMIT:
+        return None
+    if not items or total <= len(items):
+        return items
+    last = math.ceil(total / len(items))
+    responses = await asyncio.gather(*[
+        client.get(page_url(client, url, page))
+        for page in range(2, last + 1)])
+    for res in responses:
+        items.extend(search_data(res, parse)[1])
+    return items
@@ -0,0 +1,199 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import email.utils
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# Retries of a request rejected because of a rate limit
+MAX_RETRIES = 5
+RATE_LIMITED = (403, 429)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def retry_after(value):
+    """
+    Return the seconds of a Retry-After header, given as delay or HTTP date.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        date = email.utils.parsedate_to_datetime(value)
+        return date.timestamp() - time.time()
+
+
+def default_resource(endpoint):
+    """
+    Return the rate limit resource of an endpoint template, used until a
+    response names it with X-RateLimit-Resource.
+    """
+    segments = endpoint.split('/')
+    if segments[-1] == 'graphql':
+        return 'graphql'
+    if segments[0] == 'search':
+        return 'search'
+    return 'core'
+
+
+class Budget:
+    """
+    Budget of one rate limit resource announced by the X-RateLimit-*
+    headers. GitHub counts e.g. core, search and graphql requests
+    separately.
+    """
+    def __init__(self, resource):
+        self.resource = resource
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self.paused_until = 0
+
+
+class RateLimiter:
+    """
+    Request budget of one API host and token.
+
+    Requests are spread by a token bucket of rate requests per second
+    (unlimited if not set). The budget announced by the X-RateLimit-*
+    headers is counted down locally per resource for requests in flight;
+    once it is used up, requests against that resource pause until the
+    limit is reset. If the API asks for it with Retry-After, all requests
+    pause.
+    """
+    def __init__(self, name, rate=None, burst=None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1, rate or 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.budgets = {}
+        # Resource named by the responses for each default resource
+        self.resources = {}
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def budget(self, resource):
+        resource = self.resources.get(resource, resource)
+        budget = self.budgets.get(resource)
+        if budget is None:
+            budget = self.budgets[resource] = Budget(resource)
+        return budget
+
+    def pause(self, seconds, reason, budget=None):
+        """
+        Pause the requests against one budget, or all requests.
+        """
+        target = budget or self
+        until = time.monotonic() + seconds
+        if until > target.paused_until:
+            logging.warning(
+                '%s: %s, pausing %s requests for %d seconds',
+                self.name, reason, budget.resource if budget else 'all',
+                seconds)
+            target.paused_until = until
+
+    def reserve(self, resource='core'):
+        """
+        Reserve the budget of one request and return the seconds to wait
+        before sending it.
+        """
+        with self.lock:
+            now = time.monotonic()
+            budget = self.budget(resource)
+            if budget.remaining is not None:
+                if budget.remaining <= 0:
+                    self.pause(
+                        max(1, budget.reset - time.time() + 1),
+                        'rate limit of %s requests used up' % budget.limit,
+                        budget)
+                    # The real budget is known again with the next response
+                    budget.remaining = None
+                else:
+                    budget.remaining -= 1
+            delay = max(
+                0, self.paused_until - now, budget.paused_until - now)
+            if self.rate:
+                self.tokens = min(
+                    self.burst,
+                    self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1
+                if self.tokens < 0:
+                    delay = max(delay, -self.tokens / self.rate)
+            return delay
+
+    def update(self, status_code, headers, resource='core'):
+        """
+        Record the budget reported by a response.
+
+        Returns True if the request was rejected because of the rate limit
+        and has to be sent again.
+        """
+        with self.lock:
+            if headers.get('X-RateLimit-Resource'):
+                self.resources[resource] = headers['X-RateLimit-Resource']
+            budget = self.budget(resource)
+            remaining = headers.get('X-RateLimit-Remaining')
+            reset = headers.get('X-RateLimit-Reset')
+            if remaining is not None and reset is not None:
+                remaining = int(remaining)
+                reset = int(reset)
+                if (budget.remaining is None or budget.reset is None
+                        or reset > budget.reset):
+                    budget.remaining = remaining
+                else:
+                    # Requests still in flight are not counted yet
+                    budget.remaining = min(budget.remaining, remaining)
+                budget.reset = reset
+                budget.limit = headers.get('X-RateLimit-Limit')
+                logging.debug(
+                    '%s: %s of %s %s requests left, reset in %d seconds',
+                    self.name, remaining, budget.limit, budget.resource,
+                    reset - time.time())
+            if status_code not in RATE_LIMITED:
+                return False
+            if headers.get('Retry-After') is not None:
+                self.pause(
+                    max(1, retry_after(headers['Retry-After'])),
+                    'secondary rate limit hit')
+                return True
+            if remaining == 0:
+                self.pause(
+                    max(1, reset - time.time() + 1),
+                    'rate limit of %s requests used up' % budget.limit,
+                    budget)
+                return True
+            # A plain 403 is a permission error
+            return False
+
+
+def get_rate_limiter(api_url, headers=None, rate=None, burst=None):
+    """
+    Return the shared rate limiter of an API host and token.
+
+    Budgets are counted per token, so all clients using the same
+    credentials against the same host, sync or async, share one limiter.
+    """
+    host = urlparse(api_url).netloc
+    key = (host, (headers or {}).get('Authorization'))
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(host, rate=rate, burst=burst)
+        return _limiters[key]
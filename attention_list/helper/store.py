@@ -0,0 +1,314 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime as dt
+import os
+import sqlite3
+import threading
+
+import dateutil.parser
+
+from attention_list.helper.cache import default_cache_dir
+from attention_list.helper.jsonlib import dumps
+from attention_list.helper.jsonlib import loads
+
+
+REPOS_TABLE = '''
+CREATE TABLE IF NOT EXISTS repos (
+    api_url TEXT, org TEXT, name TEXT, pushed_at TEXT,
+    PRIMARY KEY (api_url, org, name));
+'''
+
+SCHEMA = REPOS_TABLE + '''
+CREATE TABLE IF NOT EXISTS pulls (
+    api_url TEXT, org TEXT, repo TEXT, number INTEGER, state TEXT,
+    updated_at TEXT, data TEXT,
+    PRIMARY KEY (api_url, org, repo, number));
+CREATE TABLE IF NOT EXISTS branches (
+    api_url TEXT, org TEXT, repo TEXT, name TEXT, data TEXT,
+    PRIMARY KEY (api_url, org, repo, name));
+CREATE TABLE IF NOT EXISTS final_statuses (
+    api_url TEXT, org TEXT, repo TEXT, sha TEXT, updated_at TEXT, data TEXT,
+    PRIMARY KEY (api_url, org, repo, sha));
+CREATE TABLE IF NOT EXISTS buildsets (
+    zuul_url TEXT, tenant TEXT, uuid TEXT, data TEXT,
+    PRIMARY KEY (zuul_url, tenant, uuid));
+CREATE TABLE IF NOT EXISTS links (
+    api_url TEXT, org TEXT, ref_repo TEXT, repo TEXT, number INTEGER,
+    ref_number INTEGER, data TEXT,
+    PRIMARY KEY (api_url, org, ref_repo, repo, number));
+CREATE TABLE IF NOT EXISTS watermarks (
+    api_url TEXT, org TEXT, repo TEXT, kind TEXT, value TEXT,
+    PRIMARY KEY (api_url, org, repo, kind));
+'''
+
+# Version 1 stores the timestamps of pulls, final_statuses and watermarks
+# in UTC, see utc_timestamp. Version 2 stores the push time of the
+# repositories and drops the raw commit statuses, only the final ones are
+# read.
+SCHEMA_VERSION = 2
+
+MIGRATIONS = {
+    1: '''
+UPDATE pulls SET updated_at=utc_timestamp(updated_at);
+UPDATE final_statuses SET updated_at=utc_timestamp(updated_at);
+UPDATE watermarks SET value=utc_timestamp(value);
+''',
+    2: '''
+DROP TABLE repos;
+DROP TABLE IF EXISTS statuses;
+''' + REPOS_TABLE,
+}
+
+
+def utc_timestamp(timestamp):
+    """
+    Return an ISO 8601 timestamp in UTC with a fixed layout, so stored
+    timestamps compare as strings whatever offset the hoster sent.
+    """
+    if not timestamp:
+        return timestamp
+    value = dateutil.parser.isoparse(timestamp)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt.timezone.utc)
+    return value.astimezone(dt.timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def default_store_path():
+    return os.path.join(default_cache_dir(''), 'snapshot.sqlite')
+
+
+class SnapshotStore:
+    """
+    Local SQLite snapshot of the crawled Git hoster and Zuul data.
+
+    Branches, Pull Requests, final commit statuses and Zuul buildsets are
+    stored as raw JSON, keyed by the API URL of the hoster, repositories
+    with the time of their last push. Watermarks remember up to which
+    update time the Pull Requests of a repository have been synchronized,
+    update times are stored in UTC.
+    Links index the Pull Requests referencing a Pull Request of a
+    reference repository, for the orphans list.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.executescript(SCHEMA)
+            self.migrate()
+
+    def migrate(self):
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        self.conn.create_function('utc_timestamp', 1, utc_timestamp)
+        for step in range(version + 1, SCHEMA_VERSION + 1):
+            for statement in MIGRATIONS[step].strip().split(';'):
+                if statement.strip():
+                    self.conn.execute(statement)
+        self.conn.execute('PRAGMA user_version=%d' % SCHEMA_VERSION)
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self, statements):
+        with self.lock, self.conn:
+            for sql, params in statements:
+                self.conn.execute(sql, params)
+
+    def _read(self, sql, params):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def save_repos(self, api_url, org, repos):
+        """
+        Replace the stored repositories of an organization, repos being
+        (name, push time) pairs.
+        """
+        statements = [(
+            'DELETE FROM repos WHERE api_url=? AND org=?', (api_url, org))]
+        for name, pushed_at in repos:
+            statements.append((
+                'INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?)',
+                (api_url, org, name, utc_timestamp(pushed_at))))
+        self._write(statements)
+
+    def get_repos(self, api_url, org):
+        return [row[0] for row in self._read(
+            'SELECT name FROM repos WHERE api_url=? AND org=? '
+            'ORDER BY rowid', (api_url, org))]
+
+    def get_repo_pushed_at(self, api_url, org, repo):
+        rows = self._read(
+            'SELECT pushed_at FROM repos WHERE api_url=? AND org=? AND name=?',
+            (api_url, org, repo))
+        return rows[0][0] if rows else None
+
+    def save_pulls(self, api_url, org, repo, pulls):
+        self._write([(
+            'INSERT OR REPLACE INTO pulls VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (api_url, org, repo, pull['number'], pull['state'],
+             utc_timestamp(pull['updated_at']), dumps(pull)))
+            for pull in pulls])
+
+    def get_pulls(self, api_url, org, repo, state=None):
+        """
+        Return the stored Pull Requests of a repository, newest first.
+        """
+        sql = 'SELECT data FROM pulls WHERE api_url=? AND org=? AND repo=?'
+        params = (api_url, org, repo)
+        if state and state != 'all':
+            sql += ' AND state=?'
+            params += (state,)
+        sql += ' ORDER BY number DESC'
+        return [loads(row[0]) for row in self._read(sql, params)]
+
+    def get_pulls_since(self, api_url, org, repo, since=None):
+        """
+        Return the stored Pull Requests of a repository updated since a
+        time, all of them without since.
+        """
+        sql = 'SELECT data FROM pulls WHERE api_url=? AND org=? AND repo=?'
+        params = (api_url, org, repo)
+        if since:
+            sql += ' AND updated_at>=?'
+            params += (utc_timestamp(since),)
+        return [loads(row[0]) for row in self._read(sql, params)]
+
+    def save_links(self, api_url, org, ref_repo, repo, links, unlinked):
+        """
+        Index the Pull Requests of a repository linked to a reference Pull
+        Request, links being (reference number, Pull Request) pairs, and
+        drop the Pull Requests with the numbers of unlinked.
+        """
+        statements = [(
+            'DELETE FROM links WHERE api_url=? AND org=? AND ref_repo=? '
+            'AND repo=? AND number=?',
+            (api_url, org, ref_repo, repo, number))
+            for number in unlinked]
+        for ref_number, pull in links:
+            statements.append((
+                'INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (api_url, org, ref_repo, repo, pull['number'], ref_number,
+                 dumps(pull))))
+        self._write(statements)
+
+    def get_links(self, api_url, org, ref_repo, repo):
+        """
+        Return the indexed linked Pull Requests of a repository, newest
+        first.
+        """
+        return [loads(row[0]) for row in self._read(
+            'SELECT data FROM links WHERE api_url=? AND org=? AND ref_repo=? '
+            'AND repo=? ORDER BY number DESC',
+            (api_url, org, ref_repo, repo))]
+
+    def save_branches(self, api_url, org, repo, branches):
+        statements = [(
+            'DELETE FROM branches WHERE api_url=? AND org=? AND repo=?',
+            (api_url, org, repo))]
+        for branch in branches:
+            statements.append((
+                'INSERT OR REPLACE INTO branches VALUES (?, ?, ?, ?, ?)',
+                (api_url, org, repo, branch['name'], dumps(branch))))
+        self._write(statements)
+
+    def get_branches(self, api_url, org, repo):
+        return [loads(row[0]) for row in self._read(
+            'SELECT data FROM branches WHERE api_url=? AND org=? AND repo=? '
+            'ORDER BY rowid', (api_url, org, repo))]
+
+    def save_final_status(self, api_url, org, repo, sha, updated_at, data):
+        """
+        Remember the final commit status of a Pull Request head, together
+        with the update time of the Pull Request it was checked for.
+        """
+        self._write([(
+            'INSERT OR REPLACE INTO final_statuses VALUES (?, ?, ?, ?, ?, ?)',
+            (api_url, org, repo, sha, utc_timestamp(updated_at),
+             dumps(data)))])
+
+    def get_final_status(self, api_url, org, repo, sha):
+        """
+        Return the Pull Request update time and the final commit status of
+        a head sha, or None.
+        """
+        rows = self._read(
+            'SELECT updated_at, data FROM final_statuses '
+            'WHERE api_url=? AND org=? AND repo=? AND sha=?',
+            (api_url, org, repo, sha))
+        return (rows[0][0], loads(rows[0][1])) if rows else None
+
+    def save_buildset(self, zuul_url, tenant, uuid, data):
+        self._write([(
+            'INSERT OR REPLACE INTO buildsets VALUES (?, ?, ?, ?)',
+            (zuul_url, tenant, uuid, dumps(data)))])
+
+    def get_buildset(self, zuul_url, tenant, uuid):
+        rows = self._read(
+            'SELECT data FROM buildsets '
+            'WHERE zuul_url=? AND tenant=? AND uuid=?',
+            (zuul_url, tenant, uuid))
+        return loads(rows[0][0]) if rows else None
+
+    def get_watermark(self, api_url, org, repo, kind):
+        rows = self._read(
+            'SELECT value FROM watermarks '
+            'WHERE api_url=? AND org=? AND repo=? AND kind=?',
+            (api_url, org, repo, kind))
+        return rows[0][0] if rows else None
+
+    def get_watermarks(self, api_url, org, kind):
+        """
+        Return the watermarks of one kind of all repositories of an
+        organization, keyed by repository.
+        """
+        return dict(self._read(
+            'SELECT repo, value FROM watermarks '
+            'WHERE api_url=? AND org=? AND kind=?',
+            (api_url, org, kind)))
+
+    def set_watermark(self, api_url, org, repo, kind, value):
+        self.set_watermarks(api_url, org, [repo], kind, value)
+
+    def set_watermarks(self, api_url, org, repos, kind, value):
+        self._write([(
+            'INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?, ?)',
+            (api_url, org, repo, kind, utc_timestamp(value)))
+            for repo in repos])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(args):
+    """
+    Return the shared snapshot store, or None if it is disabled.
+
+    The store lives next to the HTTP cache and is disabled together with it
+    by --no-cache.
+    """
+    if getattr(args, 'no_cache', True):
+        return None
+    path = getattr(args, 'store', None) or default_store_path()
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SnapshotStore(path)
+        return _stores[path]
@@ -0,0 +1,118 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+
+_tracer = None
+_no_span = contextlib.nullcontext()
+
+
+class Tracer:
+    """
+    Collects timed spans of the crawl phases as Chrome trace events.
+
+    Every thread and every asyncio task gets its own track, so the spans
+    of parallel repositories are shown side by side and nested spans of
+    one repository below each other.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.tracks = {}
+        self.lock = threading.Lock()
+
+    def track(self):
+        """
+        Return the track id of the running asyncio task or thread.
+        """
+        # No task can run unless the async engine imported asyncio
+        asyncio = sys.modules.get('asyncio')
+        try:
+            task = asyncio and asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            key, name = ('task', id(task)), task.get_name()
+        else:
+            thread = threading.current_thread()
+            key, name = ('thread', thread.ident), thread.name
+        with self.lock:
+            tid = self.tracks.get(key)
+            if tid is None:
+                tid = self.tracks[key] = len(self.tracks) + 1
+                self.events.append({
+                    'name': 'thread_name', 'ph': 'M', 'pid': self.pid,
+                    'tid': tid, 'args': {'name': name}})
+        return tid
+
+    @contextlib.contextmanager
+    def span(self, name, cat, args):
+        tid = self.track()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = {
+                'name': name,
+                'cat': cat,
+                'ph': 'X',
+                'ts': round((start - self.start) * 1e6, 1),
+                'dur': round((end - start) * 1e6, 1),
+                'pid': self.pid,
+                'tid': tid,
+            }
+            if args:
+                event['args'] = args
+            with self.lock:
+                self.events.append(event)
+
+    def write(self, path):
+        with self.lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump({
+                'traceEvents': [{
+                    'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                    'args': {'name': 'attention-list'}}] + events,
+                'displayTimeUnit': 'ms',
+            }, f)
+
+
+def start_tracing():
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(name, cat='crawl', **args):
+    """
+    Return a context manager timing a crawl phase, which does nothing
+    unless tracing was started with --trace.
+    """
+    if _tracer is None:
+        return _no_span
+    return _tracer.span(name, cat, args)
@@ -13,8 +13,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import dateutil.parser
+
+from attention_list.helper.output import FindingStream
+from attention_list.helper.paginator import get_pages
+from attention_list.helper.paginator import get_search_pages
+from attention_list.helper.paginator import iter_listing
+from attention_list.helper.paginator import iter_pages
+from attention_list.helper.trace import span
 
 
 git_hoster = ['gitea', 'github']
@@ -55,7 +66,7 @@ def check_config(command, config, args=None):
         for h in hoster:
             check(h, 'name', 'api_url')
             check_list(h, 'orgs')
-    if command == 'pr_list_older':
+    elif command == 'pr_list_older':
         check(config, 'pr_list_older')
         check(config['pr_list_older'], 'git_hoster')
         check_list(config['pr_list_older']['git_hoster'])
@@ -87,25 +98,61 @@ def check_config(command, config, args=None):
         raise Exception('check_config() issue; no proper command provided.')
 
 
+def find_hoster(hosters, name, org, repo):
+    """
+    Return the git_hoster entry covering a repository, or None.
+    """
+    for h in hosters:
+        if h['name'] != name or org not in h['orgs']:
+            continue
+        if h.get('repos') and repo not in h['repos']:
+            continue
+        return h
+    return None
+
+
 def create_result(items):
     """
-    Create dictionary result list from objects
-    """
-    result = {}
-    result['meta'] = {}
-    result['data'] = []
-    if len(items) != 0:
-        items_json = []
-        for obj in items:
-            if isinstance(obj, dict):
-                items_json.append(obj)
-            else:
-                items_json.append(vars(obj))
-        result['meta']['count'] = len(items_json)
-        result['data'] = items_json
-    else:
-        result['meta']['count'] = 0
-    return result
+    Create the result of a list of findings. The records are kept as they
+    are and only converted while the result is written.
+    """
+    if isinstance(items, FindingStream):
+        return items.close()
+    return {'meta': {'count': len(items)}, 'data': list(items)}
+
+
+def ordered_map(executor, func, items, ahead):
+    """
+    Run func for every item on the executor and yield the results in the
+    order of items.
+
+    Items may be a lazy iterator, at most ahead items are taken from it
+    before their results are consumed.
+    """
+    pending = collections.deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_parallel(func, items, workers=1):
+    """
+    Run func for every item on a bounded pool of worker threads.
+
+    Results are yielded in the order of items as soon as they are
+    available, so the output is the same as with a sequential run and
+    streamed findings are written while the remaining items still run.
+    Items are taken lazily, twice as many as there are workers ahead.
+    """
+    if not workers or workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from ordered_map(pool, func, items, 2 * workers)
 
 
 def get_token(hoster, args):
@@ -152,132 +199,504 @@ def get_headers(hoster, args):
     return headers
 
 
-def get_pull_requests(hoster, url, headers, org, repo, state=None):
+def pulls_url(client, org, repo, state=None):
+    req_url = (
+        client.api_url
+        + 'repos/'
+        + org
+        + '/'
+        + repo
+        + '/pulls')
+    if state:
+        req_url = req_url + '?state=' + state
+    return req_url
+
+
+def updated_pulls_url(client, org, repo):
     """
-    Collect all open Pull Requests of a Git Repository
+    URL of Pull Requests in all states, most recently updated first
     """
-    pullrequests = []
+    req_url = pulls_url(client, org, repo, 'all')
+    if client.name == 'gitea':
+        return req_url + '&sort=recentupdate'
+    return req_url + '&sort=updated&direction=desc'
 
-    if hoster == 'gitea':
-        i = 1
-        while True:
-            req_url = (
-                url
-                + 'repos/'
-                + org
-                + '/'
-                + repo
-                + '/pulls?page='
-                + str(i))
-            if state:
-                req_url = req_url + '&state=' + state
-            try:
-                res = requests.request('GET', url=req_url, headers=headers)
-                if res.json():
-                    for pr in res.json():
-                        pullrequests.append(pr)
-                    i += 1
-                    continue
-                else:
-                    break
-            except Exception as e:
-                print("get_pull_requests error: " + str(e))
-                print(
-                    "The request status is: "
-                    + str(res.status_code)
-                    + " | "
-                    + str(res.reason))
-                exit()
-    elif hoster == 'github':
-        i = 1
-        while True:
-            try:
-                req_url = (
-                    url
-                    + 'repos/'
-                    + org
-                    + '/'
-                    + repo
-                    + '/pulls?page='
-                    + str(i))
-                if state:
-                    req_url = req_url + '&state=' + state
-                res = requests.request('GET', url=req_url, headers=headers)
-                if res.json():
-                    for pr in res.json():
-                        pullrequests.append(pr)
-                    i += 1
-                    continue
-                else:
-                    break
-            except Exception as e:
-                print("Get GitHub pullrequests error: " + str(e))
-                print(
-                    "The request status is: "
-                    + str(res.status_code)
-                    + " | "
-                    + str(res.reason))
-                exit()
-    return pullrequests
+
+def created_pulls_url(client, org, repo):
+    """
+    URL of open Pull Requests, oldest first
+    """
+    req_url = pulls_url(client, org, repo, 'open')
+    if client.name == 'gitea':
+        return req_url + '&sort=oldest'
+    return req_url + '&sort=created&direction=asc'
 
 
-def get_repos(hoster, url, headers, org):
+def search_pulls_url(client, org, created_before=None):
     """
-    Get all Repositories of a Git organization
+    URL of the search for open Pull Requests of an organization. On GitHub
+    newest first and optionally only those created before a datetime.
+    """
+    if client.name == 'gitea':
+        return (
+            client.api_url
+            + 'repos/issues/search?type=pulls&state=open&owner='
+            + quote(org))
+    query = 'org:' + org + ' is:pr is:open archived:false'
+    if created_before is not None:
+        query += ' created:<' + created_before.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return (
+        client.api_url
+        + 'search/issues?q='
+        + quote(query)
+        + '&sort=created&order=desc')
+
+
+def updated_search_url(client, org, since):
+    """
+    URL of the search for Pull Requests in all states of an organization
+    updated since a time, on GitHub most recently updated first.
+    """
+    since = dateutil.parser.isoparse(since).strftime('%Y-%m-%dT%H:%M:%SZ')
+    if client.name == 'gitea':
+        return (
+            client.api_url
+            + 'repos/issues/search?type=pulls&state=all&owner='
+            + quote(org)
+            + '&since='
+            + quote(since))
+    query = 'org:' + org + ' is:pr updated:>=' + since
+    return (
+        client.api_url
+        + 'search/issues?q='
+        + quote(query)
+        + '&sort=updated&order=desc')
+
+
+def default_pulls_state(hoster):
+    """
+    State of Pull Requests listed by a hoster if no state is requested.
+    """
+    if hoster == 'github':
+        return 'open'
+    return 'all'
+
+
+def repos_url(client, org):
+    return client.api_url + 'orgs/' + org + '/repos'
+
+
+def parse_repos(hoster, data):
+    """
+    Return the names of all active repositories of one listing page
     """
     repositories = []
+    for repo in data:
+        if hoster == 'github' and repo['archived'] is not False:
+            continue
+        repositories.append(repo['name'])
+    return repositories
 
-    if hoster == 'gitea':
-        i = 1
-        while True:
-            try:
-                req_url = (
-                    url
-                    + 'orgs/'
-                    + org
-                    + '/repos?limit=50&page='
-                    + str(i))
-                res = requests.request('GET', url=req_url, headers=headers)
-                i += 1
-                if res.json():
-                    for repo in res.json():
-                        repositories.append(repo['name'])
-                    continue
-                else:
-                    break
-            except Exception as e:
-                print("Get Gitea Repos error: " + str(e))
-                print(
-                    "The request status is: "
-                    + str(res.status_code)
-                    + " | "
-                    + str(res.reason))
+
+def repo_pushed_at(hoster, repo):
+    """
+    Return the time of the last push to a repository of a listing page.
+    Gitea only tells when the repository was updated, which includes
+    pushes.
+    """
+    if hoster == 'github':
+        return repo.get('pushed_at')
+    return repo.get('updated_at')
+
+
+def print_request_error(message, error, res=None):
+    print(message + str(error))
+    if res is not None:
+        print(
+            "The request status is: "
+            + str(res.status_code)
+            + " | "
+            + str(res.reason))
+
+
+def older_than(timestamp, watermark):
+    return (dateutil.parser.isoparse(timestamp)
+            < dateutil.parser.isoparse(watermark))
+
+
+def newest(timestamp, watermark):
+    if not watermark or not older_than(timestamp, watermark):
+        return timestamp
+    return watermark
+
+
+def sync_pull_requests(client, org, repo, state=None):
+    """
+    Update the stored Pull Requests of a Git Repository and return them.
+    """
+    sync_pulls(client, org, repo)
+    return client.store.get_pulls(
+        client.api_url, org, repo, state or default_pulls_state(client.name))
+
+
+def sync_pulls(client, org, repo):
+    """
+    Fetch the Pull Requests of a Git Repository updated since the last
+    synchronization into the snapshot store.
+
+    Pagination stops at the first Pull Request older than the stored
+    watermark. Repositories are synchronized once per run.
+    """
+    if (org, repo) in client.synced:
+        return
+    store = client.store
+    watermark = store.get_watermark(client.api_url, org, repo, 'pulls')
+    latest = watermark
+    try:
+        for data in iter_pages(client, updated_pulls_url(client, org, repo),
+                               parse=project_pull):
+            store.save_pulls(client.api_url, org, repo, data)
+            for pr in data:
+                latest = newest(pr['updated_at'], latest)
+            if watermark and older_than(data[-1]['updated_at'], watermark):
                 break
-    elif hoster == 'github':
-        i = 1
-        while True:
-            try:
-                req_url = (
-                    url
-                    + 'orgs/'
-                    + org
-                    + '/repos?page='
-                    + str(i))
-                res = requests.request('GET', url=req_url, headers=headers)
-                if res.json():
-                    for repo in res.json():
-                        if repo['archived'] is False:
-                            repositories.append(repo['name'])
-                    i += 1
-                    continue
-                else:
+    except Exception as e:
+        print_request_error("sync_pull_requests error: ", e)
+        exit()
+    if latest:
+        store.set_watermark(client.api_url, org, repo, 'pulls', latest)
+    client.synced.add((org, repo))
+
+
+def sync_org_pulls(client, org, repos):
+    """
+    Synchronize the stored Pull Requests of the repositories of an
+    organization in an incremental run, does nothing otherwise.
+
+    One search finds the Pull Requests of the organization updated since
+    the repositories were last checked, only their repositories are
+    synchronized and the others are answered from the store. Repositories
+    never checked before, or all of them if the search can not be used,
+    are synchronized one by one.
+    """
+    repos = unsynced_repos(client, org, repos)
+    if not repos:
+        return
+    checked = client.store.get_watermarks(
+        client.api_url, org, 'pulls/checked')
+    since = checked_since(repos, checked)
+    updated = None
+    if since:
+        updated = search_updated_pulls(client, org, since)
+    changed = changed_repos(repos, checked, updated)
+    for _ in run_parallel(
+            lambda repo: sync_pulls(client, org, repo), changed,
+            workers=client.workers):
+        pass
+    set_checked(client, org, repos, changed, since, updated)
+
+
+def unsynced_repos(client, org, repos):
+    if client.store is None or not client.incremental:
+        return []
+    return [repo for repo in repos if (org, repo) not in client.synced]
+
+
+def checked_since(repos, checked):
+    """
+    Return the time up to which the repositories have been checked for
+    updated Pull Requests, leaving out those never checked.
+    """
+    return min(
+        (checked[repo] for repo in repos if repo in checked), default=None)
+
+
+def changed_repos(repos, checked, updated):
+    """
+    Return the repositories having updated Pull Requests or never checked,
+    all of them if the updated Pull Requests are not known.
+    """
+    if updated is None:
+        return repos
+    updated_repos = {pull['repo'] for pull in updated}
+    return [
+        repo for repo in repos
+        if repo in updated_repos or repo not in checked]
+
+
+def set_checked(client, org, repos, changed, since, updated):
+    """
+    Remember up to which update time repos have been checked. Pull
+    Requests updated after the search are newer than all it found,
+    without search the repositories are checked up to their newest
+    synchronized Pull Request.
+    """
+    store = client.store
+    latest = since
+    if updated is None:
+        watermarks = store.get_watermarks(client.api_url, org, 'pulls')
+        for repo in changed:
+            if repo in watermarks:
+                latest = newest(watermarks[repo], latest)
+    else:
+        for pull in updated:
+            latest = newest(pull['updated_at'], latest)
+    if latest:
+        store.set_watermarks(
+            client.api_url, org, repos, 'pulls/checked', latest)
+    client.synced.update((org, repo) for repo in repos)
+
+
+def search_updated_pulls(client, org, since):
+    """
+    Find the Pull Requests of an organization updated since a time with
+    the issue search of the hoster. Returns None if the search can not be
+    used, e.g. on GitHub if it finds more than it returns.
+    """
+    url = updated_search_url(client, org, since)
+    try:
+        with span('search', hoster=client.name, org=org):
+            if client.name == 'github':
+                return get_search_pages(
+                    client, url, parse=project_search_pull)
+            return get_pages(client, url, parse=project_search_pull)
+    except Exception as e:
+        print_request_error("search_updated_pulls error: ", e)
+    return None
+
+
+def project_repo(repo):
+    if not repo:
+        return repo
+    return {'full_name': repo['full_name']}
+
+
+def project_pull(pull):
+    """
+    Reduce a raw Pull Request to the fields used by the listers.
+    """
+    return {
+        'number': pull['number'],
+        'title': pull['title'],
+        'state': pull['state'],
+        'url': pull['url'],
+        'html_url': pull['html_url'],
+        'created_at': pull['created_at'],
+        'updated_at': pull['updated_at'],
+        'head': {
+            'ref': pull['head']['ref'],
+            'sha': pull['head']['sha'],
+            'repo': project_repo(pull['head'].get('repo')),
+        },
+        'base': {
+            'repo': project_repo(pull['base'].get('repo')),
+        },
+    }
+
+
+def project_search_pull(item):
+    """
+    Reduce a Pull Request found by the issue search to the fields used by
+    the listers, plus the name of its repository.
+    """
+    if item.get('repository'):
+        # Gitea
+        repo = item['repository']['name']
+    else:
+        repo = item['repository_url'].rstrip('/').rsplit('/', 1)[-1]
+    return {
+        'number': item['number'],
+        'title': item['title'],
+        'state': item['state'],
+        'url': (item.get('pull_request') or {}).get('url') or item['url'],
+        'html_url': item['html_url'],
+        'created_at': item['created_at'],
+        'updated_at': item['updated_at'],
+        'repo': repo,
+    }
+
+
+def group_by_repo(pulls, repos):
+    """
+    Group searched Pull Requests by repository, in the order of repos and
+    leaving out other repositories, so results come in the same order as
+    when listing the Pull Requests of every repository.
+    """
+    grouped = collections.defaultdict(list)
+    for pull in pulls:
+        grouped[pull['repo']].append(pull)
+    return [(repo, grouped[repo]) for repo in repos if repo in grouped]
+
+
+def search_pull_requests(client, org, created_before=None):
+    """
+    Find the open Pull Requests of an organization with the issue search
+    of the hoster, a few requests instead of one listing per repository.
+
+    Returns None if the search can not be used: on Gitea together with
+    created_before, which it can not filter by, or on GitHub if the search
+    finds more Pull Requests than it returns.
+    """
+    url = search_pulls_url(client, org, created_before)
+    try:
+        if client.name == 'github':
+            return get_search_pages(client, url, parse=project_search_pull)
+        if created_before is None:
+            return get_pages(client, url, parse=project_search_pull)
+    except Exception as e:
+        print_request_error("search_pull_requests error: ", e)
+    return None
+
+
+def get_pull_repos(client, org, repos=None):
+    """
+    Return the repositories of an organization having open Pull Requests,
+    found with one organization search, or None if the search can not be
+    used. Only repositories of repos are returned if given, in their order,
+    else in the order of get_repos().
+    """
+    pulls = search_pull_requests(client, org)
+    if pulls is None:
+        return None
+    return [repo for repo, _ in group_by_repo(
+        pulls, repos or get_repos(client, org))]
+
+
+def created_before(pull, before):
+    return dateutil.parser.isoparse(pull['created_at']) < before
+
+
+def newest_first(pulls):
+    """
+    Sort Pull Requests newest first, by creation time and then by number,
+    so listed, searched and stored Pull Requests come in the same order.
+    """
+    return sorted(
+        pulls,
+        key=lambda pull: (
+            dateutil.parser.isoparse(pull['created_at']), pull['number']),
+        reverse=True)
+
+
+def get_pull_requests_created_before(client, org, repo, before):
+    """
+    Collect the open Pull Requests of a Git Repository created before a
+    datetime, see newest_first() for the order.
+
+    The Pull Requests are requested oldest first, one page after the other,
+    and pagination stops at the first page reaching newer ones. Indexed or
+    synchronized Pull Requests are filtered instead.
+    """
+    if client.index is not None or (
+            client.store is not None and client.incremental):
+        return newest_first(
+            pull for pull in get_pull_requests(client, org, repo, 'open')
+            if created_before(pull, before))
+    pulls = []
+    try:
+        with span('pulls', hoster=client.name, org=org, repo=repo):
+            for data in iter_pages(
+                    client, created_pulls_url(client, org, repo),
+                    parse=project_pull):
+                pulls.extend(
+                    pull for pull in data if created_before(pull, before))
+                if not created_before(data[-1], before):
                     break
-            except Exception as e:
-                print("Get Github repository error: " + str(e))
-                print(
-                    "The request status is: "
-                    + str(res.status_code)
-                    + " | "
-                    + str(res.reason))
-                break
+    except Exception as e:
+        print_request_error("get_pull_requests error: ", e)
+        exit()
+    return newest_first(pulls)
+
+
+def get_pull_requests(client, org, repo, state=None):
+    """
+    Collect all open Pull Requests of a Git Repository
+    """
+    if client.index is not None:
+        state = state or default_pulls_state(client.name)
+        pulls = client.index.open_pulls(org, repo, state)
+        if pulls is not None:
+            return pulls
+        return client.index.get(
+            ('pulls', org, repo, state),
+            lambda: fetch_pull_requests(client, org, repo, state))
+    return fetch_pull_requests(client, org, repo, state)
+
+
+def fetch_pull_requests(client, org, repo, state=None):
+    with span('pulls', hoster=client.name, org=org, repo=repo):
+        if client.store is not None and client.incremental:
+            return sync_pull_requests(client, org, repo, state)
+        return list(stream_pull_requests(client, org, repo, state))
+
+
+def stream_pull_requests(client, org, repo, state=None):
+    """
+    Yield the Pull Requests of a Git Repository while their pages arrive.
+    """
+    try:
+        for data in iter_listing(
+                client, pulls_url(client, org, repo, state),
+                parse=project_pull):
+            if client.store is not None:
+                client.store.save_pulls(client.api_url, org, repo, data)
+            yield from data
+    except Exception as e:
+        print_request_error("get_pull_requests error: ", e)
+        exit()
+
+
+def iter_pull_requests(client, org, repo, state=None):
+    """
+    Lazy variant of get_pull_requests(), only a window of pages is held in
+    memory unless the Pull Requests are indexed or synchronized.
+    """
+    if client.index is not None or (
+            client.store is not None and client.incremental):
+        return iter(get_pull_requests(client, org, repo, state))
+    return stream_pull_requests(client, org, repo, state)
+
+
+def get_repos(client, org):
+    """
+    Get all Repositories of a Git organization
+    """
+    if client.index is not None:
+        return client.index.get(
+            ('repos', org), lambda: fetch_repos(client, org))
+    return fetch_repos(client, org)
+
+
+def fetch_repos(client, org):
+    try:
+        with span('get_repos', hoster=client.name, org=org):
+            data = get_pages(client, repos_url(client, org))
+    except Exception as e:
+        print_request_error("get_repos error: ", e)
+        return stored_repos(client, org)
+    return save_repos(client, org, data)
+
+
+def stored_repos(client, org):
+    """
+    Return the stored repositories of an organization in an incremental
+    run, in which the listing could not be requested, else none.
+    """
+    if client.store is None or not client.incremental:
+        return []
+    return client.store.get_repos(client.api_url, org)
+
+
+def save_repos(client, org, data):
+    """
+    Return the active repositories of a listing and store them with the
+    time of their last push, which tells incremental runs whether their
+    stored branches are still current.
+    """
+    repositories = parse_repos(client.name, data)
+    if client.store is not None:
+        pushed_at = {
+            repo['name']: repo_pushed_at(client.name, repo) for repo in data}
+        client.store.save_repos(client.api_url, org, [
+            (name, pushed_at[name]) for name in repositories])
     return repositories
@@ -0,0 +1,35 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+
+
+# Plugin modules of the commands. A module, and with it requests, dateutil
+# or aiohttp, is only imported once its command has been chosen, so the CLI
+# starts without loading the code of the other commands.
+PLUGINS = {
+    'branch_lister': 'attention_list.plugin.branch_lister',
+    'pr_lister': 'attention_list.plugin.pr_lister',
+    'report': 'attention_list.plugin.report',
+    'serve': 'attention_list.plugin.serve',
+    'zuul_lister': 'attention_list.plugin.zuul_lister',
+}
+
+
+def load_plugin(name):
+    """
+    Import and return the plugin module of a command.
+    """
+    return importlib.import_module(PLUGINS[name])
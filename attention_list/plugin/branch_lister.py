@@ -13,20 +13,46 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import requests
+import asyncio
+import datetime as dt
+import logging
 
+import dateutil.parser
+
+from attention_list.helper.aio import gather
+from attention_list.helper.aio import get_async_client
+from attention_list.helper.aio import get_pull_requests_async
+from attention_list.helper.aio import get_repos_async
+from attention_list.helper.aio import iter_ordered
+from attention_list.helper.aio import run_async
+from attention_list.helper.aio import start_tasks
+from attention_list.helper.aio import sync_org_pulls_async
+from attention_list.helper.client import get_client
+from attention_list.helper.graphql import get_dated_branches
+from attention_list.helper.graphql import get_dated_branches_async
+from attention_list.helper.graphql import graphql_url
+from attention_list.helper.output import new_findings
+from attention_list.helper.output import Record
+from attention_list.helper.paginator import get_pages
+from attention_list.helper.paginator import get_pages_async
+from attention_list.helper.trace import span
 from attention_list.helper.utils import check_config
 from attention_list.helper.utils import create_result
-from attention_list.helper.utils import get_headers
-from attention_list.helper.utils import get_pull_requests
+from attention_list.helper.utils import find_hoster
+from attention_list.helper.utils import iter_pull_requests
 from attention_list.helper.utils import get_repos
+from attention_list.helper.utils import print_request_error
+from attention_list.helper.utils import run_parallel
+from attention_list.helper.utils import sync_org_pulls
 
 
 git_hoster = ['gitea', 'github']
 
 
-class EmptyBranch:
+class EmptyBranch(Record):
     """Branch without any open Pull Request"""
+    __slots__ = ('org', 'repo', 'hoster', 'name')
+
     def __init__(
             self,
             org=None,
@@ -53,37 +79,224 @@ class BranchLister:
     def print_config(self):
         print(self.config)
 
-    def get_branches(self, url, headers, org, repo):
+    def branches_url(self, client, org, repo):
+        return (
+            client.api_url
+            + 'repos/'
+            + org
+            + '/'
+            + repo
+            + '/branches')
+
+    def commit_url(self, client, org, repo, sha):
+        return (
+            client.api_url
+            + 'repos/'
+            + org
+            + '/'
+            + repo
+            + '/commits/'
+            + sha)
+
+    def save_branches(self, client, org, repo, data):
+        """
+        Store the branches of a repository, together with the push time of
+        the repository they are current for.
+        """
+        store = client.store
+        if store is None:
+            return
+        store.save_branches(client.api_url, org, repo, data or [])
+        pushed_at = store.get_repo_pushed_at(client.api_url, org, repo)
+        if pushed_at:
+            store.set_watermark(
+                client.api_url, org, repo, 'branches', pushed_at)
+
+    def stored_branches(self, client, org, repo):
+        """
+        Return the stored branches of a repository in an incremental run if
+        nothing was pushed to it since they were fetched, else None.
+        """
+        store = client.store
+        if store is None or not client.incremental:
+            return None
+        pushed_at = store.get_repo_pushed_at(client.api_url, org, repo)
+        if not pushed_at or pushed_at != store.get_watermark(
+                client.api_url, org, repo, 'branches'):
+            return None
+        return store.get_branches(client.api_url, org, repo)
+
+    def branch_updated_at(self, branch):
         """
-        Collect all branches of a Git Repository
+        Return the time of the last commit of a branch, as far as the
+        branches payload tells it: Gitea sends the commit timestamp, the
+        GitHub REST API only the commit sha, see graphql_branches and
+        add_commit_dates.
+        """
+        commit = branch.get('commit') or {}
+        timestamp = commit.get('timestamp') or (
+            ((commit.get('commit') or {}).get('committer') or {}).get('date'))
+        if not timestamp:
+            return None
+        return dateutil.parser.isoparse(timestamp)
+
+    def stale_before(self):
+        days = getattr(self.args, 'stale', None)
+        if not days:
+            return None
+        return dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)
+
+    def is_recent(self, branch, stale_before):
+        if stale_before is None:
+            return False
+        updated_at = self.branch_updated_at(branch)
+        return updated_at is not None and updated_at >= stale_before
+
+    def parse_branches(self, data):
+        """
+        Return the branches, without main and master and with --stale
+        without branches having commits in the last days. Branches without
+        a commit timestamp in the payload are kept.
         """
         branches = []
+        stale_before = self.stale_before()
+        for branch in data or []:
+            if branch['name']:
+                if branch['name'] != 'main' and \
+                        branch['name'] != 'master':
+                    if self.is_recent(branch, stale_before):
+                        continue
+                    branches.append(branch)
+        return branches
+
+    def undated_branches(self, pulls, branches):
+        """
+        Return the empty branches whose commit time is needed for --stale
+        but missing in the branches payload.
+        """
+        full_branches = set(self.get_branches_with_pr(pulls=pulls))
+        return [
+            b for b in branches
+            if b['name'] not in full_branches
+            and self.branch_updated_at(b) is None
+            and (b.get('commit') or {}).get('sha')]
+
+    def dated_branch(self, branch, org, repo, res):
+        if res.status_code != 200:
+            logging.warning(
+                'Commit of branch %s of %s/%s not available (%s %s), '
+                'the branch is kept', branch['name'], org, repo,
+                res.status_code, res.reason)
+            return branch
+        return dict(branch, commit=res.json())
+
+    def without_recent(self, branches, dated):
+        stale_before = self.stale_before()
+        branches = [dated.get(b['name'], b) for b in branches]
+        return [b for b in branches if not self.is_recent(b, stale_before)]
+
+    def add_commit_dates(self, client, org, repo, pulls, branches):
+        """
+        Request the commit of every empty branch lacking its commit time,
+        i.e. GitHub branches listed with the REST API because the GraphQL
+        API failed, and drop those having commits in the last days.
+        """
+        dated = {}
+        for branch in self.undated_branches(pulls, branches):
+            url = self.commit_url(
+                client, org, repo, branch['commit']['sha'])
+            dated[branch['name']] = self.dated_branch(
+                branch, org, repo, client.get(url))
+        return self.without_recent(branches, dated)
+
+    async def add_commit_dates_async(self, client, org, repo, pulls,
+                                     branches):
+        async def dated_branch(branch):
+            url = self.commit_url(
+                client, org, repo, branch['commit']['sha'])
+            return self.dated_branch(
+                branch, org, repo, await client.get(url))
+
+        dated = await gather(
+            dated_branch, self.undated_branches(pulls, branches))
+        return self.without_recent(
+            branches, {b['name']: b for b in dated})
+
+    def lists_dates(self, client, graphql):
+        return (
+            graphql is not None and client.name == 'github'
+            and self.stale_before() is not None)
+
+    def graphql_failed(self, org, repo, error):
+        logging.warning(
+            'GraphQL failed for %s/%s, falling back to REST: %s',
+            org, repo, error)
+
+    def graphql_branches(self, client, org, repo, graphql):
+        """
+        List the branches of a GitHub repository with the GraphQL API,
+        which tells the commit dates --stale needs within the listing.
+
+        Returns None if the GraphQL API failed and the REST API has to be
+        used instead.
+        """
         try:
-            req_url = (
-                url
-                + 'repos/'
-                + org
-                + '/'
-                + repo
-                + '/branches')
-            res = requests.request('GET', url=req_url, headers=headers)
+            with span('branches', hoster=client.name, org=org, repo=repo):
+                return get_dated_branches(client, graphql, org, repo)
         except Exception as e:
-            print("get_branches error: " + str(e))
-            print(
-                "The request status is: "
-                + str(res.status_code)
-                + " | "
-                + str(res.reason))
-            exit()
-
-        if res.json():
-            branches_raw = res.json()
-            for branch in branches_raw:
-                if branch['name']:
-                    if branch['name'] != 'main' and \
-                            branch['name'] != 'master':
-                        branches.append(branch['name'])
-        return branches
+            self.graphql_failed(org, repo, e)
+            return None
+
+    async def graphql_branches_async(self, client, org, repo, graphql):
+        try:
+            with span('branches', hoster=client.name, org=org, repo=repo):
+                return await get_dated_branches_async(
+                    client, graphql, org, repo)
+        except Exception as e:
+            self.graphql_failed(org, repo, e)
+            return None
+
+    def get_branches(self, client, org, repo, stored=True, graphql=None):
+        """
+        Collect all branches of a Git Repository, with stored=False never
+        from the store. With --stale GitHub branches are listed from the
+        graphql endpoint if given.
+        """
+        data = self.stored_branches(client, org, repo) if stored else None
+        if data is not None:
+            return self.parse_branches(data)
+        if self.lists_dates(client, graphql):
+            data = self.graphql_branches(client, org, repo, graphql)
+        if data is None:
+            try:
+                with span(
+                        'branches', hoster=client.name, org=org, repo=repo):
+                    data = get_pages(
+                        client, self.branches_url(client, org, repo))
+            except Exception as e:
+                print_request_error("get_branches error: ", e)
+                exit()
+        self.save_branches(client, org, repo, data)
+        return self.parse_branches(data)
+
+    async def get_branches_async(self, client, org, repo, graphql=None):
+        data = self.stored_branches(client, org, repo)
+        if data is not None:
+            return self.parse_branches(data)
+        if self.lists_dates(client, graphql):
+            data = await self.graphql_branches_async(
+                client, org, repo, graphql)
+        if data is None:
+            try:
+                with span(
+                        'branches', hoster=client.name, org=org, repo=repo):
+                    data = await get_pages_async(
+                        client, self.branches_url(client, org, repo))
+            except Exception as e:
+                print_request_error("get_branches error: ", e)
+                exit()
+        self.save_branches(client, org, repo, data)
+        return self.parse_branches(data)
 
     def get_branches_with_pr(self, pulls):
         branches = []
@@ -95,11 +308,9 @@ class BranchLister:
         return branches
 
     def get_empty_branches(self, hoster, org, repo, pulls, branches):
-        empty_branches = branches
-        full_branches = []
-        full_branches = self.get_branches_with_pr(pulls=pulls)
-        for b in full_branches:
-            empty_branches.remove(b)
+        full_branches = set(self.get_branches_with_pr(pulls=pulls))
+        empty_branches = [
+            b['name'] for b in branches if b['name'] not in full_branches]
         result = self.create_obj_branches(
             hoster=hoster,
             org=org,
@@ -120,6 +331,122 @@ class BranchLister:
             result.append(item)
         return result
 
+    def get_repo_empty_branches(self, client, org, repo, stored=True,
+                                graphql=None):
+        """
+        Collect the empty branches of a single Git repository
+        """
+        branches = self.get_branches(
+            client=client,
+            org=org,
+            repo=repo,
+            stored=stored,
+            graphql=graphql
+        )
+        pulls = iter_pull_requests(
+            client=client,
+            org=org,
+            repo=repo,
+            state='open'
+        )
+        if not branches:
+            return []
+        if self.stale_before() is not None:
+            pulls = list(pulls)
+            branches = self.add_commit_dates(
+                client, org, repo, pulls, branches)
+        return self.get_empty_branches(
+            hoster=client.name,
+            org=org,
+            repo=repo,
+            pulls=pulls,
+            branches=branches)
+
+    async def get_repo_empty_branches_async(self, client, org, repo,
+                                            graphql=None):
+        branches, pulls = await asyncio.gather(
+            self.get_branches_async(
+                client=client,
+                org=org,
+                repo=repo,
+                graphql=graphql
+            ),
+            get_pull_requests_async(
+                client=client,
+                org=org,
+                repo=repo,
+                state='open'
+            ))
+        if not branches:
+            return []
+        if self.stale_before() is not None:
+            branches = await self.add_commit_dates_async(
+                client, org, repo, pulls, branches)
+        return self.get_empty_branches(
+            hoster=client.name,
+            org=org,
+            repo=repo,
+            pulls=pulls,
+            branches=branches)
+
+    async def list_empty_async(self):
+        """
+        Async engine variant of list_empty().
+        """
+        async def org_empty_branches(client, h, org):
+            repos = []
+            if h['repos']:
+                repos = h['repos']
+            else:
+                repos = await get_repos_async(client=client, org=org)
+            await sync_org_pulls_async(client, org, repos)
+            return start_tasks(
+                lambda repo: self.get_repo_empty_branches_async(
+                    client=client,
+                    org=org,
+                    repo=repo,
+                    graphql=graphql_url(h)
+                ),
+                repos)
+
+        empty_branches = new_findings(self.args)
+        for h in self.hoster:
+            if h['name'] == 'gitea' or h['name'] == 'github':
+                async with get_async_client(h, self.args) as client:
+                    async for repo_tasks in iter_ordered(start_tasks(
+                            lambda org: org_empty_branches(client, h, org),
+                            h['orgs'])):
+                        async for result_branches in iter_ordered(
+                                repo_tasks):
+                            empty_branches.extend(result_branches)
+
+        return empty_branches
+
+    def list_repo_empty(self, hoster, org, repo):
+        """
+        Collect the empty branches of a single repository, used to update a
+        served branch list --empty result after a webhook delivery.
+
+        Returns None if the repository is not covered by the configuration.
+        """
+        check_config(
+            command='branch_list_empty',
+            config=self.config
+        )
+        h = find_hoster(
+            self.config['branch_list_empty']['git_hoster'], hoster, org, repo)
+        if h is None:
+            return None
+        client = get_client(hoster=h, args=self.args)
+        # The push time of the repository is only updated by full runs
+        return create_result(self.get_repo_empty_branches(
+            client=client,
+            org=org,
+            repo=repo,
+            stored=False,
+            graphql=graphql_url(h)
+        ))['data']
+
     def list_empty(self):
         """
         command: branch list empty
@@ -133,47 +460,30 @@ class BranchLister:
             config=self.config
         )
         self.hoster = self.config['branch_list_empty']['git_hoster']
+        if self.args.engine == 'async':
+            return create_result(run_async(self.list_empty_async()))
 
-        empty_branches = []
+        empty_branches = new_findings(self.args)
         for h in self.hoster:
             if h['name'] == 'gitea' or h['name'] == 'github':
-                headers = get_headers(
-                    hoster=h['name'],
-                    args=self.args
-                )
+                client = get_client(hoster=h, args=self.args)
                 for org in h['orgs']:
                     repos = []
                     if h['repos']:
                         repos = h['repos']
                     else:
-                        repos = get_repos(
-                            hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
-                            org=org
-                        )
-                    for repo in repos:
-                        branches = self.get_branches(
-                            url=h['api_url'],
-                            headers=headers,
-                            org=org,
-                            repo=repo
-                        )
-                        pulls = get_pull_requests(
-                            hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
+                        repos = get_repos(client=client, org=org)
+                    sync_org_pulls(client, org, repos)
+                    results = run_parallel(
+                        lambda repo: self.get_repo_empty_branches(
+                            client=client,
                             org=org,
                             repo=repo,
-                            state='open'
-                        )
-                        if branches:
-                            result_branches = self.get_empty_branches(
-                                hoster=h['name'],
-                                org=org,
-                                repo=repo,
-                                pulls=pulls,
-                                branches=branches)
-                            empty_branches.extend(result_branches)
+                            graphql=graphql_url(h)
+                        ),
+                        repos,
+                        workers=self.args.workers)
+                    for result_branches in results:
+                        empty_branches.extend(result_branches)
 
         return create_result(empty_branches)
@@ -13,21 +13,75 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import requests
+import asyncio
+import functools
+import logging
 import re
 import datetime as dt
 import dateutil.parser
 
+from attention_list.helper.aio import completed
+from attention_list.helper.aio import gather
+from attention_list.helper.aio import get_async_client
+from attention_list.helper.aio import get_async_zuul_client
+from attention_list.helper.aio import get_pull_requests_async
+from attention_list.helper.aio import get_pull_repos_async
+from attention_list.helper.aio import get_pull_requests_created_before_async
+from attention_list.helper.aio import get_repos_async
+from attention_list.helper.aio import iter_ordered
+from attention_list.helper.aio import run_async
+from attention_list.helper.aio import search_pull_requests_async
+from attention_list.helper.aio import start_tasks
+from attention_list.helper.aio import sync_org_pulls_async
+from attention_list.helper.aio import sync_pulls_async
+from attention_list.helper.buildsets import BuildsetCache
+from attention_list.helper.buildsets import buildset_uuid
+from attention_list.helper.client import get_client
+from attention_list.helper.client import get_zuul_client
+from attention_list.helper.graphql import get_open_pulls
+from attention_list.helper.graphql import get_open_pulls_async
+from attention_list.helper.graphql import graphql_url
+from attention_list.helper.output import new_findings
+from attention_list.helper.output import Record
+from attention_list.helper.trace import span
 from attention_list.helper.utils import check_config
 from attention_list.helper.utils import create_result
-from attention_list.helper.utils import get_headers
+from attention_list.helper.utils import find_hoster
+from attention_list.helper.utils import get_pull_repos
 from attention_list.helper.utils import get_pull_requests
+from attention_list.helper.utils import get_pull_requests_created_before
 from attention_list.helper.utils import get_repos
+from attention_list.helper.utils import group_by_repo
+from attention_list.helper.utils import iter_pull_requests
+from attention_list.helper.utils import newest
+from attention_list.helper.utils import newest_first
+from attention_list.helper.utils import older_than
+from attention_list.helper.utils import run_parallel
+from attention_list.helper.utils import search_pull_requests
+from attention_list.helper.utils import sync_org_pulls
+from attention_list.helper.utils import sync_pulls
 
 git_hoster = ['gitea', 'github']
 
 
-class PR:
+@functools.lru_cache(maxsize=None)
+def get_ref_pattern(org, ref_repo, pattern=None):
+    """
+    Return the compiled pattern of a reference to a Pull Request of the
+    reference repository in a Pull Request title, e.g. docs/doc-exports#12.
+    A configured ref_pattern must capture the Pull Request number as its
+    first group.
+    """
+    if pattern is None:
+        pattern = re.escape(org + '/' + ref_repo) + r'#(\d+)'
+    return re.compile(pattern)
+
+
+class PR(Record):
+    __slots__ = (
+        'created_at', 'hoster', 'org', 'repo', 'title', 'updated_at', 'url',
+        'state')
+
     def __init__(
             self,
             created_at,
@@ -49,7 +103,9 @@ class PR:
         self.state = state
 
 
-class OrphanPR:
+class OrphanPR(Record):
+    __slots__ = ('title', 'url', 'state')
+
     def __init__(
             self,
             title,
@@ -61,8 +117,14 @@ class OrphanPR:
         self.state = state
 
 
-class FailedPR:
+class FailedPR(Record):
     """Base class for failed Pull Requests"""
+    __slots__ = (
+        'created_at', 'error', 'host', 'org', 'pullrequest', 'repo',
+        'status', 'updated_at', 'url', 'zuul_url', 'jobs')
+    # The Zuul jobs are only known for builds found in Zuul
+    optional = ('jobs',)
+
     def __init__(
             self,
             created_at,
@@ -74,7 +136,8 @@ class FailedPR:
             org=None,
             repo=None,
             status=None,
-            zuul_url=None):
+            zuul_url=None,
+            jobs=None):
 
         self.created_at = created_at
         self.error = error
@@ -86,6 +149,7 @@ class FailedPR:
         self.updated_at = updated_at
         self.url = url
         self.zuul_url = zuul_url
+        self.jobs = jobs
 
 
 class PrLister:
@@ -96,130 +160,259 @@ class PrLister:
     def __init__(self, config, args):
         self.config = config.get_config()
         self.args = args
+        self.zuul_client = None
+        self.buildsets = None
 
     def print_config(self):
         print(self.config)
 
+    def buildset_url(self, url, tenant):
+        zuul_api_url = self.zuul_client.api_url + "api/tenant/"
+        zuul_api_url = zuul_api_url + tenant + "/buildset/"
+        return re.sub(r'.*\/buildset\/', zuul_api_url, url.rstrip('/'))
+
+    def add_jobs_to_obj(self, obj, buildset):
+        """
+        Add the build jobs of a Zuul buildset to a FailedPR object.
+        """
+        if buildset and ('builds' in buildset) and \
+                (len(buildset['builds']) != 0):
+            jobs = []
+            for build in buildset['builds']:
+                job = {}
+                job['uuid'] = build['uuid']
+                job['name'] = build['job_name']
+                job['result'] = build['result']
+                job['log_url'] = build['log_url']
+                jobs.append(job)
+            obj.jobs = jobs
+        return obj
+
+    def set_zuul_client(self, client):
+        self.zuul_client = client
+        self.buildsets = BuildsetCache(client.api_url, client.store)
+
     def add_builds_to_obj(self, obj, url, tenant):
         """
         This method trys to find all build jobs under a Zuul buildset.
         The corresponding data like log_url and status will be added.
+        Buildsets already seen are taken from the buildset cache.
         """
-        zuul_api_url = "https://zuul.otc-service.com/api/tenant/"
-        zuul_api_url = zuul_api_url + tenant + "/buildset/"
-        final_url = re.sub(r'.*\/buildset\/', zuul_api_url, url)
-        headers = {}
-        headers['accept'] = 'application/json'
-        res_zuul = requests.request('GET', url=final_url, headers=headers)
-        if res_zuul.status_code != 404 and res_zuul.json():
-            x = res_zuul.json()
-            if ('builds' in x) and (len(x['builds']) != 0):
-                jobs = []
-                for build in x['builds']:
-                    job = {}
-                    job['uuid'] = build['uuid']
-                    job['name'] = build['job_name']
-                    job['result'] = build['result']
-                    job['log_url'] = build['log_url']
-                    jobs.append(job)
-                obj.jobs = jobs
-        return obj
+        with span('zuul', tenant=tenant):
+            uuid = buildset_uuid(url)
+            buildset = self.buildsets.get(tenant, uuid)
+            if buildset is None:
+                res_zuul = self.zuul_client.get(self.buildset_url(url, tenant))
+                if res_zuul.status_code == 404:
+                    return obj
+                buildset = res_zuul.json()
+                self.buildsets.put(tenant, uuid, buildset)
+            return self.add_jobs_to_obj(obj, buildset)
+
+    def statuses_url(self, client, pull, org, repo):
+        req_url = (
+            client.api_url
+            + 'repos/'
+            + org
+            + '/'
+            + repo
+            + '/commits/')
+        if client.name == 'gitea':
+            return req_url + pull['head']['sha'] + '/statuses?limit=1'
+        return req_url + pull['head']['sha'] + '/check-runs'
 
-    def get_failed_commits(self, hoster, pull, url, org, repo, headers):
+    def status_final(self, hoster, data):
         """
-        Collect all Failed Pull Requests of a Git repository
+        A commit status is final once CI reported a result, it only
+        changes again if the head moves or CI is triggered again.
         """
-        failed_commits = []
+        if not data:
+            return False
         if hoster == 'gitea':
-            req_url = (
-                url
-                + 'repos/'
-                + org
-                + '/'
-                + repo
-                + '/commits/'
-                + pull['head']['ref']
-                + '/statuses?limit=1')
-            try:
-                res = requests.request('GET', url=req_url, headers=headers)
-            except Exception as e:
-                print("Get Gitea failed commits error: " + str(e))
-                print(
-                    "The request status is: "
-                    + str(res.status_code)
-                    + " | "
-                    + str(res.reason))
-            if res.json():
-                if res.json()[0]['status'] == 'failure':
-                    zuul_url = res.json()[0]['target_url']
-                    o = FailedPR(
-                        host='gitea',
-                        url=pull['url'],
-                        org=org,
-                        repo=repo,
-                        pullrequest=pull['title'],
-                        status=res.json()[0]['status'],
-                        zuul_url=zuul_url,
-                        created_at=pull['created_at'],
-                        updated_at=res.json()[0]['updated_at'],
-                        error=1000
-                    )
-                    o = self.add_builds_to_obj(
-                        obj=o,
-                        url=zuul_url,
-                        tenant='gl')
-                    failed_commits.append(o)
+            return data[0]['status'] != 'pending'
+        check_runs = data.get('check_runs') or []
+        return bool(check_runs) and check_runs[0].get('conclusion') is not None
+
+    def get_final_status(self, client, pull, org, repo):
+        """
+        Return the stored final commit status of the Pull Request head, or
+        None if it has to be requested: the head sha is new, its status was
+        not final yet, or the Pull Request was updated since, e.g. by a
+        recheck comment.
+        """
+        if client.store is None:
+            return None
+        stored = client.store.get_final_status(
+            client.api_url, org, repo, pull['head']['sha'])
+        if stored is None or older_than(stored[0], pull['updated_at']):
+            return None
+        return stored[1]
+
+    def save_status(self, client, pull, org, repo, data):
+        if client.store is None:
+            return
+        if self.status_final(client.name, data):
+            client.store.save_final_status(
+                client.api_url, org, repo, pull['head']['sha'],
+                pull['updated_at'], data)
+
+    def parse_failed_commit(self, hoster, pull, org, repo, data):
+        """
+        Evaluate the commit status of a Pull Request head.
 
+        Returns a tuple of FailedPR object and Zuul tenant, the tenant is None
+        if there is no Zuul buildset to look up. Returns None if the Pull
+        Request did not fail.
+        """
+        if not data:
+            return None
+        if hoster == 'gitea':
+            if data[0]['status'] == 'failure':
+                o = FailedPR(
+                    host='gitea',
+                    url=pull['url'],
+                    org=org,
+                    repo=repo,
+                    pullrequest=pull['title'],
+                    status=data[0]['status'],
+                    zuul_url=data[0]['target_url'],
+                    created_at=pull['created_at'],
+                    updated_at=data[0]['updated_at'],
+                    error=1000
+                )
+                return o, 'gl'
         elif hoster == 'github':
-            req_url = (
-                url
-                + 'repos/'
-                + org
-                + '/'
-                + repo
-                + '/commits/'
-                + pull['head']['sha']
-                + '/check-runs')
-            try:
-                res = requests.request('GET', url=req_url, headers=headers)
-            except Exception as e:
-                print("Get GitHub failed commits error: " + str(e))
-            if res.json():
-                if len(res.json()['check_runs']) != 0:
-                    if res.json()['check_runs'][0]['conclusion'] == 'failure':
-                        zuul_url = res.json()['check_runs'][0]['details_url']
-                        o = FailedPR(
-                            host='github',
-                            url=pull['html_url'],
-                            org=org,
-                            repo=repo,
-                            pullrequest=pull['title'],
-                            status=res.json()['check_runs'][0]['conclusion'],
-                            zuul_url=zuul_url,
-                            created_at=pull['created_at'],
-                            updated_at=(res.json()['check_runs']
-                                        [0]['completed_at']),
-                            error=1000
-                        )
-                        o = self.add_builds_to_obj(
-                            obj=o,
-                            url=zuul_url,
-                            tenant='eco')
-                        failed_commits.append(o)
-                else:
+            if len(data['check_runs']) != 0:
+                check_run = data['check_runs'][0]
+                if check_run['conclusion'] == 'failure':
                     o = FailedPR(
                         host='github',
                         url=pull['html_url'],
                         org=org,
                         repo=repo,
                         pullrequest=pull['title'],
+                        status=check_run['conclusion'],
+                        zuul_url=check_run['details_url'],
                         created_at=pull['created_at'],
-                        updated_at=pull['updated_at'],
-                        error=1001,
+                        updated_at=check_run['completed_at'],
+                        error=1000
                     )
-                    failed_commits.append(o)
+                    return o, 'eco'
+            else:
+                o = FailedPR(
+                    host='github',
+                    url=pull['html_url'],
+                    org=org,
+                    repo=repo,
+                    pullrequest=pull['title'],
+                    created_at=pull['created_at'],
+                    updated_at=pull['updated_at'],
+                    error=1001,
+                )
+                return o, None
+        return None
+
+    def get_failed_commits(self, client, pull, org, repo):
+        """
+        Collect all Failed Pull Requests of a Git repository
+        """
+        with span('status', hoster=client.name, org=org, repo=repo,
+                  number=pull.get('number')):
+            data = self.get_final_status(client, pull, org, repo)
+            if data is not None:
+                return self.evaluate_failed_commit(
+                    client, pull, org, repo, data, stored=True)
+            res = None
+            try:
+                res = client.get(self.statuses_url(client, pull, org, repo))
+                if res.status_code != 200:
+                    raise Exception('Unexpected response of ' + res.url)
+                data = res.json()
+            except Exception as e:
+                return self.unchecked_commit(client, pull, org, repo, e, res)
+            return self.evaluate_failed_commit(client, pull, org, repo, data)
+
+    def unchecked_commit(self, client, pull, org, repo, error, res=None):
+        """
+        Keep a Pull Request whose commit status could not be requested in
+        the list as unchecked, instead of dropping it.
+        """
+        logging.warning(
+            'Commit status of %s/%s#%s not available: %s%s',
+            org, repo, pull.get('number'), error,
+            '' if res is None else ' (%s %s)' % (
+                res.status_code, res.reason))
+        return [FailedPR(
+            host=client.name,
+            url=pull['url'] if client.name == 'gitea' else pull['html_url'],
+            org=org,
+            repo=repo,
+            pullrequest=pull['title'],
+            status='unchecked',
+            created_at=pull['created_at'],
+            updated_at=pull['updated_at'],
+            error=1002,
+        )]
+
+    def evaluate_failed_commit(self, client, pull, org, repo, data,
+                               stored=False):
+        """
+        Turn the commit status data of a Pull Request into FailedPR objects
+        """
+        failed_commits = []
+        if not stored:
+            self.save_status(client, pull, org, repo, data)
+        failed = self.parse_failed_commit(
+            hoster=client.name,
+            pull=pull,
+            org=org,
+            repo=repo,
+            data=data)
+        if failed:
+            o, tenant = failed
+            if tenant:
+                o = self.add_builds_to_obj(
+                    obj=o,
+                    url=o.zuul_url,
+                    tenant=tenant)
+            failed_commits.append(o)
         return failed_commits
 
+    def get_failed_pr_graphql(self, client, h, org):
+        """
+        Collect the failed Pull Requests of a GitHub organization with the
+        GraphQL API, which returns the open Pull Requests of many
+        repositories together with their check-runs.
+
+        Returns None if the GraphQL API failed and the REST API has to be
+        used instead.
+        """
+        try:
+            repo_pulls = get_open_pulls(
+                client=client,
+                url=graphql_url(h),
+                org=org,
+                repos=h['repos'])
+        except Exception as e:
+            logging.warning(
+                'GraphQL failed for %s, falling back to REST: %s', org, e)
+            return None
+        tasks = []
+        for repo, pulls in repo_pulls:
+            for pull, data in pulls:
+                tasks.append((repo, pull, data))
+        results = run_parallel(
+            lambda task: self.evaluate_failed_commit(
+                client=client,
+                pull=task[1],
+                org=org,
+                repo=task[0],
+                data=task[2]
+            ),
+            tasks,
+            workers=self.args.workers)
+        return [o for commits in results for o in commits]
+
     def get_old_pulls(self, hoster, now, org, pulls, repo, days):
         """
         Get Pull Requests of a specific Git Repo which are older than
@@ -234,7 +427,7 @@ class PrLister:
         :param repo: Name of the current repo
         :type repo:
         :param pulls: List of Pull Requests in dict format
-        :type pulls: list
+        :type pulls: iterable
         :param args: string objects which represents the time difference
         of 'now'
         :returns: List of Pull Requests older than the time arguments
@@ -286,6 +479,30 @@ class PrLister:
         else:
             raise Exception('PrLister.list() failed due to missing arguments')
 
+    def get_org_repos(self, client, h, org):
+        """
+        Return the repositories of an organization to look at. With
+        --org-search only those having open Pull Requests, found with one
+        search instead of a listing per repository.
+        """
+        if self.args.org_search:
+            repos = get_pull_repos(client=client, org=org, repos=h['repos'])
+            if repos is not None:
+                return repos
+        if h['repos']:
+            return h['repos']
+        return get_repos(client=client, org=org)
+
+    async def get_org_repos_async(self, client, h, org):
+        if self.args.org_search:
+            repos = await get_pull_repos_async(
+                client=client, org=org, repos=h['repos'])
+            if repos is not None:
+                return repos
+        if h['repos']:
+            return h['repos']
+        return await get_repos_async(client=client, org=org)
+
     def list_failed_pr(self):
         """
         command: pr list failed
@@ -295,48 +512,355 @@ class PrLister:
         """
         check_config(command='pr_list_failed', config=self.config)
         self.hoster = self.config['pr_list_failed']['git_hoster']
+        if self.args.engine == 'async':
+            return create_result(run_async(self.list_failed_pr_async()))
 
-        failed_commits = []
+        self.set_zuul_client(get_zuul_client(
+            url=self.config['pr_list_failed'].get('zuul_url'),
+            args=self.args))
+
+        failed_commits = new_findings(self.args)
         for h in self.hoster:
             if h['name'] == 'gitea' or h['name'] == 'github':
-                headers = get_headers(
-                    hoster=h['name'],
-                    args=self.args
-                )
+                client = get_client(hoster=h, args=self.args)
                 for org in h['orgs']:
-                    repos = []
-                    if h['repos']:
-                        repos = h['repos']
-                    else:
-                        repos = get_repos(
-                            hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
-                            org=org
-                        )
-                    for repo in repos:
-                        pulls = get_pull_requests(
-                            hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
+                    if self.args.graphql and h['name'] == 'github':
+                        commits = self.get_failed_pr_graphql(client, h, org)
+                        if commits is not None:
+                            failed_commits.extend(commits)
+                            continue
+                    repos = self.get_org_repos(client, h, org)
+                    sync_org_pulls(client, org, repos)
+                    repo_pulls = run_parallel(
+                        lambda repo: get_pull_requests(
+                            client=client,
                             org=org,
                             repo=repo,
                             state='open'
-                        )
-                        if pulls:
-                            for pull in pulls:
-                                commits = self.get_failed_commits(
-                                    hoster=h['name'],
-                                    pull=pull,
-                                    url=h['api_url'],
-                                    org=org,
-                                    repo=repo,
-                                    headers=headers
-                                )
-                                failed_commits.extend(commits)
+                        ),
+                        repos,
+                        workers=self.args.workers)
+                    tasks = (
+                        (repo, pull)
+                        for repo, pulls in zip(repos, repo_pulls)
+                        for pull in pulls)
+                    results = run_parallel(
+                        lambda task: self.get_failed_commits(
+                            client=client,
+                            pull=task[1],
+                            org=org,
+                            repo=task[0]
+                        ),
+                        tasks,
+                        workers=self.args.workers)
+                    for commits in results:
+                        failed_commits.extend(commits)
 
         return create_result(failed_commits)
 
+    def list_repo_failed_pr(self, hoster, org, repo):
+        """
+        Collect the failed Pull Requests of a single repository, used to
+        update a served pr list --failed result after a webhook delivery.
+
+        Returns None if the repository is not covered by the configuration.
+        """
+        check_config(command='pr_list_failed', config=self.config)
+        h = find_hoster(
+            self.config['pr_list_failed']['git_hoster'], hoster, org, repo)
+        if h is None:
+            return None
+        if self.zuul_client is None:
+            self.set_zuul_client(get_zuul_client(
+                url=self.config['pr_list_failed'].get('zuul_url'),
+                args=self.args))
+        client = get_client(hoster=h, args=self.args)
+        results = run_parallel(
+            lambda pull: self.get_failed_commits(
+                client=client,
+                pull=pull,
+                org=org,
+                repo=repo
+            ),
+            get_pull_requests(
+                client=client,
+                org=org,
+                repo=repo,
+                state='open'
+            ),
+            workers=self.args.workers)
+        return create_result(
+            [o for commits in results for o in commits])['data']
+
+    async def add_builds_to_obj_async(self, obj, url, tenant):
+        with span('zuul', tenant=tenant):
+            uuid = buildset_uuid(url)
+            buildset = self.buildsets.get(tenant, uuid)
+            if buildset is None:
+                res_zuul = await self.zuul_client.get(
+                    self.buildset_url(url, tenant))
+                if res_zuul.status_code == 404:
+                    return obj
+                buildset = res_zuul.json()
+                self.buildsets.put(tenant, uuid, buildset)
+            return self.add_jobs_to_obj(obj, buildset)
+
+    async def get_failed_commits_async(self, client, pull, org, repo):
+        with span('status', hoster=client.name, org=org, repo=repo,
+                  number=pull.get('number')):
+            data = self.get_final_status(client, pull, org, repo)
+            if data is not None:
+                return await self.evaluate_failed_commit_async(
+                    client, pull, org, repo, data, stored=True)
+            res = None
+            try:
+                url = self.statuses_url(client, pull, org, repo)
+                res = await client.get(url)
+                if res.status_code != 200:
+                    raise Exception('Unexpected response of ' + url)
+                data = res.json()
+            except Exception as e:
+                return self.unchecked_commit(client, pull, org, repo, e, res)
+            return await self.evaluate_failed_commit_async(
+                client, pull, org, repo, data)
+
+    async def evaluate_failed_commit_async(self, client, pull, org, repo,
+                                           data, stored=False):
+        failed_commits = []
+        if not stored:
+            self.save_status(client, pull, org, repo, data)
+        failed = self.parse_failed_commit(
+            hoster=client.name,
+            pull=pull,
+            org=org,
+            repo=repo,
+            data=data)
+        if failed:
+            o, tenant = failed
+            if tenant:
+                o = await self.add_builds_to_obj_async(
+                    obj=o,
+                    url=o.zuul_url,
+                    tenant=tenant)
+            failed_commits.append(o)
+        return failed_commits
+
+    async def get_failed_pr_graphql_async(self, client, h, org):
+        try:
+            repo_pulls = await get_open_pulls_async(
+                client=client,
+                url=graphql_url(h),
+                org=org,
+                repos=h['repos'])
+        except Exception as e:
+            logging.warning(
+                'GraphQL failed for %s, falling back to REST: %s', org, e)
+            return None
+        tasks = []
+        for repo, pulls in repo_pulls:
+            for pull, data in pulls:
+                tasks.append((repo, pull, data))
+        results = await gather(
+            lambda task: self.evaluate_failed_commit_async(
+                client=client,
+                pull=task[1],
+                org=org,
+                repo=task[0],
+                data=task[2]
+            ),
+            tasks)
+        return [o for commits in results for o in commits]
+
+    async def get_repo_failed_pr_async(self, client, org, repo):
+        pulls = await get_pull_requests_async(
+            client=client,
+            org=org,
+            repo=repo,
+            state='open'
+        )
+        results = await gather(
+            lambda pull: self.get_failed_commits_async(
+                client=client,
+                pull=pull,
+                org=org,
+                repo=repo
+            ),
+            pulls)
+        return [o for commits in results for o in commits]
+
+    async def list_failed_pr_async(self):
+        """
+        Async engine variant of list_failed_pr().
+        """
+        self.set_zuul_client(get_async_zuul_client(
+            url=self.config['pr_list_failed'].get('zuul_url'),
+            args=self.args))
+
+        async def org_failed_pr(client, h, org):
+            """
+            Start collecting the failed Pull Requests of an organization,
+            returns one task per repository.
+            """
+            if self.args.graphql and h['name'] == 'github':
+                commits = await self.get_failed_pr_graphql_async(
+                    client, h, org)
+                if commits is not None:
+                    return [completed(commits)]
+            repos = await self.get_org_repos_async(client, h, org)
+            await sync_org_pulls_async(client, org, repos)
+            return start_tasks(
+                lambda repo: self.get_repo_failed_pr_async(
+                    client=client,
+                    org=org,
+                    repo=repo
+                ),
+                repos)
+
+        failed_commits = new_findings(self.args)
+        async with self.zuul_client:
+            for h in self.hoster:
+                if h['name'] == 'gitea' or h['name'] == 'github':
+                    async with get_async_client(h, self.args) as client:
+                        async for repo_tasks in iter_ordered(start_tasks(
+                                lambda org: org_failed_pr(client, h, org),
+                                h['orgs'])):
+                            async for commits in iter_ordered(repo_tasks):
+                                failed_commits.extend(commits)
+
+        return failed_commits
+
+    def add_ref_pulls(self, matrix, ref_pulls):
+        for pull in ref_pulls:
+            matrix[str(pull['number'])] = {
+                'title': pull['title'],
+                'url': pull['url'],
+                'state': pull['state'],
+                'pulls': []
+            }
+
+    def match_linked_pulls(self, matrix, pulls, orphans, pattern):
+        """
+        Link Pull Requests to their reference Pull Request in the matrix.
+        Linked Pull Requests with unknown reference are orphans, if open.
+        """
+        for pull in pulls:
+            ref = pattern.search(pull['title'])
+            if ref:
+                if ref.group(1) in matrix:
+                    pull_format = {
+                        'title': pull['title'],
+                        'url': pull['url'],
+                        'state': pull['state']
+                    }
+                    matrix[ref.group(1)]['pulls'].append(
+                        pull_format
+                    )
+                else:
+                    if pull['state'] == 'open':
+                        o = OrphanPR(
+                            title=pull['title'],
+                            url=pull['url'],
+                            state=pull['state']
+                        )
+                        orphans.append(o)
+
+    def linked_pulls(self, pulls, pattern):
+        """
+        Return only the Pull Requests referencing a reference Pull Request.
+        """
+        return [pull for pull in pulls if pattern.search(pull['title'])]
+
+    def get_repo_linked_pulls(self, client, org, repo, ref_repo, pattern):
+        if client.store is not None and client.incremental:
+            sync_pulls(client, org, repo)
+            return self.update_link_index(
+                client, org, repo, ref_repo, pattern)
+        return self.linked_pulls(iter_pull_requests(
+            client=client,
+            org=org,
+            repo=repo,
+        ), pattern)
+
+    async def get_repo_linked_pulls_async(
+            self, client, org, repo, ref_repo, pattern):
+        if client.store is not None and client.incremental:
+            await sync_pulls_async(client, org, repo)
+            return self.update_link_index(
+                client, org, repo, ref_repo, pattern)
+        pulls = await get_pull_requests_async(
+            client=client,
+            org=org,
+            repo=repo,
+        )
+        return self.linked_pulls(pulls, pattern)
+
+    def update_link_index(self, client, org, repo, ref_repo, pattern):
+        """
+        Update the stored index of linked Pull Requests of a repository
+        from the Pull Requests synchronized since its last update, and
+        return the linked Pull Requests.
+
+        Only Pull Requests changed since the last run are matched again;
+        the index has its own watermark, which also resets if the pattern
+        changes.
+        """
+        store = client.store
+        kind = 'links/' + ref_repo + '/' + pattern.pattern
+        watermark = store.get_watermark(client.api_url, org, repo, kind)
+        latest = watermark
+        links = []
+        unlinked = []
+        for pull in store.get_pulls_since(
+                client.api_url, org, repo, watermark):
+            latest = newest(pull['updated_at'], latest)
+            ref = pattern.search(pull['title'])
+            if ref:
+                links.append((int(ref.group(1)), pull))
+            else:
+                unlinked.append(pull['number'])
+        store.save_links(
+            client.api_url, org, ref_repo, repo, links, unlinked)
+        if latest:
+            store.set_watermark(client.api_url, org, repo, kind, latest)
+        return store.get_links(client.api_url, org, ref_repo, repo)
+
+    def filter_linked_repos(self, h, repos):
+        """
+        Leave out the reference repository and the excluded repositories
+        before any of their Pull Requests are requested.
+        """
+        exclude = set(h.get('exclude') or [])
+        exclude.add(h['ref_repo'])
+        return [r for r in repos if r not in exclude]
+
+    def get_matrix_orphans(self, matrix):
+        """
+        Return reference Pull Requests without any open linked Pull Request.
+        """
+        orphans = []
+        for item in matrix:
+            if not matrix[item]['pulls']:
+                o = OrphanPR(
+                    title=matrix[item]['title'],
+                    url=matrix[item]['url'],
+                    state=matrix[item]['state']
+                )
+                orphans.append(o)
+            else:
+                state_open = False
+                for p in matrix[item]['pulls']:
+                    if p['state'] == 'open':
+                        state_open = True
+
+                if not state_open:
+                    o = OrphanPR(
+                        title=matrix[item]['title'],
+                        url=matrix[item]['url'],
+                        state=matrix[item]['state']
+                    )
+                    orphans.append(o)
+        return orphans
+
     def list_orphans(self):
         """
         command: pr list --orphans
@@ -351,98 +875,98 @@ class PrLister:
         """
         check_config(command='pr_list_orphans', config=self.config)
         self.hoster = self.config['pr_list_orphans']['git_hoster']
+        if self.args.engine == 'async':
+            return create_result(run_async(self.list_orphans_async()))
 
         matrix = {}
-        orphans = []
+        orphans = new_findings(self.args)
         for h in self.hoster:
             if h['name'] == 'gitea' or h['name'] == 'github':
-                headers = get_headers(
-                    hoster=h['name'],
-                    args=self.args
-                )
+                client = get_client(hoster=h, args=self.args)
                 for org in h['orgs']:
+                    pattern = get_ref_pattern(
+                        org, h['ref_repo'], h.get('ref_pattern'))
+                    repos = []
+                    if h['repos']:
+                        repos = h['repos']
+                    else:
+                        repos = get_repos(client=client, org=org)
+                    repos = self.filter_linked_repos(h, repos)
+                    sync_org_pulls(client, org, [h['ref_repo']] + repos)
                     ref_pulls = get_pull_requests(
-                        hoster=h['name'],
-                        url=h['api_url'],
-                        headers=headers,
+                        client=client,
                         org=org,
                         repo=h['ref_repo'],
                         state='open'
                     )
-                    for pull in ref_pulls:
-                        matrix[str(pull['number'])] = {
-                            'title': pull['title'],
-                            'url': pull['url'],
-                            'state': pull['state'],
-                            'pulls': []
-                        }
-                    repos = []
-                    if h['repos']:
-                        repos = h['repos']
-                    else:
-                        repos = get_repos(
-                            hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
-                            org=org
-                        )
-                    for repo in repos:
-                        if repo == h['ref_repo']:
-                            continue
-                        pulls = get_pull_requests(
-                            hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
+                    self.add_ref_pulls(matrix, ref_pulls)
+                    repo_pulls = run_parallel(
+                        lambda repo: self.get_repo_linked_pulls(
+                            client=client,
                             org=org,
                             repo=repo,
-                        )
-                        if pulls:
-                            for pull in pulls:
-                                ref_num = re.findall(
-                                    r"docs\/doc-exports#([\d]+)",
-                                    pull['title'])
-                                if ref_num:
-                                    if ref_num[0] in matrix:
-                                        pull_format = {
-                                            'title': pull['title'],
-                                            'url': pull['url'],
-                                            'state': pull['state']
-                                        }
-                                        matrix[ref_num[0]]['pulls'].append(
-                                            pull_format
-                                        )
-                                    else:
-                                        if pull['state'] == 'open':
-                                            o = OrphanPR(
-                                                title=pull['title'],
-                                                url=pull['url'],
-                                                state=pull['state']
-                                            )
-                                            orphans.append(o)
-                for item in matrix:
-                    if not matrix[item]['pulls']:
-                        o = OrphanPR(
-                            title=matrix[item]['title'],
-                            url=matrix[item]['url'],
-                            state=matrix[item]['state']
-                        )
-                        orphans.append(o)
-                    else:
-                        state_open = False
-                        for p in matrix[item]['pulls']:
-                            if p['state'] == 'open':
-                                state_open = True
-
-                        if not state_open:
-                            o = OrphanPR(
-                                title=matrix[item]['title'],
-                                url=matrix[item]['url'],
-                                state=matrix[item]['state']
-                            )
-                            orphans.append(o)
+                            ref_repo=h['ref_repo'],
+                            pattern=pattern
+                        ),
+                        repos,
+                        workers=self.args.workers)
+                    for pulls in repo_pulls:
+                        self.match_linked_pulls(
+                            matrix, pulls, orphans, pattern)
+                orphans.extend(self.get_matrix_orphans(matrix))
 
         return create_result(orphans)
 
+    async def list_orphans_async(self):
+        """
+        Async engine variant of list_orphans().
+        """
+        async def org_pulls(client, h, org):
+            pattern = get_ref_pattern(
+                org, h['ref_repo'], h.get('ref_pattern'))
+            repos = []
+            if h['repos']:
+                repos = h['repos']
+            else:
+                repos = await get_repos_async(client=client, org=org)
+            repos = self.filter_linked_repos(h, repos)
+            await sync_org_pulls_async(
+                client, org, [h['ref_repo']] + repos)
+            ref_pulls, repo_pulls = await asyncio.gather(
+                get_pull_requests_async(
+                    client=client,
+                    org=org,
+                    repo=h['ref_repo'],
+                    state='open'
+                ),
+                gather(
+                    lambda repo: self.get_repo_linked_pulls_async(
+                        client=client,
+                        org=org,
+                        repo=repo,
+                        ref_repo=h['ref_repo'],
+                        pattern=pattern
+                    ),
+                    repos))
+            return pattern, ref_pulls, repo_pulls
+
+        matrix = {}
+        orphans = new_findings(self.args)
+        for h in self.hoster:
+            if h['name'] == 'gitea' or h['name'] == 'github':
+                async with get_async_client(h, self.args) as client:
+                    results = await gather(
+                        lambda org: org_pulls(client, h, org),
+                        h['orgs'])
+                for pattern, ref_pulls, repo_pulls in results:
+                    self.add_ref_pulls(matrix, ref_pulls)
+                    for pulls in repo_pulls:
+                        self.match_linked_pulls(
+                            matrix, pulls, orphans, pattern)
+                orphans.extend(self.get_matrix_orphans(matrix))
+
+        return orphans
+
     def list_older_pr(self):
         """
         command: pr list --older <age>
@@ -454,43 +978,137 @@ class PrLister:
         self.hoster = self.config['pr_list_older']['git_hoster']
 
         now = dt.datetime.now(dt.timezone.utc)
+        before = now - dt.timedelta(days=self.args.older)
+        if self.args.engine == 'async':
+            return create_result(
+                run_async(self.list_older_pr_async(now, before)))
 
-        old_pulls = []
+        old_pulls = new_findings(self.args)
         for h in self.hoster:
             if h['name'] == 'gitea' or h['name'] == 'github':
-                headers = get_headers(
-                    hoster=h['name'],
-                    args=self.args
-                )
+                client = get_client(hoster=h, args=self.args)
                 for org in h['orgs']:
+                    if client.index is None:
+                        pulls = search_pull_requests(
+                            client=client,
+                            org=org,
+                            created_before=before)
+                        if pulls is None and self.args.org_search \
+                                and h['name'] == 'gitea':
+                            pulls = search_pull_requests(
+                                client=client,
+                                org=org)
+                        if pulls is not None:
+                            old_pulls.extend(self.get_searched_old_pulls(
+                                h, org, pulls, now,
+                                h['repos'] or get_repos(
+                                    client=client, org=org)))
+                            continue
                     repos = []
                     if h['repos']:
                         repos = h['repos']
                     else:
-                        repos = get_repos(
+                        repos = get_repos(client=client, org=org)
+                    sync_org_pulls(client, org, repos)
+                    results = run_parallel(
+                        lambda repo: self.get_old_pulls(
+                            days=self.args.older,
                             hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
-                            org=org
-                        )
-                    for repo in repos:
-                        pulls = get_pull_requests(
-                            hoster=h['name'],
-                            url=h['api_url'],
-                            headers=headers,
-                            org=org,
-                            repo=repo,
-                            state='open'
-                        )
-                        if pulls:
-                            old_prs = self.get_old_pulls(
-                                days=self.args.older,
-                                hoster=h['name'],
-                                pulls=pulls,
-                                now=now,
+                            pulls=get_pull_requests_created_before(
+                                client=client,
                                 org=org,
                                 repo=repo,
-                            )
-                            old_pulls.extend(old_prs)
+                                before=before
+                            ),
+                            now=now,
+                            org=org,
+                            repo=repo,
+                        ),
+                        repos,
+                        workers=self.args.workers)
+                    for old_prs in results:
+                        old_pulls.extend(old_prs)
 
         return create_result(old_pulls)
+
+    def get_searched_old_pulls(self, h, org, pulls, now, repos):
+        """
+        Turn the old Pull Requests found by an organization search into
+        results, in the order of repos and newest first like those listed
+        per repository.
+        """
+        old_pulls = []
+        for repo, repo_pulls in group_by_repo(pulls, repos):
+            old_pulls.extend(self.get_old_pulls(
+                days=self.args.older,
+                hoster=h['name'],
+                pulls=newest_first(repo_pulls),
+                now=now,
+                org=org,
+                repo=repo,
+            ))
+        return old_pulls
+
+    async def get_repo_old_pulls_async(self, client, org, repo, now, before):
+        pulls = await get_pull_requests_created_before_async(
+            client=client,
+            org=org,
+            repo=repo,
+            before=before
+        )
+        return self.get_old_pulls(
+            days=self.args.older,
+            hoster=client.name,
+            pulls=pulls,
+            now=now,
+            org=org,
+            repo=repo,
+        )
+
+    async def list_older_pr_async(self, now, before):
+        """
+        Async engine variant of list_older_pr().
+        """
+        async def org_old_pulls(client, h, org):
+            if client.index is None:
+                pulls = await search_pull_requests_async(
+                    client=client,
+                    org=org,
+                    created_before=before)
+                if pulls is None and self.args.org_search \
+                        and h['name'] == 'gitea':
+                    pulls = await search_pull_requests_async(
+                        client=client,
+                        org=org)
+                if pulls is not None:
+                    repos = h['repos'] or await get_repos_async(
+                        client=client, org=org)
+                    return [completed(self.get_searched_old_pulls(
+                        h, org, pulls, now, repos))]
+            repos = []
+            if h['repos']:
+                repos = h['repos']
+            else:
+                repos = await get_repos_async(client=client, org=org)
+            await sync_org_pulls_async(client, org, repos)
+            return start_tasks(
+                lambda repo: self.get_repo_old_pulls_async(
+                    client=client,
+                    org=org,
+                    repo=repo,
+                    now=now,
+                    before=before
+                ),
+                repos)
+
+        old_pulls = new_findings(self.args)
+        for h in self.hoster:
+            if h['name'] == 'gitea' or h['name'] == 'github':
+                async with get_async_client(h, self.args) as client:
+                    async for repo_tasks in iter_ordered(start_tasks(
+                            lambda org: org_old_pulls(client, h, org),
+                            h['orgs'])):
+                        async for old_prs in iter_ordered(repo_tasks):
+                            old_pulls.extend(old_prs)
+
+        return old_pulls
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from attention_list.plugin import branch_lister
+from attention_list.plugin import pr_lister
+
+
+class Report:
+    """
+    Class which evaluates several lists against one crawl of the Git
+    hosters.
+
+    The hoster clients of a report share a crawl index, so repositories
+    and Pull Requests needed by more than one list are fetched only once.
+    """
+    def __init__(self, config, args):
+        self.config = config
+        self.args = args
+
+    def list(self):
+        """
+        command: report
+
+        Returns one result per requested list, keyed by the list name.
+        Orphans are evaluated first: they need all Pull Requests, the open
+        Pull Requests of the other lists are then taken from the index.
+        """
+        # A new crawl with its own indexes
+        self.args.crawl_indexes = {}
+        result = {}
+        prs = pr_lister.PrLister(config=self.config, args=self.args)
+        if self.args.orphans:
+            self.begin('orphans')
+            result['orphans'] = prs.list_orphans()
+        if self.args.failed:
+            self.begin('failed')
+            result['failed'] = prs.list_failed_pr()
+        if self.args.older:
+            self.begin('older')
+            result['older'] = prs.list_older_pr()
+        if self.args.empty_branches:
+            self.begin('empty_branches')
+            branches = branch_lister.BranchLister(
+                config=self.config,
+                args=self.args)
+            result['empty_branches'] = branches.list_empty()
+        return result
+
+    def begin(self, name):
+        """
+        Tag the streamed records of the following list with its name.
+        """
+        if self.args.writer is not None:
+            self.args.writer.report = name
@@ -0,0 +1,427 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime as dt
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from attention_list.helper.metrics import get_request_metrics
+from attention_list.helper.jsonlib import loads
+from attention_list.helper.output import dump_json
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_INTERVAL = 300
+
+# Webhook events which may change the result of a repository, per kind of
+# repository update, see RepoUpdater.
+WEBHOOK_EVENTS = {
+    'failed': {
+        'pull_request', 'status', 'check_run', 'check_suite', 'zuul'},
+    'empty': {'pull_request', 'push', 'create', 'delete'},
+}
+
+
+class ServedReport:
+    """
+    Latest result of one report refreshed by the daemon.
+
+    The result is serialized once per refresh, so reads only copy the
+    prepared response body.
+    """
+    def __init__(self, name, command, interval):
+        self.name = name
+        self.command = command
+        self.interval = interval
+        self.updated_at = None
+        self.duration = None
+        self.error = None
+        self.reconciled_at = None
+        self.result = None
+        self.body = None
+        self.updater = None
+        self.lock = threading.Lock()
+
+    def update(self, result=None, duration=None, error=None):
+        with self.lock:
+            if error is None:
+                self.result = result
+                self.updated_at = dt.datetime.now(dt.timezone.utc)
+                self.reconciled_at = self.updated_at
+                self.duration = duration
+            self.error = error
+            self.serialize()
+
+    def update_repo(self, field, hoster, org, repo, findings):
+        """
+        Replace the findings of one repository in the result.
+
+        The new findings take the place of the first old one, so the order
+        of the full crawl is kept as long as the repository had findings.
+        """
+        with self.lock:
+            if self.result is None:
+                return
+            data = []
+            position = None
+            for item in self.result['data']:
+                if (item.get(field) == hoster and item.get('org') == org
+                        and item.get('repo') == repo):
+                    if position is None:
+                        position = len(data)
+                    continue
+                data.append(item)
+            if position is None:
+                position = len(data)
+            data[position:position] = findings
+            self.result = {'meta': {'count': len(data)}, 'data': data}
+            self.updated_at = dt.datetime.now(dt.timezone.utc)
+            self.serialize()
+
+    def serialize(self):
+        if self.updated_at is None:
+            return
+        self.body = dump_json({
+            'name': self.name,
+            'command': self.command,
+            'updated_at': self.updated_at.isoformat(),
+            'reconciled_at': self.reconciled_at.isoformat(),
+            'duration': round(self.duration, 3),
+            'error': self.error,
+            'result': self.result,
+        }).encode()
+
+    def status(self):
+        with self.lock:
+            return {
+                'command': self.command,
+                'interval': self.interval,
+                'updated_at': (
+                    self.updated_at.isoformat() if self.updated_at
+                    else None),
+                'reconciled_at': (
+                    self.reconciled_at.isoformat() if self.reconciled_at
+                    else None),
+                'webhooks': self.updater is not None,
+                'error': self.error,
+            }
+
+
+class RepoUpdater:
+    """
+    Recomputes the findings of one repository for a served report.
+
+    kind selects the webhook events the report reacts on, field is the
+    name of the hoster field of its findings, update(hoster, org, repo)
+    returns the new findings or None if the repository is not covered.
+    """
+    def __init__(self, kind, field, update):
+        self.kind = kind
+        self.field = field
+        self.update = update
+
+
+class Server:
+    """
+    Class which keeps refreshing the configured reports and serves their
+    latest results over HTTP.
+
+    Every report runs a CLI command, e.g. 'pr list --failed', on its own
+    interval in its own thread. The hoster clients, the HTTP cache and the
+    snapshot store are shared between all runs, so connections and caches
+    stay warm. Reads are answered from memory and never cause upstream
+    traffic.
+
+    Webhook deliveries of Gitea, GitHub and Zuul update the failed PR and
+    empty branch reports for the affected repository only, the periodic
+    full refresh reconciles whatever a lost delivery missed.
+    """
+    def __init__(self, config, args, collect, repo_updater=None):
+        self.config = config.get_config()
+        self.args = args
+        self.collect = collect
+        self.stopped = threading.Event()
+        serve_config = self.config.get('serve') or {}
+        if not serve_config.get('reports'):
+            raise Exception('No reports defined in the serve section.')
+        self.host = args.host or serve_config.get('host') or DEFAULT_HOST
+        self.port = args.port or serve_config.get('port') or DEFAULT_PORT
+        self.webhook_secret = serve_config.get('webhook_secret')
+        self.webhook_unauthenticated = bool(
+            serve_config.get('webhook_unauthenticated'))
+        self.pending = {}
+        self.refreshing = set()
+        self.dirty = {}
+        self.changed = threading.Condition()
+        self.reports = {}
+        for r in serve_config['reports']:
+            report = ServedReport(
+                name=r['name'],
+                command=r['command'],
+                interval=(
+                    r.get('interval')
+                    or serve_config.get('interval')
+                    or DEFAULT_INTERVAL))
+            if repo_updater is not None:
+                report.updater = repo_updater(r['command'])
+            self.reports[r['name']] = report
+
+    def refresh(self, report):
+        with self.changed:
+            self.refreshing.add(report.name)
+        start = time.monotonic()
+        try:
+            result = self.collect(report.command)
+        except (Exception, SystemExit) as e:
+            logging.error('Report %s failed: %s', report.name, e)
+            report.update(error=str(e) or type(e).__name__)
+            return
+        else:
+            duration = time.monotonic() - start
+            report.update(result=result, duration=duration)
+            logging.info(
+                'Report %s refreshed in %.1fs', report.name, duration)
+        finally:
+            self.requeue_dirty(report)
+            self.write_metrics()
+
+    def write_metrics(self):
+        if not self.args.metrics_file:
+            return
+        try:
+            get_request_metrics().write_prometheus(self.args.metrics_file)
+        except OSError as e:
+            logging.error(
+                'Writing the metrics to %s failed: %s',
+                self.args.metrics_file, e)
+
+    def requeue_dirty(self, report):
+        """
+        A full refresh may have read a repository before a webhook changed
+        it, the repositories changed meanwhile are updated once more.
+        """
+        with self.changed:
+            self.refreshing.discard(report.name)
+            for repo, events in self.dirty.pop(report.name, {}).items():
+                self.pending.setdefault(repo, set()).update(events)
+            if self.pending:
+                self.changed.notify()
+
+    def run_report(self, report):
+        while not self.stopped.is_set():
+            try:
+                self.refresh(report)
+            except Exception:
+                # Keep refreshing, the next run may succeed
+                logging.exception('Refresh of report %s failed', report.name)
+            self.stopped.wait(report.interval)
+
+    def queue(self, hoster, org, repo, event):
+        """
+        Queue the update of a repository, several deliveries for the same
+        repository are coalesced into one update.
+        """
+        hosters = [hoster] if hoster else ['gitea', 'github']
+        with self.changed:
+            for name in hosters:
+                self.pending.setdefault((name, org, repo), set()).add(event)
+                for report in self.refreshing:
+                    self.dirty.setdefault(report, {}).setdefault(
+                        (name, org, repo), set()).add(event)
+            self.changed.notify()
+
+    def run_updates(self):
+        while not self.stopped.is_set():
+            with self.changed:
+                while not self.pending:
+                    self.changed.wait()
+                pending = self.pending
+                self.pending = {}
+            for (hoster, org, repo), events in pending.items():
+                for report in self.reports.values():
+                    self.update_repo(report, hoster, org, repo, events)
+
+    def update_repo(self, report, hoster, org, repo, events):
+        updater = report.updater
+        if updater is None or not events & WEBHOOK_EVENTS[updater.kind]:
+            return
+        if report.result is None:
+            return
+        start = time.monotonic()
+        try:
+            findings = updater.update(hoster, org, repo)
+        except (Exception, SystemExit) as e:
+            logging.error(
+                'Update of %s/%s in report %s failed: %s',
+                org, repo, report.name, e)
+            return
+        if findings is None:
+            return
+        report.update_repo(updater.field, hoster, org, repo, findings)
+        logging.info(
+            'Report %s updated for %s/%s/%s in %.1fs', report.name,
+            hoster, org, repo, time.monotonic() - start)
+
+    def verify_signature(self, headers, body):
+        """
+        Check the HMAC-SHA256 signature of a delivery. Without a webhook
+        secret deliveries are only accepted if webhook_unauthenticated is
+        set explicitly.
+        """
+        if not self.webhook_secret:
+            return self.webhook_unauthenticated
+        digest = hmac.new(
+            self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        signature = (
+            headers.get('X-Hub-Signature-256')
+            or headers.get('X-Gitea-Signature')
+            or '')
+        if signature.startswith('sha256='):
+            signature = signature[len('sha256='):]
+        return hmac.compare_digest(signature, digest)
+
+    def webhook(self, source, headers, body):
+        """
+        Handle a webhook delivery, returns the HTTP status and message.
+        """
+        if not self.verify_signature(headers, body):
+            return 401, 'Invalid signature'
+        try:
+            payload = loads(body or b'{}')
+        except ValueError:
+            return 400, 'Invalid payload'
+        if source == 'zuul':
+            # Zuul result notifications, e.g. of the MQTT reporter, name
+            # the project but not the hoster of its repository.
+            project = (
+                payload.get('project')
+                or (payload.get('buildset') or {}).get('project'))
+            hoster = None
+            event = 'zuul'
+        elif source in ('gitea', 'github'):
+            project = (payload.get('repository') or {}).get('full_name')
+            hoster = source
+            event = (
+                headers.get('X-GitHub-Event')
+                or headers.get('X-Gitea-Event'))
+        else:
+            return 404, 'Unknown webhook'
+        if not project or '/' not in project:
+            return 202, 'Ignored'
+        org, repo = project.split('/', 1)
+        if event not in set.union(*WEBHOOK_EVENTS.values()):
+            return 202, 'Ignored'
+        self.queue(hoster, org, repo, event)
+        return 202, 'Queued'
+
+    def index(self):
+        return json.dumps({
+            'reports': {
+                name: report.status()
+                for name, report in self.reports.items()}
+        }).encode()
+
+    def create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logging.debug(format, *args)
+
+            def send_body(self, status, body, headers=None,
+                          content_type='application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_message(self, status, message):
+                self.send_body(
+                    status, json.dumps({'message': message}).encode())
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0].rstrip('/')
+                if path == '':
+                    return self.send_body(200, server.index())
+                if path == '/metrics':
+                    return self.send_body(
+                        200, get_request_metrics().prometheus().encode(),
+                        content_type='text/plain; version=0.0.4')
+                if not path.startswith('/reports/'):
+                    return self.send_message(404, 'Not found')
+                report = server.reports.get(path[len('/reports/'):])
+                if report is None:
+                    return self.send_message(404, 'Unknown report')
+                with report.lock:
+                    body = report.body
+                    updated_at = report.updated_at
+                if body is None:
+                    return self.send_message(503, 'Report not ready yet')
+                age = (dt.datetime.now(dt.timezone.utc)
+                       - updated_at).total_seconds()
+                self.send_body(200, body, {
+                    'Last-Modified': format_datetime(updated_at, True),
+                    'Age': str(int(age)),
+                })
+
+            def do_POST(self):
+                path = self.path.split('?', 1)[0].rstrip('/')
+                if not path.startswith('/webhooks/'):
+                    return self.send_message(404, 'Not found')
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                status, message = server.webhook(
+                    path[len('/webhooks/'):], self.headers, body)
+                self.send_message(status, message)
+
+        return Handler
+
+    def run(self):
+        """
+        command: serve
+        """
+        for report in self.reports.values():
+            threading.Thread(
+                target=self.run_report,
+                args=(report,),
+                name='report-' + report.name,
+                daemon=True).start()
+        threading.Thread(
+            target=self.run_updates,
+            name='webhook-updates',
+            daemon=True).start()
+        httpd = ThreadingHTTPServer(
+            (self.host, self.port), self.create_handler())
+        httpd.daemon_threads = True
+        print(
+            'Serving ' + str(len(self.reports)) + ' reports on http://'
+            + self.host + ':' + str(self.port) + '/', flush=True)
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stopped.set()
+            httpd.server_close()
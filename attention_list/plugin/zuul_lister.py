@@ -13,8 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import requests
-
+from attention_list.helper.client import get_zuul_client
+from attention_list.helper.output import FindingStream
+from attention_list.helper.output import new_findings
 from attention_list.helper.utils import check_config
 
 
@@ -36,16 +37,15 @@ class ZuulLister:
         """
         command: zuul list errors
         """
-        data = []
-        headers = {}
-        headers['accept'] = 'application/json'
+        data = new_findings(self.args)
+        client = get_zuul_client(
+            url=self.config['zuul_list_errors']['url'],
+            config=self.config['zuul_list_errors'])
         tenants = self.config['zuul_list_errors']['tenants']
         for t in tenants:
             url = self.prepare_url(t)
-            res = requests.request('GET', url=url, headers=headers)
-            if res.json():
-                error_list = []
-                error_list = res.json()
+            error_list = client.get(url).json()
+            if error_list:
                 for e in error_list:
                     e['tenant'] = t
                 data.extend(error_list)
@@ -56,6 +56,8 @@ class ZuulLister:
         """
         Create dictionary result.
         """
+        if isinstance(data, FindingStream):
+            return data.close()
         result = {}
         result['meta'] = {}
         result['data'] = []
@@ -73,4 +75,6 @@ class ZuulLister:
         if self.args.errors:
             return self.create_result(self.list_errors())
         elif self.args.unknown_repos:
-            return self.create_result(['ToDo in Zuul lister'])
+            data = new_findings(self.args)
+            data.append('ToDo in Zuul lister')
+            return self.create_result(data)
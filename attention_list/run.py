@@ -14,14 +14,21 @@
 # limitations under the License.
 
 import argparse
+import cProfile
+import shlex
+import sys
 import logging
-import json
-import yaml
-from yaml.loader import SafeLoader
 
-from attention_list.plugin import branch_lister
-from attention_list.plugin import pr_lister
-from attention_list.plugin import zuul_lister
+from attention_list.helper.cache import DEFAULT_CACHE_SIZE
+from attention_list.helper.metrics import get_request_metrics
+from attention_list.helper.output import dump_json
+from attention_list.helper.output import dump_yaml
+from attention_list.helper.output import get_stream_writer
+from attention_list.helper.output import STREAM_FORMATS
+from attention_list.helper.trace import get_tracer
+from attention_list.helper.trace import span
+from attention_list.helper.trace import start_tracing
+from attention_list.plugin import load_plugin
 
 
 class AlConfig():
@@ -54,6 +61,81 @@ class AttentionList:
             action='store_true',
             help='Set yaml output format instead of json.'
         )
+        parser.add_argument(
+            '--format',
+            choices=['json', 'yaml'] + STREAM_FORMATS,
+            help='Output format, json by default. ndjson and yaml-stream '
+                 'write every finding as soon as it is found and the meta '
+                 'record last.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            metavar='N',
+            help='Number of repositories processed in parallel.'
+        )
+        parser.add_argument(
+            '--engine',
+            choices=['sync', 'async'],
+            default='sync',
+            help='Crawl engine, async requires aiohttp to be installed.'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Disable the on-disk HTTP response cache.'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            help='Directory of the HTTP response cache, defaults to '
+                 '~/.cache/attention-list/http.'
+        )
+        parser.add_argument(
+            '--cache-size',
+            type=int,
+            metavar='MB',
+            default=DEFAULT_CACHE_SIZE,
+            help='Maximum size of the HTTP response cache in MB.'
+        )
+        parser.add_argument(
+            '--store',
+            metavar='FILE',
+            help='Path of the SQLite snapshot store, defaults to '
+                 '~/.cache/attention-list/snapshot.sqlite.'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only fetch Pull Requests updated since the last run and '
+                 'answer the rest from the snapshot store.'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print the number, size, latency, status codes, retries '
+                 'and cache hits of the API requests per hoster and '
+                 'endpoint to stderr.'
+        )
+        parser.add_argument(
+            '--metrics-file',
+            metavar='FILE',
+            help='Write the request metrics in the Prometheus text format '
+                 'to FILE, e.g. for the node_exporter textfile collector.'
+        )
+        parser.add_argument(
+            '--trace',
+            metavar='FILE',
+            help='Write the timing of the crawl phases as Chrome trace '
+                 'event JSON to FILE, to be opened in chrome://tracing or '
+                 'Perfetto.'
+        )
+        parser.add_argument(
+            '--profile',
+            metavar='FILE',
+            help='Run the command under cProfile and write the pstats to '
+                 'FILE. Only the main thread is profiled.'
+        )
         self.createCommandParsers(parser)
 
         return parser
@@ -65,6 +147,8 @@ class AttentionList:
         self.add_branch_subparser(subparsers)
         self.add_metadata_subparser(subparsers)
         self.add_pr_subparser(subparsers)
+        self.add_report_subparser(subparsers)
+        self.add_serve_subparser(subparsers)
         self.add_zuul_subparser(subparsers)
 
         return subparsers
@@ -84,6 +168,12 @@ class AttentionList:
             '--empty',
             action='store_true',
             help='List empty branches')
+        cmd_branch_list.add_argument(
+            '--stale',
+            type=int,
+            metavar='DAYS',
+            help='Only list empty branches without commits in the last '
+                 '<value in days>')
         cmd_branch_list.add_argument(
             '--github-token',
             help='Provide GitHub token via CLI')
@@ -93,12 +183,12 @@ class AttentionList:
 
         cmd_branch_list.set_defaults(func=self.branch_lister)
 
-    def branch_lister(self):
-        if self.args.empty:
-            lister = branch_lister.BranchLister(
+    def branch_lister(self, args):
+        if args.empty:
+            lister = load_plugin('branch_lister').BranchLister(
                 config=self.config,
-                args=self.args)
-            self.create_result(lister.list_empty())
+                args=args)
+            return lister.list_empty()
         else:
             raise Exception(
                 'Branch lister has no proper command line option.')
@@ -123,7 +213,7 @@ class AttentionList:
 
         cmd_metadata_list.set_defaults(func=self.metadata_lister)
 
-    def metadata_lister(self):
+    def metadata_lister(self, args):
         print('Metadata Lister')
 
     # PR Subparsers
@@ -158,6 +248,17 @@ class AttentionList:
             type=int,
             metavar='DAYS',
             help='List PRs older than <value in days>')
+        cmd_pr_list.add_argument(
+            '--graphql',
+            action='store_true',
+            help='Use the GitHub GraphQL API to fetch open PRs and their '
+                 'check runs in batches, REST is used as fallback.')
+        cmd_pr_list.add_argument(
+            '--org-search',
+            action='store_true',
+            help='Find the open PRs of an organization with the issue search '
+                 'of the hoster and only look at repositories having open '
+                 'PRs, instead of listing every repository.')
         cmd_pr_list.add_argument(
             '--github-token',
             help='Provide GitHub token via CLI')
@@ -167,18 +268,143 @@ class AttentionList:
 
         cmd_pr_list.set_defaults(func=self.pr_lister)
 
-    def pr_lister(self):
+    def pr_lister(self, args):
         if not (
-                self.args.failed
-                or self.args.open
-                or self.args.timeout
-                or self.args.orphans
-                or self.args.older):
+                args.failed
+                or args.open
+                or args.timeout
+                or args.orphans
+                or args.older):
             raise Exception('PullRequest list parameter missing.')
-        lister = pr_lister.PrLister(
+        lister = load_plugin('pr_lister').PrLister(
             config=self.config,
-            args=self.args)
-        self.create_result(lister.list())
+            args=args)
+        return lister.list()
+
+    # Report Subparsers
+    def add_report_subparser(self, subparsers):
+        cmd_report = subparsers.add_parser(
+            'report',
+            help='Report parser, several lists from one crawl')
+        cmd_report.add_argument(
+            '--failed',
+            action='store_true',
+            help='List failed PRs')
+        cmd_report.add_argument(
+            '--older',
+            type=int,
+            metavar='DAYS',
+            help='List PRs older than <value in days>')
+        cmd_report.add_argument(
+            '--orphans',
+            action='store_true',
+            help='List orphan PRs')
+        cmd_report.add_argument(
+            '--empty-branches',
+            action='store_true',
+            help='List empty branches')
+        cmd_report.add_argument(
+            '--stale',
+            type=int,
+            metavar='DAYS',
+            help='Only list empty branches without commits in the last '
+                 '<value in days>')
+        cmd_report.add_argument(
+            '--graphql',
+            action='store_true',
+            help='Use the GitHub GraphQL API for the failed PRs.')
+        cmd_report.add_argument(
+            '--org-search',
+            action='store_true',
+            help='Find the open PRs of an organization with the issue search '
+                 'of the hoster for the failed and older PRs.')
+        cmd_report.add_argument(
+            '--github-token',
+            help='Provide GitHub token via CLI')
+        cmd_report.add_argument(
+            '--gitea-token',
+            help='Provide Gitea token via CLI')
+
+        cmd_report.set_defaults(func=self.report)
+
+    def report(self, args):
+        if not (
+                args.failed
+                or args.older
+                or args.orphans
+                or args.empty_branches):
+            raise Exception('Report parameter missing.')
+        lister = load_plugin('report').Report(
+            config=self.config,
+            args=args)
+        return lister.list()
+
+    # Serve Subparsers
+    def add_serve_subparser(self, subparsers):
+        cmd_serve = subparsers.add_parser(
+            'serve',
+            help='Run as daemon serving the reports of the serve section '
+                 'of the config file over HTTP')
+        cmd_serve.add_argument(
+            '--host',
+            help='Address to listen on, defaults to 127.0.0.1.')
+        cmd_serve.add_argument(
+            '--port',
+            type=int,
+            help='Port to listen on, defaults to 8080.')
+
+        cmd_serve.set_defaults(func=self.serve)
+
+    def serve(self, args):
+        server = load_plugin('serve').Server(
+            config=self.config,
+            args=args,
+            collect=self.collect,
+            repo_updater=self.repo_updater)
+        server.run()
+
+    def command_args(self, command):
+        """
+        Parse a command line like 'pr list --failed' of the serve section.
+        The global options given to serve apply to it as well, unless the
+        command line sets them itself.
+        """
+        namespace = argparse.Namespace(**{
+            name: getattr(self.args, name) for name in self.global_options})
+        args = self.parser.parse_args(
+            shlex.split(command), namespace=namespace)
+        args.writer = None
+        return args
+
+    def collect(self, command):
+        """
+        Run a command line like 'pr list --failed' and return its result.
+        """
+        args = self.command_args(command)
+        return args.func(args)
+
+    def repo_updater(self, command):
+        """
+        Return how a served command is updated for a single repository
+        after a webhook delivery, or None if it is only refreshed in full.
+        """
+        args = self.command_args(command)
+        serve = load_plugin('serve')
+        if args.func == self.pr_lister and args.failed:
+            lister = load_plugin('pr_lister').PrLister(
+                config=self.config, args=args)
+            return serve.RepoUpdater(
+                kind='failed',
+                field='host',
+                update=lister.list_repo_failed_pr)
+        if args.func == self.branch_lister and args.empty:
+            lister = load_plugin('branch_lister').BranchLister(
+                config=self.config, args=args)
+            return serve.RepoUpdater(
+                kind='empty',
+                field='hoster',
+                update=lister.list_repo_empty)
+        return None
 
     # Zuul Subparsers
     def add_zuul_subparser(self, subparsers):
@@ -203,24 +429,28 @@ class AttentionList:
 
         cmd_zuul_list.set_defaults(func=self.zuul_lister)
 
-    def zuul_lister(self):
-        if self.args.errors or self.args.unknown_repos:
-            lister = zuul_lister.ZuulLister(
+    def zuul_lister(self, args):
+        if args.errors or args.unknown_repos:
+            lister = load_plugin('zuul_lister').ZuulLister(
                 config=self.config,
-                args=self.args)
-            self.create_result(lister.list())
+                args=args)
+            return lister.list()
         else:
             raise Exception('Missing Zuul lister arguments')
 
     def parse_arguments(self, args=None):
         self.parser = self.create_parser()
         self.args = self.parser.parse_args(args)
+        # Without a command only the global options are set
+        self.global_options = list(vars(self.parser.parse_args([])))
 
     def read_config_file(self):
+        import yaml
         config = ''
         try:
             with open(self.args.config) as f:
-                config = yaml.load(f, Loader=SafeLoader)
+                config = yaml.load(
+                    f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
         except Exception:
             raise Exception(
                 'ERROR while loading config file from: '
@@ -228,25 +458,65 @@ class AttentionList:
         return config
 
     def create_result(self, data):
-        if data:
-            if self.args.yaml:
-                result = yaml.dump(data)
-            else:
-                result = json.dumps(data)
-        else:
+        if not data:
             raise Exception("Result data missing")
+        if self.args.writer is not None:
+            # Everything has been written while it was found
+            return
+        if self.args.format == 'yaml':
+            result = dump_yaml(data)
+        else:
+            result = dump_json(data)
 
         print(result)
 
     def main(self, args=None):
         self.parse_arguments(args)
+        if self.args.profile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(self.run)
+            finally:
+                profiler.dump_stats(self.args.profile)
+        else:
+            self.run()
+
+    def run(self):
+        if self.args.yaml and not self.args.format:
+            self.args.format = 'yaml'
+        self.args.writer = get_stream_writer(self.args)
 
         if self.args.debug:
             logging.basicConfig(level=logging.DEBUG)
+        if self.args.incremental and self.args.no_cache:
+            raise Exception(
+                '--incremental needs the snapshot store and can not be '
+                'combined with --no-cache.')
 
-        self.config = AlConfig()
-        self.config.config = self.read_config_file()
-        self.args.func()
+        if self.args.trace:
+            start_tracing()
+        try:
+            with span('config', cat='phase'):
+                self.config = AlConfig()
+                self.config.config = self.read_config_file()
+            with span('command', cat='phase'):
+                result = self.args.func(self.args)
+            # The daemon serves its results over HTTP, the metadata lister
+            # prints its own output
+            if self.args.func not in (self.serve, self.metadata_lister):
+                with span('serialize', cat='phase'):
+                    self.create_result(result)
+        finally:
+            self.report_metrics()
+            if self.args.trace:
+                get_tracer().write(self.args.trace)
+
+    def report_metrics(self):
+        metrics = get_request_metrics()
+        if self.args.stats:
+            print(metrics.summary(), file=sys.stderr)
+        if self.args.metrics_file:
+            metrics.write_prometheus(self.args.metrics_file)
 
 
 def main():
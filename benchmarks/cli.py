@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Runs the attention-list CLI and writes its peak RSS to the file named by
+BENCHMARK_RSS_FILE when it exits.
+
+The peak RSS reported by wait4() includes the memory of the benchmark
+process the command was forked from, so the command reports its own
+high-water mark instead.
+"""
+
+import os
+import resource
+import sys
+
+from attention_list.run import main
+
+
+def peak_rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        with open(os.environ['BENCHMARK_RSS_FILE'], 'w') as f:
+            f.write(str(peak_rss_kb()))
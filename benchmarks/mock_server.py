@@ -0,0 +1,590 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Fake Gitea, GitHub and Zuul API server with synthetic organizations.
+
+It implements the endpoints used by the listers: organization
+repositories, Pull Requests (with the sort orders used by the listers),
+branches (on GitHub with the commit sha only, like GitHub), commits,
+commit statuses and check runs, the issue searches, the GitHub GraphQL
+queries and the Zuul buildset and config-errors endpoints.
+Requests are counted per endpoint. The data is generated from a seed, so
+every run serves the same organizations.
+
+Run it standalone with `python -m benchmarks.mock_server`, then
+`GET /_counts` returns the request counts and
+`GET /_close?repo=org/repo&number=N` closes a Pull Request and
+`GET /_push?repo=org/repo&branch=name` pushes a new branch, e.g. to
+replay webhook deliveries against the serve command.
+"""
+
+import argparse
+import datetime as dt
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+GITEA_PREFIX = '/gitea/api/v1/'
+GITHUB_PREFIX = '/github/'
+ZUUL_PREFIX = '/zuul/'
+
+# Fixed "now" of the generated data, so ages do not depend on the day
+NOW = dt.datetime(2026, 10, 1, tzinfo=dt.timezone.utc)
+
+
+def iso(timestamp):
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def branch_sha(full, name):
+    return hashlib.sha1((full + '/' + name).encode()).hexdigest()
+
+
+def endpoint(path):
+    """
+    Name of the endpoint of a request path, numbers and shas replaced.
+    """
+    return re.sub(r'\d+', '#', re.sub(r'[0-9a-f]{32,}', '{sha}', path))
+
+
+class MockData:
+    """
+    Synthetic organizations served by the mock server.
+
+    Every organization has a reference repository and repos repositories.
+    About two thirds of the repositories have prs Pull Requests, with
+    random age, state, CI result and references to the reference
+    repository, plus branches stale branches without Pull Request.
+    """
+    def __init__(self, orgs=('docs',), repos=5, prs=4, branches=3, seed=1,
+                 ref_repo='doc-exports'):
+        rnd = random.Random(seed)
+        self.repos = {}
+        self.pulls = {}
+        self.branches = {}
+        self.statuses = {}
+        self.buildsets = {}
+        for org in orgs:
+            names = [ref_repo] + ['repo%03d' % i for i in range(repos)]
+            self.repos[org] = [
+                {'name': name, 'archived': False,
+                 'full_name': org + '/' + name,
+                 'pushed_at': iso(NOW), 'updated_at': iso(NOW)}
+                for name in names]
+            for name in names:
+                self.add_repo(rnd, org, name, ref_repo, prs, branches)
+
+    def add_repo(self, rnd, org, name, ref_repo, prs, branches):
+        full = org + '/' + name
+        pulls = []
+        repo_branches = [{'name': 'main', 'commit': {'timestamp': iso(NOW)}}]
+        for number in range(1, (prs if rnd.random() > 0.3 else 0) + 1):
+            created = NOW - dt.timedelta(days=rnd.randint(0, 200))
+            updated = created + dt.timedelta(days=rnd.randint(0, 5))
+            state = 'open' if rnd.random() > 0.3 else 'closed'
+            ref = 'branch-%d' % number
+            sha = '%040x' % rnd.getrandbits(160)
+            title = 'Change %d' % number
+            if name != ref_repo and rnd.random() > 0.5:
+                title += ' %s/%s#%d' % (org, ref_repo, rnd.randint(1, prs))
+            same_repo = rnd.random() > 0.2
+            pulls.append({
+                'number': number,
+                'title': title,
+                'state': state,
+                'url': 'https://host/%s/pulls/%d' % (full, number),
+                'html_url': 'https://host/%s/pull/%d' % (full, number),
+                'created_at': iso(created),
+                'updated_at': iso(updated),
+                'body': 'x' * 500,
+                'user': {'login': 'user', 'id': 1},
+                'head': {'ref': ref, 'sha': sha, 'repo': {
+                    'full_name': full if same_repo else 'fork/' + name}},
+                'base': {'ref': 'main', 'repo': {'full_name': full}},
+            })
+            if same_repo:
+                repo_branches.append({
+                    'name': ref, 'commit': {'timestamp': iso(updated)}})
+            r = rnd.random()
+            status = ('failure' if r < 0.4 else 'pending' if r < 0.5
+                      else 'success')
+            uuid = '%032x' % rnd.getrandbits(128)
+            self.statuses[(full, sha)] = (status, uuid, iso(updated))
+            self.buildsets[uuid] = {
+                'uuid': uuid,
+                'result': None if uuid[0] in '01' else 'FAILURE',
+                'builds': [{
+                    'uuid': uuid[:8] + str(j),
+                    'job_name': 'job%d' % j,
+                    'result': 'FAILURE',
+                    'log_url': 'https://logs/%s/%d' % (uuid, j)}
+                    for j in range(2)]}
+        for j in range(branches):
+            repo_branches.append({'name': 'stale-%d' % j, 'commit': {
+                'timestamp': iso(NOW - dt.timedelta(days=j * 40))}})
+        self.pulls[full] = pulls[::-1]
+        self.branches[full] = repo_branches
+
+    def open_pulls(self, org):
+        return self.org_pulls(org, 'open')
+
+    def org_pulls(self, org, state='open', since=None):
+        """
+        Yield the Pull Requests of an organization in a state, or all
+        states, and updated since a time.
+        """
+        for full, pulls in self.pulls.items():
+            if full.startswith(org + '/'):
+                for pull in pulls:
+                    if state != 'all' and pull['state'] != state:
+                        continue
+                    if since and pull['updated_at'] < since:
+                        continue
+                    yield full, pull
+
+    def later(self):
+        """
+        Return a time after all updates of the data so far.
+        """
+        latest = max([iso(NOW)] + [
+            pull['updated_at']
+            for pulls in self.pulls.values() for pull in pulls])
+        return iso(dt.datetime.strptime(latest, '%Y-%m-%dT%H:%M:%SZ')
+                   + dt.timedelta(days=1))
+
+    def close_pull(self, full, number):
+        for pull in self.pulls.get(full, []):
+            if pull['number'] == number:
+                pull['state'] = 'closed'
+                pull['updated_at'] = self.later()
+
+    def push_branch(self, full, name):
+        """
+        Push a new branch to a repository.
+        """
+        pushed_at = self.later()
+        self.branches[full].append(
+            {'name': name, 'commit': {'timestamp': pushed_at}})
+        org, repo = full.split('/', 1)
+        for item in self.repos[org]:
+            if item['name'] == repo:
+                item['pushed_at'] = item['updated_at'] = pushed_at
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, headers=None, status=200):
+        body = json.dumps(data).encode()
+        headers = dict(headers or {})
+        if status == 200:
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                self.server.count('304')
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def rate_limit_headers(self):
+        """
+        Account a GitHub request against the rate limit budget. Returns the
+        rate limit headers, or None if the request is rejected.
+        """
+        srv = self.server
+        if not srv.budget:
+            return {}
+        with srv.lock:
+            now = time.time()
+            if now >= srv.window_start + srv.window:
+                srv.window_start = now
+                srv.used = 0
+            reset = str(int(srv.window_start + srv.window))
+            if srv.used >= srv.budget:
+                srv.counts['403'] += 1
+                rejected = True
+            else:
+                srv.used += 1
+                rejected = False
+            headers = {
+                'X-RateLimit-Limit': str(srv.budget),
+                'X-RateLimit-Remaining': str(srv.budget - srv.used),
+                'X-RateLimit-Reset': reset}
+        if rejected:
+            self.send_json(
+                {'message': 'API rate limit exceeded'}, headers, 403)
+            return None
+        return headers
+
+    def page(self, items, query, hoster, headers):
+        page = int(query.get('page', ['1'])[0])
+        if hoster == 'gitea':
+            size = min(int(query.get('limit', ['30'])[0]), 50)
+            headers['X-Total-Count'] = str(len(items))
+        else:
+            size = min(int(query.get('per_page', ['30'])[0]), 100)
+            last = max(1, -(-len(items) // size))
+            headers['Link'] = (
+                '<http://%s%s?page=%d&per_page=%d>; rel="last"' % (
+                    self.headers['Host'], urlparse(self.path).path, last,
+                    size))
+        start = (page - 1) * size
+        return items[start:start + size]
+
+    def do_GET(self):
+        srv = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/_counts':
+            return self.send_json(srv.get_counts(reset='reset' in query))
+        if url.path == '/_close':
+            srv.data.close_pull(query['repo'][0], int(query['number'][0]))
+            return self.send_json({})
+        if url.path == '/_push':
+            srv.data.push_branch(query['repo'][0], query['branch'][0])
+            return self.send_json({})
+        time.sleep(srv.latency)
+        srv.count(endpoint(url.path))
+        if url.path.startswith(GITEA_PREFIX):
+            return self.git_get(
+                'gitea', url.path[len(GITEA_PREFIX):], query, {})
+        if url.path.startswith(GITHUB_PREFIX):
+            headers = self.rate_limit_headers()
+            if headers is None:
+                return
+            return self.git_get(
+                'github', url.path[len(GITHUB_PREFIX):], query, headers)
+        if url.path.startswith(ZUUL_PREFIX):
+            return self.zuul_get(url.path[len(ZUUL_PREFIX):])
+        self.send_json({'message': 'Not found'}, status=404)
+
+    def git_get(self, hoster, path, query, headers):
+        data = self.server.data
+        if path == 'repos/issues/search' and hoster == 'gitea':
+            found = [
+                dict(pull, repository={
+                    'name': full.split('/', 1)[1], 'full_name': full},
+                    pull_request={'merged': False})
+                for full, pull in data.org_pulls(
+                    query['owner'][0], query.get('state', ['open'])[0],
+                    query.get('since', [None])[0])]
+            found.sort(key=lambda pull: pull['updated_at'], reverse=True)
+            items = self.page(found, query, hoster, headers)
+            return self.send_json(items, headers)
+        if path == 'search/issues' and hoster == 'github':
+            terms = query['q'][0].split()
+            org = [t[len('org:'):] for t in terms if t.startswith('org:')][0]
+            before = [t[len('created:<'):] for t in terms
+                      if t.startswith('created:<')]
+            since = [t[len('updated:>='):] for t in terms
+                     if t.startswith('updated:>=')]
+            state = 'open' if 'is:open' in terms else 'all'
+            found = [
+                dict(pull, repository_url='https://api/repos/' + full,
+                     pull_request={'url': pull['url']})
+                for full, pull in data.org_pulls(
+                    org, state, since and since[0])
+                if not before or pull['created_at'] < before[0]]
+            sort = query.get('sort', ['created'])[0] + '_at'
+            found.sort(key=lambda pull: pull[sort], reverse=True)
+            items = self.page(found, query, hoster, headers)
+            return self.send_json(
+                {'total_count': len(found), 'items': items}, headers)
+        match = re.match(r'orgs/([^/]+)/repos$', path)
+        if match:
+            items = self.page(
+                data.repos.get(match.group(1), []), query, hoster, headers)
+            return self.send_json(items, headers)
+        match = re.match(r'repos/([^/]+/[^/]+)/pulls$', path)
+        if match:
+            pulls = self.sort_pulls(
+                data.pulls.get(match.group(1), []), query, hoster)
+            items = self.page(pulls, query, hoster, headers)
+            return self.send_json(items, headers)
+        match = re.match(r'repos/([^/]+/[^/]+)/branches$', path)
+        if match:
+            full = match.group(1)
+            branches = data.branches.get(full, [])
+            if hoster == 'github':
+                branches = [
+                    {'name': branch['name'], 'commit': {
+                        'sha': branch_sha(full, branch['name'])}}
+                    for branch in branches]
+            items = self.page(branches, query, hoster, headers)
+            return self.send_json(items, headers)
+        match = re.match(r'repos/([^/]+/[^/]+)/commits/([0-9a-f]+)$', path)
+        if match:
+            full, sha = match.groups()
+            for branch in data.branches.get(full, []):
+                if branch_sha(full, branch['name']) == sha:
+                    return self.send_json({'sha': sha, 'commit': {
+                        'committer': {
+                            'date': branch['commit']['timestamp']}}},
+                        headers)
+        match = re.match(
+            r'repos/([^/]+/[^/]+)/commits/([^/]+)/(statuses|check-runs)$',
+            path)
+        if match:
+            status = data.statuses.get((match.group(1), match.group(2)))
+            return self.send_json(self.commit_status(hoster, status), headers)
+        self.send_json({'message': 'Not found'}, headers, 404)
+
+    def sort_pulls(self, pulls, query, hoster):
+        state = query.get('state', [None])[0]
+        if hoster == 'github' and state is None:
+            state = 'open'
+        if state in ('open', 'closed'):
+            pulls = [pull for pull in pulls if pull['state'] == state]
+        sort = query.get('sort', [None])[0]
+        direction = query.get('direction', ['desc'])[0]
+        if sort in ('updated', 'recentupdate'):
+            return sorted(
+                pulls, key=lambda pull: pull['updated_at'], reverse=True)
+        if sort == 'oldest' or (sort == 'created' and direction == 'asc'):
+            return sorted(pulls, key=lambda pull: pull['created_at'])
+        return pulls
+
+    def commit_status(self, hoster, status):
+        if hoster == 'gitea':
+            if not status:
+                return []
+            return [{
+                'status': status[0],
+                'target_url': 'https://zuul/t/gl/buildset/' + status[1],
+                'updated_at': status[2]}]
+        if not status or status[0] == 'pending':
+            return {'total_count': 0, 'check_runs': []}
+        return {'total_count': 1, 'check_runs': [{
+            'id': 1,
+            'name': 'eco-check',
+            'conclusion': status[0],
+            'details_url': 'https://zuul/t/eco/buildset/' + status[1],
+            'completed_at': status[2]}]}
+
+    def zuul_get(self, path):
+        match = re.match(r'api/tenant/([^/]+)/buildset/(\w+)$', path)
+        if match:
+            buildset = self.server.data.buildsets.get(match.group(2))
+            if buildset:
+                return self.send_json(buildset)
+            return self.send_json({}, status=404)
+        if re.match(r'api/tenant/([^/]+)/config-errors$', path):
+            return self.send_json([{'error': 'error', 'source_context': {}}])
+        self.send_json({'message': 'Not found'}, status=404)
+
+    def do_POST(self):
+        srv = self.server
+        time.sleep(srv.latency)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        path = urlparse(self.path).path
+        srv.count(endpoint(path))
+        if path != GITHUB_PREFIX + 'graphql':
+            return self.send_json({'message': 'Not found'}, status=404)
+        self.send_json(self.graphql(body['query'], body['variables']))
+
+    def graphql(self, query, variables):
+        """
+        Answer the organization, repository and branch queries of
+        attention_list.helper.graphql.
+        """
+        data = self.server.data
+        if 'refs(' in query:
+            full = variables['org'] + '/' + variables['repo']
+            branches, info = self.graphql_page(
+                data.branches.get(full, []), variables['cursor'], 100)
+            nodes = [{
+                'name': branch['name'],
+                'target': {
+                    'oid': branch_sha(full, branch['name']),
+                    'committedDate': branch['commit']['timestamp']}}
+                for branch in branches]
+            return {'data': {'repository': {'refs': {
+                'pageInfo': info, 'nodes': nodes}}}}
+        if 'organization(' in query:
+            repos, info = self.graphql_page(
+                data.repos.get(variables['org'], []), variables['cursor'], 25)
+            nodes = [{
+                'name': repo['name'],
+                'isArchived': repo['archived'],
+                'pullRequests': self.pulls_connection(
+                    variables['org'] + '/' + repo['name'], None, 2)}
+                for repo in repos]
+            return {'data': {'organization': {'repositories': {
+                'pageInfo': info, 'nodes': nodes}}}}
+        full = variables['org'] + '/' + variables['repo']
+        return {'data': {'repository': {'pullRequests': self.pulls_connection(
+            full, variables['cursor'], 2)}}}
+
+    def graphql_page(self, items, cursor, size):
+        start = int(cursor or 0)
+        more = start + size < len(items)
+        return items[start:start + size], {
+            'hasNextPage': more, 'endCursor': str(start + size)}
+
+    def pulls_connection(self, full, cursor, size):
+        data = self.server.data
+        pulls = [p for p in data.pulls.get(full, []) if p['state'] == 'open']
+        page, info = self.graphql_page(pulls, cursor, size)
+        nodes = []
+        for pull in page:
+            status = data.statuses.get((full, pull['head']['sha']))
+            runs = []
+            if status and status[0] != 'pending':
+                runs = [{
+                    'databaseId': 1,
+                    'name': 'eco-check',
+                    'conclusion': status[0].upper(),
+                    'detailsUrl': 'https://zuul/t/eco/buildset/' + status[1],
+                    'completedAt': status[2]}]
+            nodes.append({
+                'number': pull['number'],
+                'title': pull['title'],
+                'url': pull['html_url'],
+                'createdAt': pull['created_at'],
+                'updatedAt': pull['updated_at'],
+                'headRefName': pull['head']['ref'],
+                'headRefOid': pull['head']['sha'],
+                'commits': {'nodes': [{'commit': {'checkSuites': {'nodes': [
+                    {'checkRuns': {'nodes': runs}}]}}}]}})
+        return {'pageInfo': info, 'nodes': nodes}
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+    Threaded mock API server counting the requests per endpoint.
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, budget=0, window=60, **kwargs):
+        super().__init__(('127.0.0.1', port), MockHandler)
+        self.data = MockData(**kwargs)
+        self.latency = latency
+        self.budget = budget
+        self.window = window
+        self.window_start = time.time()
+        self.used = 0
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server_address
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def get_counts(self, reset=False):
+        with self.lock:
+            counts = dict(self.counts)
+            if reset:
+                self.counts.clear()
+        return counts
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def add_data_arguments(parser):
+    parser.add_argument(
+        '--orgs',
+        nargs='+',
+        default=['docs'],
+        help='Names of the generated organizations.')
+    parser.add_argument(
+        '--repos',
+        type=int,
+        default=5,
+        help='Repositories per organization, besides the reference one.')
+    parser.add_argument(
+        '--prs',
+        type=int,
+        default=4,
+        help='Pull Requests of a repository having Pull Requests.')
+    parser.add_argument(
+        '--branches',
+        type=int,
+        default=3,
+        help='Stale branches without Pull Request per repository.')
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.0,
+        help='Seconds each request is delayed.')
+    parser.add_argument(
+        '--budget',
+        type=int,
+        default=0,
+        help='GitHub rate limit per window, unlimited by default.')
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=1,
+        help='Seed of the generated data.')
+
+
+def create_server(args, port=0):
+    return MockServer(
+        port=port,
+        latency=args.latency,
+        budget=args.budget,
+        orgs=args.orgs,
+        repos=args.repos,
+        prs=args.prs,
+        branches=args.branches,
+        seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fake Gitea, GitHub and Zuul API server')
+    parser.add_argument('--port', type=int, default=8765)
+    add_data_arguments(parser)
+    args = parser.parse_args()
+    server = create_server(args, port=args.port)
+    print('Serving mock APIs on ' + server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
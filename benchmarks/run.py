@@ -0,0 +1,360 @@
+#!/usr/bin/python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the CLI commands against the mock API server.
+
+Every command runs as its own process with a fresh HTTP cache and
+snapshot store, unless --warm is given. Wall time, requests per endpoint,
+peak RSS and the number of findings are recorded and written as JSON, so
+runs of different commits can be compared with --compare.
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+from benchmarks.mock_server import add_data_arguments
+from benchmarks.mock_server import create_server
+from benchmarks.mock_server import GITEA_PREFIX
+from benchmarks.mock_server import GITHUB_PREFIX
+from benchmarks.mock_server import ZUUL_PREFIX
+
+DEFAULT_COMMANDS = [
+    'pr list --failed',
+    'pr list --older 30',
+    'pr list --orphans',
+    'zuul list --errors',
+    'branch list --empty',
+    'report --failed --older 30 --orphans --empty-branches',
+]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+# Command lines whose start-up time is checked against --startup-budget,
+# they must not import the plugins of other commands.
+STARTUP_COMMANDS = ['--help', 'zuul list --help']
+
+
+def create_config(url, orgs):
+    """
+    Return an attention-list configuration pointing to the mock server.
+    """
+    def hosters(**extra):
+        return [
+            dict({
+                'name': name,
+                'api_url': url + prefix,
+                'orgs': list(orgs),
+                'repos': None,
+            }, **extra)
+            for name, prefix in (
+                ('github', GITHUB_PREFIX), ('gitea', GITEA_PREFIX))]
+
+    return {
+        'pr_list_failed': {
+            'zuul_url': url + ZUUL_PREFIX,
+            'git_hoster': hosters(),
+        },
+        'pr_list_older': {'git_hoster': hosters()},
+        'pr_list_orphans': {
+            'git_hoster': hosters(ref_repo='doc-exports', exclude=None)[1:],
+        },
+        'zuul_list_errors': {
+            'url': url + ZUUL_PREFIX,
+            'tenants': ['gl', 'eco'],
+        },
+        'branch_list_empty': {'git_hoster': hosters(ref_repo='doc-exports')},
+    }
+
+
+def count_findings(output):
+    """
+    Number of findings of a command output, summed over the lists of a
+    report.
+    """
+    try:
+        result = json.loads(output)
+    except ValueError:
+        return None
+    if 'meta' in result:
+        return result['meta'].get('count', 0)
+    return sum(
+        r['meta'].get('count', 0) for r in result.values()
+        if isinstance(r, dict) and 'meta' in r)
+
+
+def measure_startup(command, repeat=5):
+    """
+    Return the fastest of several runs of a command line in milliseconds.
+    """
+    times = []
+    for run in range(max(repeat, 5)):
+        start = time.monotonic()
+        subprocess.run(
+            [sys.executable, '-m', 'attention_list.run']
+            + shlex.split(command),
+            stdout=subprocess.DEVNULL, check=True)
+        times.append(time.monotonic() - start)
+    return round(1000 * min(times), 1)
+
+
+def read_int(path):
+    try:
+        with open(path) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def serialize_time(trace_file):
+    """
+    Milliseconds spent writing the result, taken from the trace.
+    """
+    try:
+        with open(trace_file) as f:
+            events = json.load(f)['traceEvents']
+    except (OSError, ValueError):
+        return None
+    return next((
+        round(e['dur'] / 1000, 2) for e in events
+        if e['name'] == 'serialize'), None)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Benchmark:
+    """
+    Runs the CLI commands against one mock server and collects the
+    measurements.
+    """
+    def __init__(self, args):
+        self.args = args
+        self.server = create_server(args).start()
+        self.workdir = tempfile.mkdtemp(prefix='attention-list-bench-')
+        self.config_file = os.path.join(self.workdir, 'config.yaml')
+        with open(self.config_file, 'w') as f:
+            yaml.safe_dump(create_config(self.server.url, args.orgs), f)
+
+    def command_line(self, command, cache_dir):
+        return (
+            [sys.executable, '-m', 'benchmarks.cli',
+             '--config', self.config_file,
+             '--cache-dir', os.path.join(cache_dir, 'http'),
+             '--store', os.path.join(cache_dir, 'snapshot.sqlite'),
+             '--trace', os.path.join(cache_dir, 'trace.json')]
+            + shlex.split(self.args.cli_args or '')
+            + shlex.split(command))
+
+    def run_command(self, command, cache_dir):
+        """
+        Run one command and return its measurements.
+        """
+        rss_file = os.path.join(cache_dir, 'rss')
+        env = dict(
+            os.environ, GITHUB_TOKEN='token', GITEA_TOKEN='token',
+            BENCHMARK_RSS_FILE=rss_file)
+        self.server.get_counts(reset=True)
+        with tempfile.TemporaryFile() as out, \
+                tempfile.TemporaryFile() as err:
+            start = time.monotonic()
+            proc = subprocess.run(
+                self.command_line(command, cache_dir),
+                stdout=out, stderr=err, env=env)
+            wall_time = time.monotonic() - start
+            out.seek(0)
+            output = out.read().decode(errors='replace')
+            err.seek(0)
+            errors = err.read().decode(errors='replace')
+        endpoints = self.server.get_counts(reset=True)
+        result = {
+            'command': command,
+            'returncode': proc.returncode,
+            'wall_time': round(wall_time, 3),
+            'requests': sum(
+                n for name, n in endpoints.items() if name != '304'),
+            'not_modified': endpoints.pop('304', 0),
+            'endpoints': dict(sorted(endpoints.items())),
+            'max_rss_kb': read_int(rss_file),
+            'findings': count_findings(output),
+            'serialize_ms': serialize_time(
+                os.path.join(cache_dir, 'trace.json')),
+        }
+        if proc.returncode != 0:
+            result['error'] = errors.strip().splitlines()[-1:]
+        return result
+
+    def run(self):
+        startup = {}
+        for command in STARTUP_COMMANDS:
+            startup[command] = measure_startup(command, self.args.repeat)
+            print('%-55s startup %6.1f ms' % (command, startup[command]))
+        results = []
+        for command in self.args.commands or DEFAULT_COMMANDS:
+            cache_dir = tempfile.mkdtemp(dir=self.workdir)
+            for run in range(self.args.repeat):
+                if run and not self.args.warm:
+                    cache_dir = tempfile.mkdtemp(dir=self.workdir)
+                result = self.run_command(command, cache_dir)
+                result['run'] = run + 1
+                results.append(result)
+                print_result(result)
+        self.server.shutdown()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return {
+            'commit': git_commit(),
+            'created_at': dt.datetime.now(dt.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'options': {
+                'orgs': self.args.orgs,
+                'repos': self.args.repos,
+                'prs': self.args.prs,
+                'branches': self.args.branches,
+                'latency': self.args.latency,
+                'budget': self.args.budget,
+                'seed': self.args.seed,
+                'cli_args': self.args.cli_args,
+                'repeat': self.args.repeat,
+                'warm': self.args.warm,
+            },
+            'startup_ms': startup,
+            'results': results,
+        }
+
+
+def print_result(result):
+    line = (
+        '%-55s run %d  %7.2fs  %6d requests  %7s KB  %s findings  '
+        'serialize %s ms' % (
+            result['command'][:55], result.get('run', 1),
+            result['wall_time'], result['requests'], result['max_rss_kb'],
+            result['findings'], result['serialize_ms']))
+    if result['returncode'] != 0:
+        line += '  FAILED ' + ' '.join(result.get('error', []))
+    print(line, flush=True)
+
+
+def compare(old, new):
+    """
+    Print the change of every measurement against an earlier run.
+    """
+    def key(result):
+        return result['command'], result.get('run', 1)
+
+    previous = {key(r): r for r in old['results']}
+    print('Compared to ' + str(old.get('commit')) + ':')
+    for command, ms in new['startup_ms'].items():
+        before = old.get('startup_ms', {}).get(command)
+        if before:
+            print('%-55s startup %+.0f%%' % (
+                command, 100.0 * (ms - before) / before))
+    for result in new['results']:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        changes = []
+        for name in ('wall_time', 'requests', 'max_rss_kb', 'serialize_ms'):
+            if before.get(name) and result.get(name) is not None:
+                changes.append('%s %+.0f%%' % (
+                    name, 100.0 * (result[name] - before[name])
+                    / before[name]))
+        if before['findings'] != result['findings']:
+            changes.append('findings %s -> %s' % (
+                before['findings'], result['findings']))
+        print('%-55s run %d  %s' % (
+            result['command'][:55], result.get('run', 1),
+            '  '.join(changes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the attention-list commands against a '
+                    'mock Gitea, GitHub and Zuul server.')
+    add_data_arguments(parser)
+    parser.add_argument(
+        '--command',
+        dest='commands',
+        action='append',
+        help='Command to benchmark, e.g. "pr list --failed". Can be given '
+             'several times, defaults to all lists and a report.')
+    parser.add_argument(
+        '--cli-args',
+        help='Global options of every command, e.g. "--workers 8".')
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=1,
+        help='Number of runs of every command.')
+    parser.add_argument(
+        '--warm',
+        action='store_true',
+        help='Keep the HTTP cache and snapshot store between the runs of '
+             'a command.')
+    parser.add_argument(
+        '--output',
+        help='JSON file of the results, defaults to '
+             'benchmarks/results/<commit>.json.')
+    parser.add_argument(
+        '--startup-budget',
+        type=float,
+        metavar='MS',
+        help='Fail if a start-up command line, e.g. --help, takes longer '
+             'than MS milliseconds.')
+    parser.add_argument(
+        '--compare',
+        metavar='FILE',
+        help='JSON results of an earlier run to compare with.')
+    args = parser.parse_args()
+
+    results = Benchmark(args).run()
+    output = args.output or os.path.join(
+        RESULTS_DIR, (results['commit'] or 'results') + '.json')
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('Results written to ' + output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    if args.startup_budget:
+        slow = {
+            command: ms for command, ms in results['startup_ms'].items()
+            if ms > args.startup_budget}
+        if slow:
+            sys.exit('Start-up budget of %.0f ms exceeded: %s' % (
+                args.startup_budget, ', '.join(
+                    '%s %.1f ms' % item for item in slow.items())))
+
+
+if __name__ == '__main__':
+    main()
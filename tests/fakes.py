@@ -0,0 +1,103 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class FakeConfig:
+
+    def __init__(self, config=None):
+        self.config = config or {}
+
+    def get_config(self):
+        return self.config
+
+
+class FakeResponse:
+
+    def __init__(self, data=None, status_code=200, url='', headers=None):
+        self.data = data
+        self.status_code = status_code
+        self.reason = 'OK' if status_code == 200 else 'Error'
+        self.url = url
+        self.headers = headers or {}
+        self.content = json.dumps(data).encode()
+
+    def json(self):
+        return self.data
+
+
+class FakeClient:
+    """
+    Client answering from recorded responses, keyed by URL relative to the
+    API. A response is given as data, or as a (status_code, data) or
+    (status_code, data, headers) tuple.
+    POST requests are answered in the order of the list of responses
+    given for their URL.
+    """
+    def __init__(self, name, responses, api_url=None, store=None):
+        self.name = name
+        self.api_url = api_url or 'https://%s.example.com/api/' % name
+        self.responses = responses
+        self.store = store
+        self.cache = None
+        self.incremental = False
+        self.page_size = None
+        self.index = None
+        self.workers = 1
+        self.synced = set()
+        self.requests = []
+
+    def respond(self, method, url):
+        self.requests.append((method, url))
+        path = url[len(self.api_url):]
+        if path not in self.responses:
+            return FakeResponse({'message': 'Not Found'}, 404, url)
+        answer = self.responses[path]
+        if method == 'POST':
+            answer = answer.pop(0)
+        if isinstance(answer, tuple):
+            return FakeResponse(answer[1], answer[0], url, *answer[2:])
+        return FakeResponse(answer, url=url)
+
+    def get(self, url, **kwargs):
+        return self.respond('GET', url)
+
+    def post(self, url, **kwargs):
+        return self.respond('POST', url)
+
+    def map(self, func, items):
+        return [func(item) for item in items]
+
+
+class AsyncFakeClient(FakeClient):
+
+    async def get(self, url, **kwargs):
+        return self.respond('GET', url)
+
+    async def post(self, url, **kwargs):
+        return self.respond('POST', url)
@@ -0,0 +1,70 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import unittest
+
+from attention_list.helper.aio import completed
+from attention_list.helper.aio import iter_ordered
+from attention_list.helper.aio import start_tasks
+
+
+class TestIterOrdered(unittest.TestCase):
+
+    def test_results_in_order_as_soon_as_done(self):
+        async def run():
+            events = {name: asyncio.Event() for name in 'abc'}
+            log = []
+
+            async def repo(name):
+                await events[name].wait()
+                log.append('done ' + name)
+                return name
+
+            tasks = start_tasks(repo, 'abc')
+            # c finishes first, but is only yielded after a and b
+            events['c'].set()
+            await asyncio.sleep(0)
+            events['a'].set()
+            async for result in iter_ordered(tasks):
+                log.append('yield ' + result)
+                if result == 'a':
+                    # b is still running while a is written
+                    self.assertFalse(tasks[1].done())
+                    events['b'].set()
+            return log
+
+        self.assertEqual(
+            ['done c', 'done a', 'yield a', 'done b', 'yield b', 'yield c'],
+            asyncio.run(run()))
+
+    def test_completed(self):
+        async def run():
+            return [r async for r in iter_ordered([completed([1, 2])])]
+
+        self.assertEqual([[1, 2]], asyncio.run(run()))
+
+    def test_remaining_tasks_are_cancelled(self):
+        async def run():
+            async def fail():
+                raise ValueError('boom')
+
+            tasks = start_tasks(
+                lambda item: fail() if item else asyncio.sleep(60), [1, 0])
+            with self.assertRaises(ValueError):
+                async for result in iter_ordered(tasks):
+                    pass
+            await asyncio.sleep(0)
+            return tasks[1].cancelled()
+
+        self.assertTrue(asyncio.run(run()))
@@ -0,0 +1,268 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import asyncio
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from attention_list.helper.store import SnapshotStore
+from attention_list.plugin.branch_lister import BranchLister
+from attention_list.run import AttentionList
+from benchmarks.mock_server import MockServer
+from benchmarks.run import create_config
+from tests.fakes import AsyncFakeClient
+from tests.fakes import FakeClient
+from tests.fakes import FakeConfig
+
+
+def days_ago(days):
+    return (dt.datetime.now(dt.timezone.utc)
+            - dt.timedelta(days=days)).isoformat()
+
+
+# GitHub lists branches with the commit sha only
+GITHUB_BRANCHES = [
+    {'name': 'main', 'commit': {'sha': 'a0'}},
+    {'name': 'old', 'commit': {'sha': 'a1'}},
+    {'name': 'recent', 'commit': {'sha': 'a2'}},
+    {'name': 'reviewed', 'commit': {'sha': 'a3'}},
+    {'name': 'missing', 'commit': {'sha': 'a4'}},
+]
+
+PULLS = [{
+    'base': {'repo': {'full_name': 'docs/guide'}},
+    'head': {'repo': {'full_name': 'docs/guide'}, 'ref': 'reviewed'},
+}]
+
+
+def commit(days):
+    return {'sha': 'x', 'commit': {'committer': {'date': days_ago(days)}}}
+
+
+RESPONSES = {
+    'repos/docs/guide/commits/a1': commit(60),
+    'repos/docs/guide/commits/a2': commit(2),
+}
+
+GRAPHQL_URL = 'https://github.example.com/api/graphql'
+
+
+def refs(*branches):
+    """
+    GraphQL response listing branches given as (name, sha, days) tuples
+    """
+    return {'data': {'repository': {'refs': {
+        'pageInfo': {'hasNextPage': False, 'endCursor': None},
+        'nodes': [
+            {'name': name,
+             'target': {'oid': sha, 'committedDate': days_ago(days)}}
+            for name, sha, days in branches]}}}}
+
+
+GRAPHQL_BRANCHES = refs(
+    ('main', 'a0', 1), ('old', 'a1', 60), ('recent', 'a2', 2),
+    ('reviewed', 'a3', 40), ('missing', 'a4', 90))
+
+
+class TestStaleBranches(unittest.TestCase):
+
+    def setUp(self):
+        self.lister = BranchLister(FakeConfig(), argparse.Namespace(stale=30))
+
+    def test_commit_dates_of_github_branches(self):
+        client = FakeClient('github', RESPONSES)
+        branches = self.lister.parse_branches(GITHUB_BRANCHES)
+        with self.assertLogs(level='WARNING'):
+            branches = self.lister.add_commit_dates(
+                client, 'docs', 'guide', PULLS, branches)
+        self.assertEqual(
+            ['old', 'reviewed', 'missing'], [b['name'] for b in branches])
+        # Branches with an open Pull Request are not looked up
+        self.assertEqual([
+            'https://github.example.com/api/repos/docs/guide/commits/a1',
+            'https://github.example.com/api/repos/docs/guide/commits/a2',
+            'https://github.example.com/api/repos/docs/guide/commits/a4',
+        ], [url for method, url in client.requests])
+        self.assertEqual({'sha': 'a1'}, GITHUB_BRANCHES[1]['commit'])
+        empty = self.lister.get_empty_branches(
+            'github', 'docs', 'guide', PULLS, branches)
+        self.assertEqual(['old', 'missing'], [b.name for b in empty])
+
+    def test_commit_dates_of_github_branches_async(self):
+        client = AsyncFakeClient('github', RESPONSES)
+        branches = self.lister.parse_branches(GITHUB_BRANCHES)
+        with self.assertLogs(level='WARNING'):
+            branches = asyncio.run(self.lister.add_commit_dates_async(
+                client, 'docs', 'guide', PULLS, branches))
+        self.assertEqual(
+            ['old', 'reviewed', 'missing'], [b['name'] for b in branches])
+
+    def check_branches_listed_with_dates(self, client, branches):
+        self.assertEqual(
+            ['old', 'reviewed', 'missing'], [b['name'] for b in branches])
+        self.assertEqual(
+            [('POST', GRAPHQL_URL)], client.requests)
+        # Nothing left to look up
+        branches = self.lister.add_commit_dates(
+            client, 'docs', 'guide', PULLS, branches)
+        self.assertEqual(1, len(client.requests))
+        empty = self.lister.get_empty_branches(
+            'github', 'docs', 'guide', PULLS, branches)
+        self.assertEqual(['old', 'missing'], [b.name for b in empty])
+
+    def test_github_branches_are_listed_with_dates(self):
+        client = FakeClient('github', {'graphql': [GRAPHQL_BRANCHES]})
+        branches = self.lister.get_branches(
+            client, 'docs', 'guide', graphql=GRAPHQL_URL)
+        self.check_branches_listed_with_dates(client, branches)
+
+    def test_github_branches_are_listed_with_dates_async(self):
+        client = AsyncFakeClient('github', {'graphql': [GRAPHQL_BRANCHES]})
+        branches = asyncio.run(self.lister.get_branches_async(
+            client, 'docs', 'guide', graphql=GRAPHQL_URL))
+        self.check_branches_listed_with_dates(client, branches)
+
+    def test_rest_is_used_if_graphql_fails(self):
+        client = FakeClient('github', {
+            'graphql': [(502, {'message': 'Bad Gateway'})],
+            'repos/docs/guide/branches?per_page=100&page=1': GITHUB_BRANCHES,
+        })
+        client.page_size = 100
+        with self.assertLogs(level='WARNING'):
+            branches = self.lister.get_branches(
+                client, 'docs', 'guide', graphql=GRAPHQL_URL)
+        self.assertEqual(
+            ['old', 'recent', 'reviewed', 'missing'],
+            [b['name'] for b in branches])
+
+    def test_gitea_branches_are_not_looked_up(self):
+        client = FakeClient('gitea', {})
+        branches = self.lister.parse_branches([
+            {'name': 'old', 'commit': {'id': 'a1', 'timestamp': days_ago(60)}},
+            {'name': 'new', 'commit': {'id': 'a2', 'timestamp': days_ago(2)}},
+        ])
+        branches = self.lister.add_commit_dates(
+            client, 'docs', 'guide', [], branches)
+        self.assertEqual(['old'], [b['name'] for b in branches])
+        self.assertEqual([], client.requests)
+
+
+GITEA_BRANCHES = [
+    {'name': 'main', 'commit': {'id': 'a0', 'timestamp': days_ago(1)}},
+    {'name': 'old', 'commit': {'id': 'a1', 'timestamp': days_ago(60)}},
+]
+
+
+class TestStoredBranches(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(
+            os.path.join(self.tmp.name, 'snapshot.sqlite'))
+        self.lister = BranchLister(FakeConfig(), argparse.Namespace())
+        self.client = FakeClient('gitea', {
+            'repos/docs/guide/branches?limit=50&page=1': (
+                200, GITEA_BRANCHES, {'X-Total-Count': '2'}),
+        }, store=self.store)
+        self.client.page_size = 50
+        self.client.incremental = True
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def push(self, pushed_at):
+        self.store.save_repos(
+            self.client.api_url, 'docs', [('guide', pushed_at)])
+
+    def get_branches(self, **kwargs):
+        return [b['name'] for b in self.lister.get_branches(
+            self.client, 'docs', 'guide', **kwargs)]
+
+    def test_branches_are_fetched_after_a_push(self):
+        self.push('2026-09-01T10:00:00Z')
+        self.assertEqual(['old'], self.get_branches())
+        self.assertEqual(['old'], self.get_branches())
+        self.assertEqual(1, len(self.client.requests))
+        self.push('2026-09-02T10:00:00Z')
+        self.assertEqual(['old'], self.get_branches())
+        self.assertEqual(2, len(self.client.requests))
+        branches = asyncio.run(
+            self.lister.get_branches_async(self.client, 'docs', 'guide'))
+        self.assertEqual(['old'], [b['name'] for b in branches])
+        self.assertEqual(2, len(self.client.requests))
+
+    def test_branches_are_fetched_without_push_time(self):
+        self.get_branches()
+        self.get_branches()
+        self.assertEqual(2, len(self.client.requests))
+
+    def test_webhook_updates_fetch_the_branches(self):
+        self.push('2026-09-01T10:00:00Z')
+        self.get_branches()
+        self.get_branches(stored=False)
+        self.assertEqual(2, len(self.client.requests))
+
+    def test_only_incremental_runs_use_the_store(self):
+        self.client.incremental = False
+        self.push('2026-09-01T10:00:00Z')
+        self.get_branches()
+        self.get_branches()
+        self.assertEqual(2, len(self.client.requests))
+
+
+class TestStaleBranchList(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(repos=10).start()
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config = os.path.join(tmp.name, 'config.yaml')
+        with open(self.config, 'w') as f:
+            json.dump(create_config(self.server.url, ['docs']), f)
+
+    def list_stale(self, engine):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            AttentionList().main([
+                '--config', self.config, '--engine', engine, '--no-cache',
+                'branch', 'list', '--empty', '--stale', '30',
+                '--github-token', 'token', '--gitea-token', 'token'])
+        findings = {}
+        for finding in json.loads(out.getvalue())['data']:
+            findings.setdefault(finding.pop('hoster'), []).append(finding)
+        return findings, self.server.get_counts(reset=True)
+
+    def check_no_request_per_branch(self, engine):
+        findings, counts = self.list_stale(engine)
+        # The mock serves the same repositories on both hosters
+        self.assertTrue(findings['gitea'])
+        self.assertEqual(findings['gitea'], findings['github'])
+        # One GraphQL request per repository instead of its REST listing
+        self.assertEqual(11, counts['/github/graphql'])
+        self.assertNotIn('/github/repos/docs/repo#/branches', counts)
+        self.assertFalse([
+            endpoint for endpoint in counts if '/commits/' in endpoint])
+
+    def test_no_request_per_branch(self):
+        self.check_no_request_per_branch('sync')
+
+    def test_no_request_per_branch_async(self):
+        self.check_no_request_per_branch('async')
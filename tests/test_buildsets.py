@@ -0,0 +1,58 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import unittest
+
+from attention_list.helper.buildsets import buildset_uuid
+from attention_list.helper.buildsets import BuildsetCache
+from attention_list.plugin.pr_lister import FailedPR
+from attention_list.plugin.pr_lister import PrLister
+from tests.fakes import FakeClient
+from tests.fakes import FakeConfig
+from tests.fakes import load_fixture
+
+
+ZUUL_URL = 'https://zuul.example.com/'
+
+
+class TestBuildsets(unittest.TestCase):
+
+    def test_buildset_uuid(self):
+        for url in (ZUUL_URL + 't/eco/buildset/bs310',
+                    ZUUL_URL + 't/eco/buildset/bs310/'):
+            self.assertEqual('bs310', buildset_uuid(url))
+
+    def test_empty_uuid_is_not_cached(self):
+        cache = BuildsetCache(ZUUL_URL)
+        cache.put('eco', '', {'result': 'FAILURE'})
+        self.assertIsNone(cache.get('eco', ''))
+
+    def test_trailing_slash(self):
+        lister = PrLister(FakeConfig(), argparse.Namespace())
+        zuul = FakeClient(
+            'zuul', load_fixture('zuul_buildsets.json'), api_url=ZUUL_URL)
+        lister.set_zuul_client(zuul)
+        jobs = {}
+        for uuid in ('bs310', 'bs402'):
+            url = ZUUL_URL + 't/eco/buildset/' + uuid + '/'
+            o = lister.add_builds_to_obj(
+                FailedPR(created_at=None, host='github', updated_at=None,
+                         url=None, zuul_url=url),
+                url=url, tenant='eco')
+            jobs[uuid] = o.jobs[0]['uuid']
+        self.assertEqual({'bs310': 'b3101', 'bs402': 'b4021'}, jobs)
+        self.assertEqual([
+            ('GET', ZUUL_URL + 'api/tenant/eco/buildset/bs310'),
+            ('GET', ZUUL_URL + 'api/tenant/eco/buildset/bs402'),
+        ], zuul.requests)
@@ -0,0 +1,124 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+from attention_list.helper.aio import AsyncHosterClient
+from attention_list.helper.aio import run_async
+from attention_list.helper.cache import HttpCache
+from attention_list.helper.client import HosterClient
+from benchmarks.mock_server import GITEA_PREFIX
+from benchmarks.mock_server import MockServer
+
+URL = 'https://gitea.example.com/api/v1/repos/docs/guide/pulls'
+HEADERS = {'Authorization': 'token secret'}
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = tmp.name
+        self.cache = HttpCache(self.path)
+
+    def store(self, url, content=b'[]', etag='"1"'):
+        self.cache.store(url, HEADERS, {
+            'ETag': etag, 'Content-Length': str(len(content))}, content)
+
+    def test_validators_and_headers(self):
+        self.store(URL, b'[1]')
+        entry = self.cache.get(URL, HEADERS)
+        self.assertEqual(b'[1]', entry.content)
+        self.assertEqual({'If-None-Match': '"1"'}, entry.conditional_headers())
+        # The transfer headers of a 304 response do not describe the body
+        self.assertEqual(
+            {'ETag': '"1"', 'Date': 'today'},
+            entry.merge_headers({'Date': 'today', 'Content-Length': '0'}))
+        # Entries are kept per auth identity
+        self.assertIsNone(self.cache.get(URL, {'Authorization': 'other'}))
+        # and on disk
+        self.assertEqual(
+            b'[1]', HttpCache(self.path).get(URL, HEADERS).content)
+
+    def test_responses_without_validators_are_not_stored(self):
+        self.cache.store(URL, HEADERS, {'Content-Length': '2'}, b'[]')
+        self.assertIsNone(self.cache.get(URL, HEADERS))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.store(URL + '?page=1', b'x' * 100)
+        self.store(URL + '?page=2', b'x' * 100)
+        self.cache.touch(self.cache.get(URL + '?page=1', HEADERS))
+        # Room for two entries
+        self.cache.max_size = self.cache.size
+        self.store(URL + '?page=3', b'x' * 100)
+        self.assertIsNotNone(self.cache.get(URL + '?page=1', HEADERS))
+        self.assertIsNone(self.cache.get(URL + '?page=2', HEADERS))
+        self.assertIsNotNone(self.cache.get(URL + '?page=3', HEADERS))
+        self.assertEqual(2, len(os.listdir(self.path)))
+
+    def test_missing_and_corrupt_entries(self):
+        self.store(URL + '?page=1')
+        self.store(URL + '?page=2')
+        self.store(URL + '?page=3')
+        os.remove(self.cache._file(self.cache.key(URL + '?page=1', HEADERS)))
+        with open(self.cache._file(
+                self.cache.key(URL + '?page=2', HEADERS)), 'wb') as f:
+            f.write(b'{"url"')
+        with open(self.cache._file(
+                self.cache.key(URL + '?page=3', HEADERS)), 'wb') as f:
+            f.write(b'[]\n[]')
+        for page in (1, 2, 3):
+            self.assertIsNone(self.cache.get(URL + '?page=%d' % page, HEADERS))
+        # Stored again by the next response
+        self.store(URL + '?page=2', b'[2]', etag='"2"')
+        self.assertEqual(
+            b'[2]', self.cache.get(URL + '?page=2', HEADERS).content)
+
+
+class TestRevalidation(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = HttpCache(tmp.name)
+        self.api_url = self.server.url + GITEA_PREFIX
+        self.url = self.api_url + 'orgs/docs/repos'
+
+    def test_not_modified_response_is_served_from_the_cache(self):
+        client = HosterClient(
+            'gitea', self.api_url, headers=HEADERS, cache=self.cache)
+        self.addCleanup(client.close)
+        first = client.get(self.url)
+        second = client.get(self.url)
+        self.assertEqual(200, second.status_code)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(1, self.server.get_counts()['304'])
+
+    def test_not_modified_response_is_served_from_the_cache_async(self):
+        async def get_twice():
+            client = AsyncHosterClient(
+                'gitea', self.api_url, headers=HEADERS, cache=self.cache)
+            async with client:
+                return await client.get(self.url), await client.get(self.url)
+
+        first, second = run_async(get_twice())
+        self.assertEqual(200, second.status_code)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(1, self.server.get_counts()['304'])
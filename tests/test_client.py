@@ -0,0 +1,100 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import tempfile
+import threading
+import unittest
+
+from attention_list.helper.client import close_clients
+from attention_list.helper.client import get_client
+from attention_list.helper.index import get_crawl_index
+from attention_list.helper.store import get_store
+
+
+HOSTER = {'name': 'gitea', 'api_url': 'https://gitea.example.com/api/v1/'}
+
+
+def create_args(**kwargs):
+    return argparse.Namespace(
+        gitea_token='token', no_cache=True, workers=4, **kwargs)
+
+
+def concurrently(func, count=16):
+    """
+    Call func from several threads at once and return the results.
+    """
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        barrier.wait()
+        results[i] = func()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestClientRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        close_clients()
+
+    def test_one_client_per_hoster(self):
+        args = create_args()
+        clients = concurrently(lambda: get_client(HOSTER, args))
+        self.assertEqual(1, len(set(map(id, clients))))
+        self.assertIsNone(clients[0].index)
+
+    def test_one_store_per_path(self):
+        with tempfile.TemporaryDirectory() as path:
+            args = argparse.Namespace(
+                no_cache=False, store=os.path.join(path, 'snapshot.sqlite'))
+            stores = concurrently(lambda: get_store(args))
+            self.assertEqual(1, len(set(map(id, stores))))
+
+    def test_report_runs_have_their_own_index(self):
+        shared = get_client(HOSTER, create_args())
+        runs = [create_args(crawl_indexes={}) for i in range(2)]
+        clients = [get_client(HOSTER, args) for args in runs]
+        self.assertIsNot(clients[0].index, clients[1].index)
+        self.assertIs(clients[0].index, get_client(HOSTER, runs[0]).index)
+        # The runs share the connection pool of the hoster client
+        for client in clients:
+            self.assertIs(shared.session, client.session)
+            self.assertIs(shared.executor, client.executor)
+        # Data indexed by one run is not seen or reset by the other
+        clients[0].index.get(('repos', 'docs'), lambda: ['guide'])
+        self.assertEqual(
+            ['other'],
+            clients[1].index.get(('repos', 'docs'), lambda: ['other']))
+        self.assertIsNone(shared.index)
+
+    def test_no_index_outside_report(self):
+        self.assertIsNone(get_crawl_index(('gitea',), create_args()))
+
+    def test_clients_follow_the_options_of_the_run(self):
+        client = get_client(HOSTER, create_args())
+        self.assertIs(client, get_client(HOSTER, create_args()))
+        other = get_client(
+            HOSTER, argparse.Namespace(
+                gitea_token='token', no_cache=True, workers=1,
+                incremental=True))
+        self.assertIsNot(client.session, other.session)
+        self.assertEqual((4, False), (client.workers, client.incremental))
+        self.assertEqual((1, True), (other.workers, other.incremental))
@@ -0,0 +1,88 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import asyncio
+import unittest
+
+from attention_list.helper.graphql import ORG_QUERY
+from attention_list.helper.graphql import REPO_QUERY
+from attention_list.plugin.pr_lister import PrLister
+from tests.fakes import AsyncFakeClient
+from tests.fakes import FakeClient
+from tests.fakes import FakeConfig
+from tests.fakes import load_fixture
+
+
+API_URL = 'https://api.github.com/'
+ZUUL_URL = 'https://zuul.example.com/'
+HOSTER = {'name': 'github', 'api_url': API_URL, 'repos': ['guide']}
+
+
+def create_lister(client_class=FakeClient):
+    lister = PrLister(FakeConfig(), argparse.Namespace(workers=2))
+    lister.set_zuul_client(client_class(
+        'zuul', load_fixture('zuul_buildsets.json'), api_url=ZUUL_URL))
+    return lister
+
+
+def rest_findings():
+    responses = load_fixture('github_rest_pulls.json')
+    client = FakeClient('github', responses, api_url=API_URL)
+    lister = create_lister()
+    failed = []
+    for pull in responses['repos/docs/guide/pulls?state=open']:
+        failed.extend(
+            lister.get_failed_commits(client, pull, 'docs', 'guide'))
+    return [o.to_dict() for o in failed]
+
+
+def graphql_responses():
+    return {'graphql': [load_fixture('github_graphql_pulls.json')]}
+
+
+class TestGraphQL(unittest.TestCase):
+
+    def test_only_latest_check_runs_are_queried(self):
+        for query in (ORG_QUERY, REPO_QUERY):
+            self.assertIn('filterBy: {checkType: LATEST}', query)
+
+    def test_same_findings_as_rest(self):
+        client = FakeClient('github', graphql_responses(), api_url=API_URL)
+        failed = create_lister().get_failed_pr_graphql(
+            client, HOSTER, 'docs')
+        self.assertEqual(rest_findings(), [o.to_dict() for o in failed])
+
+    def test_same_findings_as_rest_async(self):
+        client = AsyncFakeClient(
+            'github', graphql_responses(), api_url=API_URL)
+        failed = asyncio.run(create_lister(
+            AsyncFakeClient).get_failed_pr_graphql_async(
+                client, HOSTER, 'docs'))
+        self.assertEqual(rest_findings(), [o.to_dict() for o in failed])
+
+    def test_rerun_findings(self):
+        failed = {o['url'].rsplit('/', 1)[-1]: o for o in rest_findings()}
+        # The failure of #11 was superseded by a successful re-run in the
+        # same suite, the success of #12 by a failed re-run in a new suite
+        self.assertEqual(['12', '13', '14'], sorted(failed))
+        self.assertEqual(1000, failed['12']['error'])
+        self.assertEqual(
+            ZUUL_URL + 't/eco/buildset/bs310', failed['12']['zuul_url'])
+        self.assertEqual(
+            ['build-docs', 'tox-pep8'],
+            [job['name'] for job in failed['12']['jobs']])
+        self.assertEqual(1001, failed['13']['error'])
+        # The newest check run of the head is evaluated
+        self.assertEqual(
+            ZUUL_URL + 't/eco/buildset/bs402', failed['14']['zuul_url'])
@@ -0,0 +1,79 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from benchmarks.mock_server import MockServer
+from benchmarks.run import create_config
+
+# Runs the CLI in a fresh interpreter and reports which of the modules
+# given as arguments are loaded once it is done.
+LOADED_MODULES = '''
+import json
+import sys
+
+from attention_list.run import main
+
+modules = sys.argv[1].split(',')
+sys.argv = ['attentionlist'] + sys.argv[2:]
+try:
+    main()
+finally:
+    sys.stderr.write('\\n' + json.dumps(
+        [name for name in modules if name in sys.modules]))
+'''
+
+PLUGINS = [
+    'attention_list.plugin.branch_lister',
+    'attention_list.plugin.pr_lister',
+    'attention_list.plugin.report',
+    'attention_list.plugin.serve',
+    'attention_list.plugin.zuul_lister',
+]
+
+
+def loaded_modules(modules, argv):
+    res = subprocess.run(
+        [sys.executable, '-c', LOADED_MODULES, ','.join(modules)] + argv,
+        capture_output=True, text=True, cwd=os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__))))
+    return res, json.loads(res.stderr.splitlines()[-1])
+
+
+class TestImports(unittest.TestCase):
+
+    def test_help_imports_no_plugin(self):
+        modules = PLUGINS + ['aiohttp', 'dateutil', 'requests', 'yaml']
+        res, loaded = loaded_modules(modules, ['--help'])
+        self.assertEqual([], loaded)
+
+    def test_zuul_list_imports_its_plugin_only(self):
+        server = MockServer().start()
+        self.addCleanup(server.shutdown)
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.yaml', delete=False) as f:
+            # JSON is valid YAML
+            json.dump(create_config(server.url, ['docs']), f)
+        self.addCleanup(os.unlink, f.name)
+
+        modules = PLUGINS + ['aiohttp']
+        res, loaded = loaded_modules(modules, [
+            '--config', f.name, '--no-cache', 'zuul', 'list', '--errors'])
+        self.assertEqual(0, res.returncode, res.stderr)
+        self.assertEqual(2, json.loads(res.stdout)['meta']['count'])
+        self.assertEqual(['attention_list.plugin.zuul_lister'], loaded)
@@ -0,0 +1,77 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+import unittest
+
+from attention_list.helper.index import CrawlIndex
+
+
+class TestCrawlIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CrawlIndex()
+        self.fetches = []
+
+    def fetch(self, value):
+        def fetch():
+            self.fetches.append(value)
+            # Long enough for the other callers to wait for this fetch
+            time.sleep(0.05)
+            return value
+        return fetch
+
+    def test_concurrent_gets_fetch_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.index.get(
+                ('repos', 'docs'), self.fetch(['guide']))))
+            for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([['guide']], self.fetches)
+        self.assertEqual([['guide']] * 8, results)
+        # Other keys are fetched on their own
+        self.index.get(('repos', 'eco'), self.fetch(['api']))
+        self.assertEqual([['guide'], ['api']], self.fetches)
+
+    def test_concurrent_async_gets_fetch_once(self):
+        async def fetch():
+            self.fetches.append('guide')
+            await asyncio.sleep(0.05)
+            return ['guide']
+
+        async def get_all():
+            return await asyncio.gather(*[
+                self.index.get_async(('repos', 'docs'), fetch)
+                for i in range(8)])
+
+        self.assertEqual([['guide']] * 8, asyncio.run(get_all()))
+        self.assertEqual(['guide'], self.fetches)
+        self.assertEqual(
+            ['guide'], self.index.get(('repos', 'docs'), self.fetch(None)))
+        self.assertEqual(['guide'], self.fetches)
+
+    def test_open_pulls_from_all_pulls(self):
+        self.assertIsNone(self.index.open_pulls('docs', 'guide', 'open'))
+        self.index.get(('pulls', 'docs', 'guide', 'all'), self.fetch([
+            {'number': 1, 'state': 'open'},
+            {'number': 2, 'state': 'closed'}]))
+        self.assertEqual(
+            [{'number': 1, 'state': 'open'}],
+            self.index.open_pulls('docs', 'guide', 'open'))
+        self.assertIsNone(self.index.open_pulls('docs', 'guide', 'closed'))
@@ -0,0 +1,34 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import unittest
+
+from attention_list.helper import jsonlib
+
+
+DOCUMENT = {'title': 'Übersicht / Docs', 'number': 7, 'labels': [], 'x': None}
+
+
+class TestJsonlib(unittest.TestCase):
+
+    def test_loads_bytes_and_str(self):
+        text = json.dumps(DOCUMENT)
+        self.assertEqual(DOCUMENT, jsonlib.loads(text))
+        self.assertEqual(DOCUMENT, jsonlib.loads(text.encode()))
+
+    def test_dumps_is_the_json_module_output(self):
+        # Whatever backend parses, the written bytes stay the same
+        self.assertEqual(json.dumps(DOCUMENT), jsonlib.dumps(DOCUMENT))
+        self.assertEqual(
+            '{"set": [1]}', jsonlib.dumps({'set': {1}}, default=sorted))
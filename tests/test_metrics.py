@@ -0,0 +1,59 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import threading
+import unittest
+
+from attention_list.helper.metrics import RequestMetrics
+
+
+class TestWritePrometheus(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'al.prom')
+        self.metrics = RequestMetrics()
+        self.metrics.record(
+            'github', 'GET', 'repos/{org}/{repo}/pulls', 200, 512, 0.2, 0, 0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_concurrent_writers(self):
+        errors = []
+
+        def write():
+            try:
+                for i in range(20):
+                    self.metrics.write_prometheus(self.path)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors)
+        self.assertEqual(['al.prom'], os.listdir(self.tmp.name))
+        with open(self.path) as f:
+            self.assertEqual(self.metrics.prometheus(), f.read())
+        self.assertEqual(0o644, os.stat(self.path).st_mode & 0o777)
+
+    def test_failed_write_leaves_no_file(self):
+        self.metrics.prometheus = lambda: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            self.metrics.write_prometheus(self.path)
+        self.assertEqual([], os.listdir(self.tmp.name))
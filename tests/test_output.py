@@ -0,0 +1,43 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from attention_list.helper.output import dump_json
+from attention_list.helper.output import Record
+
+
+class Finding(Record):
+    __slots__ = ('name', 'jobs', 'url')
+    optional = ('jobs',)
+
+    def __init__(self, name, url, jobs=None):
+        self.name = name
+        self.url = url
+        self.jobs = jobs
+
+
+class TestRecord(unittest.TestCase):
+
+    def test_to_dict_keeps_the_field_order(self):
+        self.assertEqual(
+            ['name', 'url'], list(Finding('a', 'u').to_dict()))
+        self.assertEqual(
+            ['name', 'url', 'jobs'],
+            list(Finding('a', 'u', jobs=[]).to_dict()))
+
+    def test_dump_json(self):
+        self.assertEqual(
+            '[{"name": "a", "url": "u"}, '
+            '{"name": "b", "url": null, "jobs": ["j"]}]',
+            dump_json([Finding('a', 'u'), Finding('b', None, ['j'])]))
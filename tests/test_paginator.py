@@ -0,0 +1,83 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import unittest
+
+from attention_list.helper.paginator import iter_pages
+from attention_list.helper.paginator import iter_pages_async
+from tests.fakes import AsyncFakeClient
+from tests.fakes import FakeClient
+
+
+def capped_listing(name, total, cap, page_size, headers=None):
+    """
+    Responses of a listing of total items served in pages of at most cap
+    items, whatever page size is requested.
+    """
+    param = 'limit' if name == 'gitea' else 'per_page'
+    items = list(range(total))
+    responses = {}
+    for page in range(1, total // cap + 3):
+        path = 'repos/docs/guide/pulls?state=open&%s=%d&page=%d' % (
+            param, page_size, page)
+        data = items[(page - 1) * cap:page * cap]
+        responses[path] = (200, data, dict(headers or {}))
+    return responses
+
+
+def collect(client):
+    url = client.api_url + 'repos/docs/guide/pulls?state=open'
+    return [item for data in iter_pages(client, url) for item in data]
+
+
+class TestIterPages(unittest.TestCase):
+
+    def create_client(self, total, cap, headers=None, name='gitea',
+                      client_class=FakeClient):
+        client = client_class(
+            name, capped_listing(name, total, cap, 50, headers))
+        client.page_size = 50
+        return client
+
+    def test_pages_capped_by_the_hoster(self):
+        client = self.create_client(70, 30, {'X-Total-Count': '70'})
+        self.assertEqual(list(range(70)), collect(client))
+        self.assertEqual(3, len(client.requests))
+
+    def test_pages_capped_without_total(self):
+        client = self.create_client(60, 30)
+        self.assertEqual(list(range(60)), collect(client))
+        # The empty page after the last full one ends the listing
+        self.assertEqual(3, len(client.requests))
+
+    def test_single_short_page(self):
+        client = self.create_client(10, 30, {'X-Total-Count': '10'})
+        self.assertEqual(list(range(10)), collect(client))
+        self.assertEqual(1, len(client.requests))
+        # GitHub sends a Link header whenever there are more pages
+        client = self.create_client(10, 100, name='github')
+        self.assertEqual(list(range(10)), collect(client))
+        self.assertEqual(1, len(client.requests))
+
+    def test_pages_capped_by_the_hoster_async(self):
+        client = self.create_client(
+            70, 30, {'X-Total-Count': '70'}, client_class=AsyncFakeClient)
+
+        async def collect_async():
+            url = client.api_url + 'repos/docs/guide/pulls?state=open'
+            return [item async for data in iter_pages_async(client, url)
+                    for item in data]
+
+        self.assertEqual(list(range(70)), asyncio.run(collect_async()))
+        self.assertEqual(3, len(client.requests))
@@ -0,0 +1,273 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from attention_list.helper.store import SnapshotStore
+from attention_list.plugin.pr_lister import PrLister
+from attention_list.run import AttentionList
+from benchmarks.mock_server import MockServer
+from benchmarks.run import create_config
+from tests.fakes import AsyncFakeClient
+from tests.fakes import FakeClient
+from tests.fakes import FakeConfig
+
+
+PULL = {
+    'number': 7,
+    'title': 'Update the user guide',
+    'url': 'https://gitea.example.com/docs/guide/pulls/7',
+    'html_url': 'https://github.com/docs/guide/pull/7',
+    'created_at': '2026-09-01T10:00:00Z',
+    'updated_at': '2026-09-02T10:00:00Z',
+    'head': {'sha': 'abc123', 'ref': 'update'},
+}
+
+
+class TestFailedCommits(unittest.TestCase):
+
+    def setUp(self):
+        self.lister = PrLister(FakeConfig(), argparse.Namespace())
+
+    def test_unavailable_status_is_kept_as_unchecked(self):
+        for hoster, path in (
+                ('gitea', 'repos/docs/guide/commits/abc123/statuses?limit=1'),
+                ('github', 'repos/docs/guide/commits/abc123/check-runs')):
+            client = FakeClient(hoster, {path: (500, {'message': 'boom'})})
+            with self.assertLogs(level='WARNING') as logs:
+                failed = self.lister.get_failed_commits(
+                    client, PULL, 'docs', 'guide')
+            self.assertIn('docs/guide#7', logs.output[0])
+            self.assertEqual(1, len(failed))
+            self.assertEqual('unchecked', failed[0].status)
+            self.assertEqual(1002, failed[0].error)
+            self.assertEqual(hoster, failed[0].host)
+
+    def test_unavailable_status_is_kept_as_unchecked_async(self):
+        client = AsyncFakeClient('github', {})
+        with self.assertLogs(level='WARNING'):
+            failed = asyncio.run(self.lister.get_failed_commits_async(
+                client, PULL, 'docs', 'guide'))
+        self.assertEqual(['unchecked'], [f.status for f in failed])
+
+    def test_successful_status_is_not_listed(self):
+        client = FakeClient('gitea', {
+            'repos/docs/guide/commits/abc123/statuses?limit=1': [{
+                'status': 'success',
+                'target_url': 'https://zuul.example.com/t/gl/buildset/1',
+                'updated_at': '2026-09-02T10:00:00Z'}]})
+        self.assertEqual([], self.lister.get_failed_commits(
+            client, PULL, 'docs', 'guide'))
+
+
+GITEA_STATUSES = 'repos/docs/guide/commits/abc123/statuses?limit=1'
+GITHUB_CHECK_RUNS = 'repos/docs/guide/commits/abc123/check-runs'
+
+
+def gitea_status(status):
+    return [{
+        'status': status,
+        'target_url': 'https://zuul.example.com/t/gl/buildset/1',
+        'updated_at': '2026-09-02T10:00:00Z'}]
+
+
+def github_check_run(conclusion):
+    return {'check_runs': [{
+        'conclusion': conclusion,
+        'details_url': 'https://zuul.example.com/t/eco/buildset/1',
+        'completed_at': '2026-09-02T10:00:00Z'}]}
+
+
+class TestFinalStatus(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = SnapshotStore(os.path.join(tmp.name, 'snapshot.sqlite'))
+        self.addCleanup(self.store.close)
+        self.lister = PrLister(FakeConfig(), argparse.Namespace())
+        self.lister.set_zuul_client(FakeClient(
+            'zuul', {}, api_url='https://zuul.example.com/'))
+
+    def failed(self, client, pull=PULL):
+        return [o.to_dict() for o in self.lister.get_failed_commits(
+            client, pull, 'docs', 'guide')]
+
+    def test_final_status_is_not_requested_again(self):
+        for hoster, path, data in (
+                ('gitea', GITEA_STATUSES, gitea_status('failure')),
+                ('github', GITHUB_CHECK_RUNS, github_check_run('failure'))):
+            client = FakeClient(hoster, {path: data}, store=self.store)
+            first = self.failed(client)
+            self.assertEqual(1, len(first))
+            self.assertEqual(first, self.failed(client))
+            self.assertEqual(1, len(client.requests))
+
+    def test_final_status_is_not_requested_again_async(self):
+        client = AsyncFakeClient(
+            'gitea', {GITEA_STATUSES: gitea_status('success')},
+            store=self.store)
+        for i in range(2):
+            self.assertEqual([], asyncio.run(
+                self.lister.get_failed_commits_async(
+                    client, PULL, 'docs', 'guide')))
+        self.assertEqual(1, len(client.requests))
+
+    def test_pending_status_is_requested_again(self):
+        for hoster, path, data in (
+                ('gitea', GITEA_STATUSES, gitea_status('pending')),
+                ('github', GITHUB_CHECK_RUNS, github_check_run(None)),
+                ('github', GITHUB_CHECK_RUNS, {'check_runs': []})):
+            client = FakeClient(hoster, {path: data}, store=self.store)
+            self.failed(client)
+            self.failed(client)
+            self.assertEqual(2, len(client.requests))
+
+    def test_status_is_requested_after_an_update(self):
+        client = FakeClient(
+            'gitea', {GITEA_STATUSES: gitea_status('success')},
+            store=self.store)
+        self.failed(client)
+        # e.g. a recheck comment
+        updated = dict(PULL, updated_at='2026-09-03T10:00:00Z')
+        self.failed(client, updated)
+        self.assertEqual(2, len(client.requests))
+        self.failed(client, updated)
+        self.assertEqual(2, len(client.requests))
+        # A new head commit
+        client.responses[
+            'repos/docs/guide/commits/def456/statuses?limit=1'] = (
+            gitea_status('failure'))
+        moved = dict(updated, head={'sha': 'def456', 'ref': 'update'})
+        self.assertEqual(1, len(self.failed(client, moved)))
+        self.assertEqual(3, len(client.requests))
+
+
+class TestIncrementalOrphans(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(repos=10).start()
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.config = os.path.join(tmp.name, 'config.yaml')
+        with open(self.config, 'w') as f:
+            json.dump(create_config(self.server.url, ['docs']), f)
+
+    def list_orphans(self, engine):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            AttentionList().main([
+                '--config', self.config, '--engine', engine,
+                '--cache-dir', self.tmp,
+                '--store', os.path.join(self.tmp, 'snapshot.sqlite'),
+                '--incremental', 'pr', 'list', '--orphans',
+                '--gitea-token', 'token'])
+        counts = self.server.get_counts(reset=True)
+        pulls = sum(
+            count for endpoint, count in counts.items()
+            if endpoint.endswith('/pulls'))
+        return json.loads(out.getvalue()), pulls
+
+    def check_rerun_skips_unchanged_repos(self, engine):
+        first, first_pulls = self.list_orphans(engine)
+        # Every repository is listed once
+        self.assertEqual(11, first_pulls)
+
+        second, second_pulls = self.list_orphans(engine)
+        self.assertEqual(first, second)
+        # Only the repository with the most recently updated Pull Request,
+        # found again by the search for updates since then
+        self.assertEqual(1, second_pulls)
+
+        # A closed linked Pull Request is no orphan anymore, its repository
+        # is synchronized in addition
+        orphan = first['data'][0]
+        repo = orphan['url'].split('/')[4]
+        self.server.data.close_pull(
+            'docs/' + repo, int(orphan['url'].rsplit('/', 1)[1]))
+        third, third_pulls = self.list_orphans(engine)
+        self.assertLessEqual(third_pulls, 2)
+        self.assertEqual(first['data'][1:], third['data'])
+
+    def test_rerun_skips_unchanged_repos(self):
+        self.check_rerun_skips_unchanged_repos('sync')
+
+    def test_rerun_skips_unchanged_repos_async(self):
+        self.check_rerun_skips_unchanged_repos('async')
+
+
+class TestOlderSearch(unittest.TestCase):
+
+    def setUp(self):
+        # Repositories are not listed in name order, and some old Pull
+        # Requests of a repository are created at the same time
+        self.server = MockServer(
+            repos=10, ref_repo='sources', seed=7).start()
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config = os.path.join(tmp.name, 'config.yaml')
+        with open(self.config, 'w') as f:
+            json.dump(create_config(self.server.url, ['docs']), f)
+
+    def list_older(self, engine, *options):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            AttentionList().main([
+                '--config', self.config, '--engine', engine, '--no-cache',
+                'pr', 'list', '--older', '30', *options,
+                '--github-token', 'token', '--gitea-token', 'token'])
+        return (
+            json.loads(out.getvalue()), self.server.get_counts(reset=True))
+
+    def pulls_requests(self, counts):
+        return sum(
+            count for endpoint, count in counts.items()
+            if endpoint.endswith('/pulls'))
+
+    def check_search_matches_listing(self, engine):
+        # GitHub lists the Pull Requests of every repository if the search
+        # finds too many of them
+        with mock.patch(
+                'attention_list.helper.paginator.SEARCH_LIMIT', 0):
+            listed, counts = self.list_older(engine, '--org-search')
+        self.assertEqual(1, counts['/github/search/issues'])
+        self.assertEqual(1, counts['/gitea/api/v#/repos/issues/search'])
+        self.assertEqual(11, self.pulls_requests(counts))
+        self.assertTrue(listed['data'])
+
+        searched, counts = self.list_older(engine, '--org-search')
+        self.assertEqual(listed, searched)
+        self.assertEqual(0, self.pulls_requests(counts))
+
+        # Gitea can not search by creation time without --org-search
+        searched, counts = self.list_older(engine)
+        self.assertEqual(listed, searched)
+        self.assertNotIn('/gitea/api/v#/repos/issues/search', counts)
+        self.assertEqual(11, self.pulls_requests(counts))
+
+    def test_search_matches_listing(self):
+        self.check_search_matches_listing('sync')
+
+    def test_search_matches_listing_async(self):
+        self.check_search_matches_listing('async')
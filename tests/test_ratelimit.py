@@ -0,0 +1,75 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+from attention_list.helper.ratelimit import default_resource
+from attention_list.helper.ratelimit import RateLimiter
+
+
+def budget_headers(remaining, reset_in, limit, resource=None):
+    headers = {
+        'X-RateLimit-Remaining': str(remaining),
+        'X-RateLimit-Reset': str(int(time.time() + reset_in)),
+        'X-RateLimit-Limit': str(limit),
+    }
+    if resource:
+        headers['X-RateLimit-Resource'] = resource
+    return headers
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_default_resource(self):
+        self.assertEqual('core', default_resource('repos/{org}/{repo}/pulls'))
+        self.assertEqual('search', default_resource('search/issues'))
+        self.assertEqual('graphql', default_resource('graphql'))
+        self.assertEqual('graphql', default_resource('api/graphql'))
+        # Gitea search endpoints share the budget of all other requests
+        self.assertEqual('core', default_resource('repos/issues/search'))
+
+    def test_resources_are_separate(self):
+        limiter = RateLimiter('api.github.com')
+        limiter.update(200, budget_headers(4000, 3000, 5000, 'core'))
+        limiter.reserve('search')
+        limiter.update(
+            200, budget_headers(0, 50, 30, 'search'), 'search')
+        for i in range(10):
+            self.assertEqual(0, limiter.reserve('core'))
+        self.assertGreater(limiter.reserve('search'), 40)
+        self.assertEqual(0, limiter.reserve('core'))
+        self.assertEqual(0, limiter.reserve('graphql'))
+
+    def test_resource_named_by_response(self):
+        limiter = RateLimiter('api.github.com')
+        # The response tells the budget a default resource counts against
+        limiter.update(
+            200, budget_headers(0, 50, 30, 'code_search'), 'search')
+        self.assertGreater(limiter.reserve('search'), 40)
+        self.assertEqual(0, limiter.reserve('core'))
+
+    def test_retry_after_pauses_all_resources(self):
+        limiter = RateLimiter('api.github.com')
+        self.assertTrue(limiter.update(403, {'Retry-After': '30'}))
+        self.assertGreater(limiter.reserve('core'), 20)
+        self.assertGreater(limiter.reserve('search'), 20)
+
+    def test_used_up_budget_is_retried(self):
+        limiter = RateLimiter('api.github.com')
+        self.assertTrue(limiter.update(
+            403, budget_headers(0, 20, 5000, 'core')))
+        self.assertGreater(limiter.reserve('core'), 10)
+        self.assertEqual(0, limiter.reserve('search'))
+        # A plain 403 is not retried
+        self.assertFalse(RateLimiter('host').update(403, {}))
@@ -0,0 +1,77 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from attention_list.run import AttentionList
+from benchmarks.mock_server import MockServer
+from benchmarks.run import create_config
+
+
+SECTIONS = {
+    'failed': ['pr', 'list', '--failed'],
+    'older': ['pr', 'list', '--older', '30'],
+    'orphans': ['pr', 'list', '--orphans'],
+    'empty_branches': ['branch', 'list', '--empty'],
+}
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(repos=10).start()
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config = os.path.join(tmp.name, 'config.yaml')
+        with open(self.config, 'w') as f:
+            json.dump(create_config(self.server.url, ['docs']), f)
+
+    def run_command(self, engine, *command):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            AttentionList().main([
+                '--config', self.config, '--engine', engine, '--no-cache',
+                *command, '--github-token', 'token', '--gitea-token',
+                'token'])
+        return (
+            json.loads(out.getvalue()), self.server.get_counts(reset=True))
+
+    def check_sections_match_commands(self, engine):
+        report, counts = self.run_command(
+            engine, 'report', '--failed', '--older', '30', '--orphans',
+            '--empty-branches')
+        # The repositories and Pull Requests of every repository are
+        # fetched once for all lists
+        for prefix in ('/github/', '/gitea/api/v#/'):
+            self.assertEqual(1, counts[prefix + 'orgs/docs/repos'])
+            self.assertEqual(
+                1, counts[prefix + 'repos/docs/doc-exports/pulls'])
+            self.assertEqual(10, counts[prefix + 'repos/docs/repo#/pulls'])
+
+        self.assertEqual(set(SECTIONS), set(report))
+        for name, command in SECTIONS.items():
+            result = self.run_command(engine, *command)[0]
+            self.assertTrue(result['data'])
+            self.assertEqual(result, report[name])
+
+    def test_sections_match_commands(self):
+        self.check_sections_match_commands('sync')
+
+    def test_sections_match_commands_async(self):
+        self.check_sections_match_commands('async')
@@ -0,0 +1,84 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from attention_list.run import AttentionList
+
+
+class TestServedCommands(unittest.TestCase):
+
+    def parse(self, argv):
+        al = AttentionList()
+        al.parse_arguments(argv)
+        return al
+
+    def test_global_options_apply_to_served_commands(self):
+        # An option value equal to the command name
+        al = self.parse([
+            '--config', 'serve', '--workers', '4', '--no-cache', 'serve',
+            '--port', '9000'])
+        args = al.command_args('pr list --failed')
+        self.assertEqual('serve', args.config)
+        self.assertEqual(4, args.workers)
+        self.assertTrue(args.no_cache)
+        self.assertTrue(args.failed)
+        self.assertEqual(al.pr_lister, args.func)
+        self.assertFalse(hasattr(args, 'port'))
+        self.assertIsNone(args.writer)
+
+    def test_served_command_sets_global_options(self):
+        al = self.parse(['--workers', '4', 'serve'])
+        args = al.command_args('--workers 8 --engine async report --failed')
+        self.assertEqual(8, args.workers)
+        self.assertEqual('async', args.engine)
+        self.assertEqual(4, al.command_args('zuul list --errors').workers)
+
+
+class TestResult(unittest.TestCase):
+
+    def test_missing_result_is_an_error(self):
+        al = AttentionList()
+        al.parse_arguments(['pr', 'list', '--timeout'])
+        # --timeout is accepted but has no lister behind it
+        for data in (None, []):
+            with self.assertRaisesRegex(Exception, 'Result data missing'):
+                al.create_result(data)
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config = os.path.join(tmp.name, 'config.yaml')
+        with open(self.config, 'w') as f:
+            f.write('{}\n')
+
+    def main(self, argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            AttentionList().main(
+                ['--config', self.config, '--no-cache'] + argv)
+        return out.getvalue()
+
+    def test_metadata_list(self):
+        self.assertEqual('Metadata Lister\n', self.main(['metadata', 'list']))
+
+    def test_pr_list_timeout(self):
+        with self.assertRaisesRegex(Exception, 'Result data missing'):
+            self.main(['pr', 'list', '--timeout'])
@@ -0,0 +1,200 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import hashlib
+import hmac
+import unittest
+
+from attention_list.plugin.serve import RepoUpdater
+from attention_list.plugin.serve import Server
+from tests.fakes import FakeConfig
+from tests.fakes import read_fixture
+
+
+SECRET = 's3cret'
+
+FINDING = {'host': 'github', 'org': 'docs', 'repo': 'guide', 'number': 7}
+
+
+def sign(body, secret=SECRET):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def create_server(secret=SECRET, collect=None, updater=None,
+                  metrics_file=None, unauthenticated=False):
+    config = FakeConfig({'serve': {
+        'webhook_secret': secret,
+        'webhook_unauthenticated': unauthenticated,
+        'reports': [{'name': 'failed', 'command': 'pr list --failed'}],
+    }})
+    args = argparse.Namespace(
+        host=None, port=None, metrics_file=metrics_file)
+    return Server(
+        config, args, collect or (lambda command: None),
+        repo_updater=updater and (lambda command: updater))
+
+
+class TestWebhook(unittest.TestCase):
+
+    def test_github_signature(self):
+        server = create_server()
+        body = read_fixture('webhooks/github_check_run.json')
+        headers = {
+            'X-GitHub-Event': 'check_run',
+            'X-Hub-Signature-256': 'sha256=' + sign(body)}
+        self.assertEqual(
+            (202, 'Queued'), server.webhook('github', headers, body))
+        self.assertEqual(
+            {('github', 'docs', 'guide'): {'check_run'}}, server.pending)
+
+    def test_gitea_signature(self):
+        server = create_server()
+        body = read_fixture('webhooks/gitea_push.json')
+        headers = {'X-Gitea-Event': 'push', 'X-Gitea-Signature': sign(body)}
+        self.assertEqual(
+            (202, 'Queued'), server.webhook('gitea', headers, body))
+        self.assertEqual(
+            {('gitea', 'docs', 'guide'): {'push'}}, server.pending)
+
+    def test_invalid_signature_is_rejected(self):
+        server = create_server()
+        body = read_fixture('webhooks/github_check_run.json')
+        for headers in (
+                {'X-GitHub-Event': 'check_run'},
+                {'X-GitHub-Event': 'check_run',
+                 'X-Hub-Signature-256': 'sha256=' + sign(body, 'other')},
+                {'X-GitHub-Event': 'check_run',
+                 'X-Hub-Signature-256': 'sha256=' + sign(body + b' ')}):
+            self.assertEqual(
+                (401, 'Invalid signature'),
+                server.webhook('github', headers, body))
+        self.assertEqual({}, server.pending)
+
+    def test_unsigned_deliveries_are_rejected_without_secret(self):
+        body = read_fixture('webhooks/github_check_run.json')
+        for secret in (None, ''):
+            server = create_server(secret=secret)
+            self.assertEqual(
+                (401, 'Invalid signature'),
+                server.webhook(
+                    'github', {'X-GitHub-Event': 'check_run'}, body))
+            self.assertEqual(
+                (401, 'Invalid signature'),
+                server.webhook('zuul', {}, body))
+            self.assertEqual({}, server.pending)
+
+    def test_unauthenticated_webhooks(self):
+        server = create_server(secret=None, unauthenticated=True)
+        body = read_fixture('webhooks/github_check_run.json')
+        self.assertEqual(
+            (202, 'Queued'),
+            server.webhook('github', {'X-GitHub-Event': 'check_run'}, body))
+
+    def test_irrelevant_deliveries_are_ignored(self):
+        server = create_server(secret=None, unauthenticated=True)
+        body = read_fixture('webhooks/github_issues.json')
+        self.assertEqual(
+            (202, 'Ignored'),
+            server.webhook('github', {'X-GitHub-Event': 'issues'}, body))
+        self.assertEqual(
+            (202, 'Ignored'),
+            server.webhook('github', {'X-GitHub-Event': 'push'}, b'{}'))
+        self.assertEqual(
+            (404, 'Unknown webhook'),
+            server.webhook('gitlab', {'X-GitHub-Event': 'push'}, body))
+        self.assertEqual(
+            (400, 'Invalid payload'),
+            server.webhook('github', {'X-GitHub-Event': 'push'}, b'{'))
+        self.assertEqual({}, server.pending)
+
+    def test_zuul_project_is_queued_for_all_hosters(self):
+        server = create_server(secret=None, unauthenticated=True)
+        body = read_fixture('webhooks/zuul_buildset.json')
+        self.assertEqual((202, 'Queued'), server.webhook('zuul', {}, body))
+        self.assertEqual({
+            ('gitea', 'docs', 'guide'): {'zuul'},
+            ('github', 'docs', 'guide'): {'zuul'},
+        }, server.pending)
+
+    def test_update_only_on_relevant_events(self):
+        calls = []
+
+        def update(hoster, org, repo):
+            calls.append((hoster, org, repo))
+            return [dict(FINDING, number=8)]
+
+        server = create_server(
+            updater=RepoUpdater(kind='failed', field='host', update=update))
+        report = server.reports['failed']
+        report.update(result={'meta': {'count': 1}, 'data': [FINDING]},
+                      duration=1)
+        server.update_repo(report, 'github', 'docs', 'guide', {'push'})
+        self.assertEqual([], calls)
+        self.assertEqual([FINDING], report.result['data'])
+        server.update_repo(report, 'github', 'docs', 'guide', {'zuul'})
+        self.assertEqual([('github', 'docs', 'guide')], calls)
+        self.assertEqual([8], [f['number'] for f in report.result['data']])
+
+    def test_deliveries_during_a_refresh_are_requeued(self):
+        body = read_fixture('webhooks/github_check_run.json')
+        headers = {'X-GitHub-Event': 'check_run'}
+
+        def collect(command):
+            # The delivery is handled by the update thread while the
+            # full refresh may already have read the repository.
+            server.webhook('github', headers, body)
+            server.pending.clear()
+            return {'meta': {'count': 0}, 'data': []}
+
+        server = create_server(
+            secret=None, unauthenticated=True, collect=collect)
+        server.refresh(server.reports['failed'])
+        self.assertEqual(
+            {('github', 'docs', 'guide'): {'check_run'}}, server.pending)
+        self.assertEqual({}, server.dirty)
+        self.assertEqual(set(), server.refreshing)
+
+        server.pending.clear()
+        server.webhook('github', headers, body)
+        self.assertEqual({}, server.dirty)
+
+
+class TestRefresh(unittest.TestCase):
+
+    def test_failed_metrics_write_is_logged(self):
+        server = create_server(
+            collect=lambda command: {'meta': {'count': 0}, 'data': []},
+            metrics_file='/nonexistent/al.prom')
+        report = server.reports['failed']
+        with self.assertLogs(level='ERROR') as logs:
+            server.refresh(report)
+        self.assertIn('/nonexistent/al.prom', logs.output[0])
+        self.assertEqual([], report.result['data'])
+
+    def test_refresh_thread_survives_errors(self):
+        server = create_server()
+        report = server.reports['failed']
+        report.interval = 0
+        calls = []
+
+        def refresh(report):
+            calls.append(report.name)
+            if len(calls) == 3:
+                server.stopped.set()
+            raise OSError('disk full')
+
+        server.refresh = refresh
+        with self.assertLogs(level='ERROR'):
+            server.run_report(report)
+        self.assertEqual(3, len(calls))
@@ -0,0 +1,119 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from attention_list.helper.store import SCHEMA
+from attention_list.helper.store import SCHEMA_VERSION
+from attention_list.helper.store import SnapshotStore
+
+API = 'https://gitea.example.com/api/v1/'
+
+
+def pull(number, updated_at):
+    return {'number': number, 'state': 'open', 'updated_at': updated_at}
+
+
+class TestTimestamps(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'snapshot.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pulls_since_with_mixed_offsets(self):
+        store = SnapshotStore(self.path)
+        store.save_pulls(API, 'docs', 'guide', [
+            # 09:30 UTC, sorts after the watermark as a string
+            pull(1, '2026-09-02T11:30:00+02:00'),
+            pull(2, '2026-09-02T10:30:00Z'),
+            pull(3, '2026-09-02T08:00:00-03:00'),
+        ])
+        since = store.get_pulls_since(
+            API, 'docs', 'guide', '2026-09-02T10:00:00Z')
+        self.assertEqual([2, 3], sorted(p['number'] for p in since))
+        # The payload is kept as sent
+        self.assertEqual(
+            '2026-09-02T11:30:00+02:00',
+            store.get_pulls(API, 'docs', 'guide')[-1]['updated_at'])
+        store.close()
+
+    def test_watermarks_and_final_statuses_are_utc(self):
+        store = SnapshotStore(self.path)
+        store.set_watermark(
+            API, 'docs', 'guide', 'pulls', '2026-09-02T12:00:00+02:00')
+        self.assertEqual(
+            '2026-09-02T10:00:00.000000Z',
+            store.get_watermark(API, 'docs', 'guide', 'pulls'))
+        store.save_final_status(
+            API, 'docs', 'guide', 'abc123', '2026-09-02T10:00:00', {})
+        self.assertEqual(
+            '2026-09-02T10:00:00.000000Z',
+            store.get_final_status(API, 'docs', 'guide', 'abc123')[0])
+        store.close()
+
+    def test_stored_timestamps_are_migrated(self):
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        conn.execute(
+            'INSERT INTO pulls VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (API, 'docs', 'guide', 1, 'open', '2026-09-02T11:30:00+02:00',
+             '{"number": 1}'))
+        conn.execute(
+            'INSERT INTO watermarks VALUES (?, ?, ?, ?, ?)',
+            (API, 'docs', 'guide', 'pulls', '2026-09-02T10:00:00Z'))
+        conn.commit()
+        conn.close()
+
+        store = SnapshotStore(self.path)
+        self.assertEqual(
+            '2026-09-02T10:00:00.000000Z',
+            store.get_watermark(API, 'docs', 'guide', 'pulls'))
+        self.assertEqual([], store.get_pulls_since(
+            API, 'docs', 'guide', '2026-09-02T10:00:00Z'))
+        store.close()
+        # Migrated once
+        store = SnapshotStore(self.path)
+        self.assertEqual(
+            SCHEMA_VERSION,
+            store.conn.execute('PRAGMA user_version').fetchone()[0])
+        store.close()
+
+    def test_repos_and_statuses_are_migrated(self):
+        conn = sqlite3.connect(self.path)
+        conn.executescript(
+            'CREATE TABLE repos (api_url TEXT, org TEXT, name TEXT);'
+            'CREATE TABLE statuses (api_url TEXT, data TEXT);'
+            'PRAGMA user_version=1;')
+        conn.execute(
+            'INSERT INTO repos VALUES (?, ?, ?)', (API, 'docs', 'guide'))
+        conn.commit()
+        conn.close()
+
+        store = SnapshotStore(self.path)
+        tables = {row[0] for row in store.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table'")}
+        self.assertNotIn('statuses', tables)
+        # The repositories are listed again with their push time
+        self.assertEqual([], store.get_repos(API, 'docs'))
+        store.save_repos(API, 'docs', [('guide', '2026-09-02T12:00:00Z')])
+        self.assertEqual(['guide'], store.get_repos(API, 'docs'))
+        self.assertEqual(
+            '2026-09-02T12:00:00.000000Z',
+            store.get_repo_pushed_at(API, 'docs', 'guide'))
+        store.close()
@@ -0,0 +1,141 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from attention_list.helper import trace
+from attention_list.run import AttentionList
+from benchmarks.mock_server import MockServer
+from benchmarks.run import create_config
+
+
+def spans(events):
+    return [e for e in events if e['ph'] == 'X']
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(trace, '_tracer', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_spans_do_nothing_without_tracing(self):
+        self.assertIsNone(trace.get_tracer())
+        with trace.span('pulls', org='docs'):
+            pass
+        self.assertIs(trace._no_span, trace.span('pulls'))
+
+    def test_nested_spans(self):
+        tracer = trace.start_tracing()
+        with trace.span('pulls', org='docs', repo='guide'):
+            with trace.span('status', number=7):
+                pass
+        inner, outer = spans(tracer.events)
+        self.assertEqual(
+            ('pulls', 'crawl', {'org': 'docs', 'repo': 'guide'}),
+            (outer['name'], outer['cat'], outer['args']))
+        self.assertEqual(('status', {'number': 7}),
+                         (inner['name'], inner['args']))
+        # The inner span lies within the outer one, on the same track
+        self.assertEqual(outer['tid'], inner['tid'])
+        self.assertGreaterEqual(inner['ts'], outer['ts'])
+        self.assertLessEqual(
+            inner['ts'] + inner['dur'], outer['ts'] + outer['dur'])
+
+    def test_span_is_recorded_on_errors(self):
+        tracer = trace.start_tracing()
+        with self.assertRaises(ValueError):
+            with trace.span('branches'):
+                raise ValueError('boom')
+        self.assertEqual(['branches'], [e['name'] for e in spans(
+            tracer.events)])
+
+    def test_threads_and_tasks_have_their_own_tracks(self):
+        tracer = trace.start_tracing()
+
+        # Running at once, finished threads may pass on their ident
+        barrier = threading.Barrier(3)
+
+        def work():
+            with trace.span('thread'):
+                barrier.wait()
+
+        threads = [threading.Thread(target=work) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        async def task():
+            with trace.span('task'):
+                await asyncio.sleep(0)
+
+        async def tasks():
+            await asyncio.gather(task(), task())
+
+        asyncio.run(tasks())
+        tids = [e['tid'] for e in spans(tracer.events)]
+        self.assertEqual(5, len(set(tids)))
+        names = {
+            e['tid']: e['args']['name'] for e in tracer.events
+            if e['ph'] == 'M'}
+        self.assertEqual(set(tids), set(names))
+
+
+class TestTraceFile(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(repos=2).start()
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.config = os.path.join(tmp.name, 'config.yaml')
+        with open(self.config, 'w') as f:
+            json.dump(create_config(self.server.url, ['docs']), f)
+
+    def check_trace_file(self, engine):
+        path = os.path.join(self.tmp, engine + '.json')
+        with mock.patch.object(trace, '_tracer', None):
+            with contextlib.redirect_stdout(io.StringIO()):
+                AttentionList().main([
+                    '--config', self.config, '--engine', engine,
+                    '--no-cache', '--trace', path, 'pr', 'list', '--failed',
+                    '--github-token', 'token', '--gitea-token', 'token'])
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+        names = {e['name'] for e in spans(events)}
+        for name in ('config', 'command', 'serialize', 'get_repos', 'pulls',
+                     'status'):
+            self.assertIn(name, names)
+        self.assertEqual(
+            {'hoster': 'gitea', 'org': 'docs'},
+            [e['args'] for e in spans(events)
+             if e['name'] == 'get_repos'
+             and e['args']['hoster'] == 'gitea'][0])
+        self.assertEqual('process_name', events[0]['name'])
+
+    def test_trace_file(self):
+        self.check_trace_file('sync')
+
+    def test_trace_file_async(self):
+        self.check_trace_file('async')
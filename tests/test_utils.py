@@ -0,0 +1,221 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import datetime as dt
+import os
+import tempfile
+import unittest
+
+from attention_list.helper.aio import sync_org_pulls_async
+from attention_list.helper.paginator import page_url
+from attention_list.helper.store import SnapshotStore
+from attention_list.helper.utils import created_pulls_url
+from attention_list.helper.utils import get_pull_requests
+from attention_list.helper.utils import get_pull_requests_created_before
+from attention_list.helper.utils import sync_org_pulls
+from attention_list.helper.utils import sync_pulls
+from attention_list.helper.utils import updated_pulls_url
+from attention_list.helper.utils import updated_search_url
+from tests.fakes import AsyncFakeClient
+from tests.fakes import FakeClient
+
+
+def pull(repo, number, updated_at, state='open', title='Change',
+         created_at='2026-09-01T10:00:00Z'):
+    full = 'docs/' + repo
+    return {
+        'number': number,
+        'title': title,
+        'state': state,
+        'url': 'https://gitea.example.com/%s/pulls/%d' % (full, number),
+        'html_url': 'https://gitea.example.com/%s/pulls/%d' % (full, number),
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'head': {'ref': 'branch', 'sha': 'abc',
+                 'repo': {'full_name': full}},
+        'base': {'repo': {'full_name': full}},
+    }
+
+
+def found(pull):
+    """
+    Pull Request as found by the Gitea issue search
+    """
+    return dict(pull, repository={
+        'name': pull['base']['repo']['full_name'].split('/')[1]})
+
+
+class TestIncrementalSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(
+            os.path.join(self.tmp.name, 'snapshot.sqlite'))
+        self.responses = {}
+        self.client = self.create_client(FakeClient)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def create_client(self, client_class):
+        client = client_class(
+            'gitea', self.responses, api_url='https://gitea.example.com/',
+            store=self.store)
+        client.incremental = True
+        client.page_size = 2
+        return client
+
+    def path(self, url, page=1):
+        return page_url(self.client, url, page)[len(self.client.api_url):]
+
+    def set_pulls(self, repo, pulls, page=1):
+        url = updated_pulls_url(self.client, 'docs', repo)
+        self.responses[self.path(url, page)] = (
+            200, pulls, {'X-Total-Count': str(len(pulls))})
+
+    def set_search(self, pulls):
+        since = self.store.get_watermark(
+            self.client.api_url, 'docs', 'guide', 'pulls/checked')
+        url = updated_search_url(self.client, 'docs', since)
+        self.responses[self.path(url)] = (
+            200, [found(p) for p in pulls], {'X-Total-Count': str(len(pulls))})
+
+    def new_run(self):
+        self.client.synced = set()
+        self.client.requests = []
+
+    def test_sync_stops_at_the_watermark(self):
+        self.store.set_watermark(
+            self.client.api_url, 'docs', 'guide', 'pulls',
+            '2026-09-02T10:00:00Z')
+        self.set_pulls('guide', [
+            pull('guide', 3, '2026-09-03T10:00:00Z'),
+            pull('guide', 2, '2026-09-01T10:00:00Z')])
+        sync_pulls(self.client, 'docs', 'guide')
+        # The second page is not requested
+        self.assertEqual(1, len(self.client.requests))
+        self.assertEqual(
+            '2026-09-03T10:00:00.000000Z',
+            self.store.get_watermark(
+                self.client.api_url, 'docs', 'guide', 'pulls'))
+        # Once per run
+        sync_pulls(self.client, 'docs', 'guide')
+        self.assertEqual(1, len(self.client.requests))
+
+    def test_second_run_skips_unchanged_repos(self):
+        self.set_pulls('guide', [pull('guide', 1, '2026-09-02T10:00:00Z')])
+        self.set_pulls('api', [pull('api', 1, '2026-09-01T10:00:00Z')])
+        sync_org_pulls(self.client, 'docs', ['guide', 'api'])
+        self.assertEqual(2, len(self.client.requests))
+        self.assertEqual(
+            ['https://gitea.example.com/docs/guide/pulls/1'],
+            [p['url'] for p in get_pull_requests(
+                self.client, 'docs', 'guide', 'open')])
+        self.assertEqual(2, len(self.client.requests))
+
+        # Pull Request 1 of guide has been closed since
+        closed = pull('guide', 1, '2026-09-04T10:00:00Z', state='closed')
+        self.new_run()
+        self.set_search([closed])
+        self.set_pulls('guide', [closed])
+        sync_org_pulls(self.client, 'docs', ['guide', 'api'])
+        self.assertEqual([
+            'https://gitea.example.com/repos/issues/search?type=pulls&'
+            'state=all&owner=docs&since=2026-09-02T10%3A00%3A00Z&limit=2&'
+            'page=1',
+            'https://gitea.example.com/repos/docs/guide/pulls?state=all&'
+            'sort=recentupdate&limit=2&page=1',
+        ], [url for method, url in self.client.requests])
+        self.assertEqual(
+            [], get_pull_requests(self.client, 'docs', 'guide', 'open'))
+        self.assertEqual(
+            1, len(get_pull_requests(self.client, 'docs', 'api', 'open')))
+        self.assertEqual(2, len(self.client.requests))
+
+        # Nothing changed
+        self.new_run()
+        self.set_search([])
+        sync_org_pulls(self.client, 'docs', ['guide', 'api'])
+        self.assertEqual(1, len(self.client.requests))
+
+    def test_new_repos_are_synchronized(self):
+        self.set_pulls('guide', [pull('guide', 1, '2026-09-02T10:00:00Z')])
+        sync_org_pulls(self.client, 'docs', ['guide'])
+        self.new_run()
+        self.set_search([])
+        self.set_pulls('api', [pull('api', 1, '2026-09-01T10:00:00Z')])
+        sync_org_pulls(self.client, 'docs', ['guide', 'api'])
+        self.assertEqual(2, len(self.client.requests))
+        self.assertIn('repos/docs/api/pulls', self.client.requests[1][1])
+
+    def test_all_repos_are_synchronized_without_search(self):
+        self.set_pulls('guide', [pull('guide', 1, '2026-09-02T10:00:00Z')])
+        self.set_pulls('api', [pull('api', 1, '2026-09-01T10:00:00Z')])
+        sync_org_pulls(self.client, 'docs', ['guide', 'api'])
+        self.new_run()
+        # The search fails
+        sync_org_pulls(self.client, 'docs', ['guide', 'api'])
+        self.assertEqual(3, len(self.client.requests))
+
+    def test_only_incremental_runs_synchronize(self):
+        self.client.incremental = False
+        sync_org_pulls(self.client, 'docs', ['guide', 'api'])
+        self.assertEqual([], self.client.requests)
+
+    def test_second_run_skips_unchanged_repos_async(self):
+        client = self.create_client(AsyncFakeClient)
+        self.set_pulls('guide', [pull('guide', 1, '2026-09-02T10:00:00Z')])
+        self.set_pulls('api', [pull('api', 1, '2026-09-01T10:00:00Z')])
+        asyncio.run(sync_org_pulls_async(client, 'docs', ['guide', 'api']))
+        self.assertEqual(2, len(client.requests))
+        client.synced = set()
+        client.requests = []
+        self.set_search([])
+        asyncio.run(sync_org_pulls_async(client, 'docs', ['guide', 'api']))
+        self.assertEqual(1, len(client.requests))
+
+
+class TestCreatedBefore(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient(
+            'gitea', {}, api_url='https://gitea.example.com/')
+        self.client.page_size = 2
+        url = created_pulls_url(self.client, 'docs', 'guide')
+        created = [
+            '2026-09-01T10:00:00Z', '2026-09-02T10:00:00Z',
+            '2026-09-03T10:00:00Z', '2026-09-03T10:00:00Z',
+            '2026-09-05T10:00:00Z', '2026-09-06T10:00:00Z',
+            '2026-09-07T10:00:00Z']
+        pulls = [
+            pull('guide', number, created_at, created_at=created_at)
+            for number, created_at in enumerate(created, 1)]
+        for page in range(1, 5):
+            self.client.responses[
+                page_url(self.client, url, page)[
+                    len(self.client.api_url):]] = (
+                200, pulls[2 * page - 2:2 * page],
+                {'X-Total-Count': str(len(pulls))})
+
+    def test_pagination_stops_at_newer_pulls(self):
+        pulls = get_pull_requests_created_before(
+            self.client, 'docs', 'guide',
+            dt.datetime(2026, 9, 4, tzinfo=dt.timezone.utc))
+        # Newest first, the higher number first when created at once
+        self.assertEqual([4, 3, 2, 1], [p['number'] for p in pulls])
+        # The page reaching newer Pull Requests is the last one requested
+        self.assertEqual(
+            ['page=1', 'page=2', 'page=3'],
+            [url.rsplit('&', 1)[-1] for method, url in self.client.requests])